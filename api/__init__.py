@@ -8,5 +8,6 @@ from .stats import stats_bp
 from .auth import auth_bp
 from .promptgen import promptgen_bp
 from .users import users_bp
+from .bulk import bulk_bp
 
-__all__ = ['categories_bp', 'prompts_bp', 'stats_bp', 'auth_bp', 'promptgen_bp', 'users_bp']
+__all__ = ['categories_bp', 'prompts_bp', 'stats_bp', 'auth_bp', 'promptgen_bp', 'users_bp', 'bulk_bp']
@@ -1,10 +1,15 @@
 from flask import Blueprint, request, jsonify, session
-from werkzeug.security import generate_password_hash, check_password_hash
+from api.passwords import password_hasher, PasswordHasherBusy
 from models.database import db
-from models.user import User
+from models.user import User, user_profile_cache
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api')
 
+def _busy(e):
+    response = jsonify({'error': str(e)})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 @auth_bp.route('/signup', methods=['POST'])
 def signup():
     data = request.get_json()
@@ -14,7 +19,11 @@ def signup():
         return jsonify({'error': 'Email and password required'}), 400
     if User.query.filter_by(email=email).first():
         return jsonify({'error': 'Email already registered'}), 409
-    user = User(email=email, password_hash=generate_password_hash(password))
+    try:
+        password_hash = password_hasher.hash(password)
+    except PasswordHasherBusy as e:
+        return _busy(e)
+    user = User(email=email, password_hash=password_hash)
     db.session.add(user)
     db.session.commit()
     return jsonify({'message': 'User created successfully'}), 201
@@ -23,11 +32,21 @@ def signup():
 def login():
     data = request.get_json()
     email = data.get('email')
-    password = data.get('password')
+    password = data.get('password') or ''
     user = User.query.filter_by(email=email).first()
-    if not user or not check_password_hash(user.password_hash, password):
+    try:
+        # Unknown emails are checked against a dummy hash so they take as long as real ones
+        valid = password_hasher.verify(user.password_hash if user else None, password)
+        if valid and password_hasher.needs_rehash(user.password_hash):
+            # Upgrade hashes made with an older method or cost
+            user.password_hash = password_hasher.hash(password)
+            db.session.commit()
+    except PasswordHasherBusy as e:
+        return _busy(e)
+    if not valid:
         return jsonify({'error': 'Invalid credentials'}), 401
     session['user_id'] = user.id
+    user_profile_cache.put(user.id, user.to_profile())
     return jsonify({'message': 'Login successful', 'user': {'id': user.id, 'email': user.email}})
 
 @auth_bp.route('/logout', methods=['POST'])
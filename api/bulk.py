@@ -0,0 +1,48 @@
+"""
+Bulk import/export API endpoints
+"""
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from api.compression import chunked
+from models import db
+from models.bulk import export_ndjson, import_ndjson, IMPORT_BATCH_SIZE
+from models.routing import read_replica
+
+bulk_bp = Blueprint('bulk', __name__, url_prefix='/api')
+
+@bulk_bp.route('/export', methods=['GET'])
+@read_replica
+def export_library():
+    """Stream all categories and prompts as NDJSON"""
+    try:
+        category = request.args.get('category')
+        lines = export_ndjson(category=category)
+        return Response(
+            stream_with_context(chunked(lines)),
+            mimetype='application/x-ndjson',
+            headers={'Content-Disposition': 'attachment; filename=prompts.ndjson'}
+        )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bulk_bp.route('/import', methods=['POST'])
+def import_library():
+    """Import categories and prompts from an NDJSON request body
+
+    Query parameters: key (title or external_id), on_conflict (update or
+    skip), create_categories (default true) and batch_size.
+    """
+    try:
+        options = {
+            'key': request.args.get('key', 'title'),
+            'on_conflict': request.args.get('on_conflict', 'update'),
+            'create_categories': request.args.get('create_categories', 'true').lower() != 'false',
+            'batch_size': request.args.get('batch_size', IMPORT_BATCH_SIZE, type=int),
+        }
+        # The body is read line by line, so large files never sit in memory
+        summary = import_ndjson(request.stream, **options)
+        return jsonify(summary)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -4,15 +4,23 @@ Categories API endpoints
 from flask import Blueprint, request, jsonify
 from models import db, Category
 from models.category import Category as CategoryModel
+from models.prompt import Prompt as PromptModel
+from models.routing import read_replica
+from api.conditional import catalog_conditional
+from api.pagination import page_args, page_response
 
 categories_bp = Blueprint('categories', __name__, url_prefix='/api/categories')
 
 @categories_bp.route('', methods=['GET'])
+@read_replica
+@catalog_conditional
 def get_categories():
     """Get all categories"""
     try:
-        categories = CategoryModel.query.all()
-        return jsonify([category.to_dict() for category in categories])
+        return jsonify([
+            category.to_dict(prompt_count)
+            for category, prompt_count in CategoryModel.with_prompt_counts()
+        ])
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -36,12 +44,14 @@ def create_category():
         db.session.add(category)
         db.session.commit()
         
-        return jsonify(category.to_dict()), 201
+        return jsonify(category.to_dict(prompt_count=0)), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @categories_bp.route('/<int:category_id>', methods=['GET'])
+@read_replica
+@catalog_conditional
 def get_category(category_id):
     """Get a specific category"""
     try:
@@ -80,7 +90,7 @@ def delete_category(category_id):
         category = CategoryModel.query.get_or_404(category_id)
         
         # Check if category has prompts
-        if category.prompts:
+        if category.has_prompts():
             return jsonify({'error': 'Cannot delete category with prompts. Move or delete prompts first.'}), 400
         
         db.session.delete(category)
@@ -92,11 +102,17 @@ def delete_category(category_id):
         return jsonify({'error': str(e)}), 500
 
 @categories_bp.route('/<int:category_id>/prompts', methods=['GET'])
+@read_replica
+@catalog_conditional
 def get_category_prompts(category_id):
     """Get all prompts in a category"""
     try:
-        category = CategoryModel.query.get_or_404(category_id)
-        prompts = [prompt.to_dict() for prompt in category.prompts]
-        return jsonify(prompts)
+        CategoryModel.query.get_or_404(category_id)
+        limit, cursor, fields = page_args()
+        query = PromptModel.query.filter_by(category_id=category_id)
+        prompts, next_cursor = PromptModel.page(query, 'id', cursor, limit, fields)
+        return page_response([prompt.to_dict(fields) for prompt in prompts], next_cursor)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
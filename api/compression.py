@@ -0,0 +1,179 @@
+"""
+Negotiated response compression
+
+Responses of a compressible type are encoded with the best coding the
+client accepts (brotli when the brotli package is installed, then gzip).
+Buffered responses are only compressed from COMPRESS_MIN_SIZE bytes up;
+streamed responses (NDJSON, Server-Sent Events) are compressed chunk by
+chunk with a sync flush after each chunk, so every line or event reaches
+the client as soon as it is produced.
+
+Compressed responses get the coding appended to a strong ETag
+("<tag>-gzip"), as required for a different representation; the suffix is
+stripped from If-None-Match before views compare tags, and put back on a
+304 so it repeats the tag of the representation the client holds.
+"""
+import re
+import zlib
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is always available
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = (
+    'application/json', 'application/x-ndjson', 'text/event-stream',
+    'text/html', 'text/css', 'text/plain', 'text/javascript', 'application/javascript',
+)
+ETAG_SUFFIX = re.compile(r'-(br|gzip)"')
+# Request environ key for the codings stripped from If-None-Match
+ETAG_CODINGS_KEY = 'compression.etag_codings'
+
+
+class _GzipStream:
+    def __init__(self, level):
+        # wbits 16 + MAX_WBITS writes a gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliStream:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def chunked(parts, size=64 * 1024):
+    """Join small string parts into chunks of about size characters
+
+    Streaming compression flushes after every chunk; use this for streams
+    where per-line delivery does not matter, such as exports.
+    """
+    buffer = []
+    buffered = 0
+    try:
+        for part in parts:
+            buffer.append(part)
+            buffered += len(part)
+            if buffered >= size:
+                yield ''.join(buffer)
+                buffer = []
+                buffered = 0
+        if buffer:
+            yield ''.join(buffer)
+    finally:
+        close = getattr(parts, 'close', None)
+        if close is not None:
+            close()
+
+
+class Compression:
+    """Compresses eligible responses in an after_request hook"""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register the compression hooks using COMPRESS_* settings"""
+        self.enabled = bool(app.config.get('COMPRESS_ENABLED', True))
+        self.min_size = int(app.config.get('COMPRESS_MIN_SIZE', 1024))
+        self.gzip_level = int(app.config.get('COMPRESS_GZIP_LEVEL', 1))
+        self.brotli_quality = int(app.config.get('COMPRESS_BROTLI_QUALITY', 4))
+        self.mimetypes = tuple(app.config.get('COMPRESS_MIMETYPES', COMPRESSIBLE_MIMETYPES))
+        self.encodings = ['br', 'gzip'] if brotli is not None else ['gzip']
+        app.extensions['compression'] = self
+        if self.enabled:
+            app.before_request(self._strip_etag_suffix)
+            app.after_request(self._compress)
+
+    def _stream(self, encoding):
+        if encoding == 'br':
+            return _BrotliStream(self.brotli_quality)
+        return _GzipStream(self.gzip_level)
+
+    def compress_bytes(self, data, encoding):
+        """Compress a whole body with the given coding"""
+        stream = self._stream(encoding)
+        return stream.compress(data) + stream.finish()
+
+    def compress_iter(self, chunks, encoding):
+        """Compress an iterable of str/bytes chunks, flushing after each one"""
+        stream = self._stream(encoding)
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+                if chunk:
+                    yield stream.compress(chunk) + stream.flush()
+            yield stream.finish()
+        finally:
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                close()
+
+    def _strip_etag_suffix(self):
+        value = request.environ.get('HTTP_IF_NONE_MATCH')
+        if value and '-' in value:
+            request.environ[ETAG_CODINGS_KEY] = set(ETAG_SUFFIX.findall(value))
+            request.environ['HTTP_IF_NONE_MATCH'] = ETAG_SUFFIX.sub('"', value)
+
+    def _not_modified(self, response):
+        # Only a compressed copy was tagged with a coding, so only suffix the tag if the client sent one
+        codings = request.environ.get(ETAG_CODINGS_KEY)
+        etag, weak = response.get_etag()
+        if codings and etag and not weak:
+            encoding = request.accept_encodings.best_match(self.encodings)
+            if encoding in codings:
+                response.set_etag(f'{etag}-{encoding}')
+        response.vary.add('Accept-Encoding')
+        return response
+
+    def _compress(self, response):
+        if response.status_code == 304:
+            return self._not_modified(response)
+        if response.mimetype not in self.mimetypes:
+            return response
+        response.vary.add('Accept-Encoding')
+        if (response.status_code < 200 or response.status_code in (204, 206)
+                or request.method == 'HEAD' or response.direct_passthrough
+                or 'Content-Encoding' in response.headers):
+            return response
+        encoding = request.accept_encodings.best_match(self.encodings)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = self.compress_iter(response.response, encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            response.set_data(self.compress_bytes(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(f'{etag}-{encoding}')
+        return response
+
+
+compression = Compression()
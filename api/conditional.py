@@ -0,0 +1,69 @@
+"""
+Conditional GET support for catalog endpoints
+"""
+from functools import wraps
+from flask import current_app, make_response, request
+from werkzeug.http import is_resource_modified
+from models.catalog import get_catalog_version
+from models.stats import TOTAL_USAGE, get_counter
+
+# Clients may keep responses but must revalidate before reusing them
+CACHE_CONTROL = 'no-cache'
+
+
+def _tag(response, etag, weak, last_modified):
+    response.set_etag(etag, weak=weak)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
+
+
+def _conditional(view, usage):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            version, last_modified = get_catalog_version()
+            etag = f'catalog-{version}'
+            if last_modified is not None:
+                # A recreated database restarts the counter; the write time keeps old tags from matching
+                etag += f'-{last_modified:%Y%m%d%H%M%S}'
+            if usage:
+                # Grows with every usage flush; usage has no write time, so no Last-Modified either
+                etag += f'-u{get_counter(TOTAL_USAGE)}'
+                last_modified = None
+        except Exception:
+            current_app.logger.exception('Could not read the catalog version')
+            return view(*args, **kwargs)
+        # Without usage in the tag, usage_count in the body can change under it
+        weak = not usage
+        if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+            return _tag(current_app.response_class(status=304), etag, weak, last_modified)
+        response = make_response(view(*args, **kwargs))
+        if response.status_code == 200:
+            _tag(response, etag, weak, last_modified)
+        return response
+    return wrapper
+
+
+def catalog_conditional(view):
+    """Tag a catalog read with the catalog version and answer 304 when it is unchanged
+
+    Usage flushes do not change the catalog version, so the tag is weak:
+    usage_count values in the response may be older than the last flush.
+    The version is read before the view runs, so a write that lands while
+    the response is built can only make the tag older than the data, never newer.
+    """
+    return _conditional(view, usage=False)
+
+
+def usage_conditional(view):
+    """Like catalog_conditional, for reads ordered by usage: the tag also changes on every usage flush"""
+    return _conditional(view, usage=True)
+
+
+def conditional_response(response):
+    """Give a single-resource response a strong ETag of its body and honour If-None-Match"""
+    response.add_etag()
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response.make_conditional(request)
@@ -1,8 +1,21 @@
-import requests
+import json
 import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from flask import current_app, has_app_context
+from api.generation_cache import get_generation_cache, make_cache_key
+from api.llm_client import get_llm_client
+from api.singleflight import generation_flight
 
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
-GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent"
+GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-pro")
+# Upper bound on concurrent upstream calls made by batch generation
+LLM_BATCH_WORKERS = int(os.environ.get("LLM_BATCH_WORKERS", "8"))
+# Point GEMINI_API_BASE at benchmarks/fake_gemini.py to load-test without real quota
+GEMINI_API_BASE = os.environ.get("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
+GEMINI_API_URL = os.environ.get(
+    "GEMINI_API_URL", f"{GEMINI_API_BASE.rstrip('/')}/models/{GEMINI_MODEL}:generateContent"
+)
 
 SYSTEM_PROMPT = (
     "You are an expert prompt engineer. Given a context from a user (who is not technical), "
@@ -10,34 +23,233 @@ SYSTEM_PROMPT = (
     "Avoid technical jargon. If user details are provided, use them to personalize the prompt."
 )
 
-def generate_prompt(user_context: str, user_info: dict = None) -> str:
-    headers = {"Content-Type": "application/json"}
-    # Add user info to system prompt if available
+def request_bypass_cache(data: dict) -> bool:
+    """Check the per-request cache bypass flag; raises ValueError unless it is a JSON boolean"""
+    bypass = (data or {}).get('bypass_cache', False)
+    if not isinstance(bypass, bool):
+        raise ValueError('bypass_cache must be true or false')
+    return bypass
+
+def request_deadline(data: dict):
+    """Read an optional client deadline (seconds), capped at the server budget
+
+    Raises ValueError unless it is absent, null or a positive JSON number.
+    """
+    requested = (data or {}).get('deadline')
+    if requested is None:
+        return None
+    if isinstance(requested, bool) or not isinstance(requested, (int, float)) or requested <= 0:
+        raise ValueError('deadline must be a positive number of seconds')
+    return min(float(requested), get_llm_client().deadline)
+
+def build_system_prompt(user_info: dict = None) -> str:
+    """Add user info to the system prompt if available"""
     if user_info:
-        user_details = f" User details: {user_info}."
-    else:
-        user_details = ""
-    system_prompt = SYSTEM_PROMPT + user_details
-    data = {
+        return SYSTEM_PROMPT + f" User details: {user_info}."
+    return SYSTEM_PROMPT
+
+def _gemini_payload(system_prompt: str, user_context: str) -> dict:
+    return {
         "contents": [
             {"role": "system", "parts": [{"text": system_prompt}]},
             {"role": "user", "parts": [{"text": user_context}]}
         ]
     }
+
+def _call_gemini(system_prompt: str, user_context: str, deadline: float = None) -> str:
+    """Call Gemini and return the generated text; raises on any failure"""
+    headers = {"Content-Type": "application/json"}
+    data = _gemini_payload(system_prompt, user_context)
     params = {"key": GEMINI_API_KEY}
+    response = get_llm_client().post_json(
+        GEMINI_API_URL, headers=headers, params=params, json=data, deadline=deadline
+    )
+    result = response.json()
+    return result["candidates"][0]["content"]["parts"][0]["text"]
+
+class GenerationError(Exception):
+    """Raised by generate_prompt_or_raise when generation fails"""
+
+def generate_prompt_or_raise(user_context: str, user_info: dict = None, deadline: float = None,
+                             use_cache: bool = True) -> str:
+    """Generate a prompt with Gemini, raising GenerationError on failure
+    
+    deadline is the total time budget in seconds. Successful generations are
+    cached unless use_cache is False.
+    """
+    system_prompt = build_system_prompt(user_info)
+    cache = get_generation_cache()
+    cache_key = None
+    if use_cache and cache.ttl > 0:
+        cache_key = make_cache_key(system_prompt, user_context, user_info, GEMINI_MODEL)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+    
+    def call():
+        prompt = _call_gemini(system_prompt, user_context, deadline)
+        if cache_key is not None:
+            cache.set(cache_key, prompt)
+        return prompt
+    
     try:
-        response = requests.post(GEMINI_API_URL, headers=headers, params=params, json=data, timeout=30)
-        response.raise_for_status()
-        result = response.json()
-        return result["candidates"][0]["content"]["parts"][0]["text"]
+        if cache_key is None:
+            return call()
+        # Identical concurrent requests share one upstream call
+        return generation_flight.do(cache_key, call, timeout=deadline or get_llm_client().deadline)
+    except GenerationError:
+        raise
     except Exception as e:
-        # Log the error details for debugging
-        import traceback
-        print("[Gemini LLM Error]", str(e))
-        print(traceback.format_exc())
-        if hasattr(e, 'response') and e.response is not None:
-            try:
-                print("[Gemini LLM Response]", e.response.text)
-            except Exception:
-                pass
+        _log_generation_error(e)
+        raise GenerationError(str(e)) from e
+
+def _log_generation_error(e: Exception):
+    """Log the error details for debugging"""
+    import traceback
+    print("[Gemini LLM Error]", str(e))
+    print(traceback.format_exc())
+    if hasattr(e, 'response') and e.response is not None:
+        try:
+            print("[Gemini LLM Response]", e.response.text)
+        except Exception:
+            pass
+
+def _iter_sse_text(response):
+    """Yield text chunks from a Gemini streamGenerateContent SSE response"""
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith('data:'):
+            continue
+        event = json.loads(line[len('data:'):].strip())
+        for candidate in event.get("candidates", [])[:1]:
+            for part in candidate.get("content", {}).get("parts", []):
+                if part.get("text"):
+                    yield part["text"]
+
+def stream_prompt(user_context: str, user_info: dict = None, deadline: float = None,
+                  use_cache: bool = True):
+    """Generate a prompt with Gemini, yielding text chunks as they arrive
+    
+    Uses the same cache as generate_prompt: a hit is yielded as one chunk and
+    a completed stream is cached. Streams are not coalesced with identical
+    in-flight generations. Raises GenerationError on failure; closing the
+    generator early closes the upstream connection.
+    """
+    system_prompt = build_system_prompt(user_info)
+    cache = get_generation_cache()
+    cache_key = None
+    if use_cache and cache.ttl > 0:
+        cache_key = make_cache_key(system_prompt, user_context, user_info, GEMINI_MODEL)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+    
+    response = None
+    chunks = []
+    try:
+        response = get_llm_client().post_json(
+            GEMINI_API_URL.replace(':generateContent', ':streamGenerateContent'),
+            headers={"Content-Type": "application/json"},
+            params={"key": GEMINI_API_KEY, "alt": "sse"},
+            json=_gemini_payload(system_prompt, user_context),
+            deadline=deadline,
+            stream=True
+        )
+        for chunk in _iter_sse_text(response):
+            chunks.append(chunk)
+            yield chunk
+    except GeneratorExit:
+        raise
+    except Exception as e:
+        _log_generation_error(e)
+        raise GenerationError(str(e)) from e
+    finally:
+        if response is not None:
+            response.close()
+    
+    if not chunks:
+        raise GenerationError("Empty response from LLM upstream")
+    if cache_key is not None:
+        cache.set(cache_key, ''.join(chunks))
+
+def generate_prompt(user_context: str, user_info: dict = None, deadline: float = None,
+                    use_cache: bool = True) -> str:
+    """Generate a prompt with Gemini
+    
+    Returns an error string instead of raising; error strings are never
+    cached.
+    """
+    try:
+        return generate_prompt_or_raise(user_context, user_info, deadline, use_cache)
+    except GenerationError as e:
         return f"[Error: Could not generate prompt: {str(e)}]"
+
+_batch_executor = None
+_batch_executor_lock = threading.Lock()
+
+def _get_batch_executor():
+    """Get the shared pool that bounds concurrent upstream calls for batches"""
+    global _batch_executor
+    if _batch_executor is None:
+        with _batch_executor_lock:
+            if _batch_executor is None:
+                _batch_executor = ThreadPoolExecutor(
+                    max_workers=LLM_BATCH_WORKERS,
+                    thread_name_prefix="llm-batch"
+                )
+    return _batch_executor
+
+def generate_prompts_concurrently(items, max_parallel: int = None, deadline: float = None,
+                                  use_cache: bool = True, ordered: bool = False):
+    """Generate prompts for many (user_context, user_info) items in parallel
+    
+    Yields (index, prompt, error) tuples: as each call completes, or in input
+    order when ordered is True. A failed item carries an error message and
+    never fails the rest of the batch. At most max_parallel calls from this
+    batch are in flight at once.
+    """
+    executor = _get_batch_executor()
+    max_parallel = max(1, min(max_parallel or LLM_BATCH_WORKERS, LLM_BATCH_WORKERS))
+    pending = {}
+    finished = {}
+    next_to_yield = 0
+    items = iter(enumerate(items))
+    # Pool threads have no app context; without one, database coalescing is skipped
+    app = current_app._get_current_object() if has_app_context() else None
+    
+    def generate(user_context, user_info):
+        if app is None:
+            return generate_prompt_or_raise(user_context, user_info, deadline, use_cache)
+        with app.app_context():
+            return generate_prompt_or_raise(user_context, user_info, deadline, use_cache)
+    
+    def submit_next():
+        for index, (user_context, user_info) in items:
+            future = executor.submit(generate, user_context, user_info)
+            pending[future] = index
+            return True
+        return False
+    
+    try:
+        while len(pending) < max_parallel and submit_next():
+            pass
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    result = (index, future.result(), None)
+                except Exception as e:
+                    result = (index, None, str(e))
+                submit_next()
+                if not ordered:
+                    yield result
+                    continue
+                finished[index] = result
+                while next_to_yield in finished:
+                    yield finished.pop(next_to_yield)
+                    next_to_yield += 1
+    finally:
+        # Client went away: drop work that has not started yet
+        for future in pending:
+            future.cancel()
@@ -0,0 +1,187 @@
+"""
+Cache for LLM-generated prompts
+
+Entries are keyed by a hash of the normalized system prompt, user context,
+user info and model. The in-memory backend is a bounded LRU; the optional
+SQLite backend keeps entries across restarts. Both expire entries after a
+TTL.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def _normalize_text(value):
+    # Whitespace only: case can carry meaning (names, codes), so it stays part of the key
+    return re.sub(r'\s+', ' ', value or '').strip()
+
+
+def make_cache_key(system_prompt, user_context, user_info, model):
+    """Hash the normalized generation inputs into a cache key"""
+    payload = json.dumps({
+        'system': _normalize_text(system_prompt),
+        'context': _normalize_text(user_context),
+        'user': user_info or {},
+        'model': model,
+    }, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class MemoryBackend:
+    """Bounded in-process LRU storage"""
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, value, stored_at):
+        with self._lock:
+            self._entries[key] = (value, stored_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """LRU storage in an SQLite file so entries survive restarts"""
+
+    def __init__(self, path, max_entries=10000):
+        self.max_entries = max_entries
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS generation_cache ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+        )
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS ix_generation_cache_accessed_at ON generation_cache (accessed_at)'
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, stored_at FROM generation_cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is not None:
+                self._conn.execute(
+                    'UPDATE generation_cache SET accessed_at = ? WHERE key = ?', (time.time(), key)
+                )
+            return row
+
+    def set(self, key, value, stored_at):
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO generation_cache (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)',
+                (key, value, stored_at, time.time())
+            )
+            self._conn.execute(
+                'DELETE FROM generation_cache WHERE key IN ('
+                'SELECT key FROM generation_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            )
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute('DELETE FROM generation_cache WHERE key = ?', (key,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM generation_cache')
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM generation_cache').fetchone()[0]
+
+
+class GenerationCache:
+    """TTL cache of generated prompts with hit and miss counters"""
+
+    def __init__(self, backend, ttl=3600.0):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Build a cache from GENERATION_CACHE_* environment variables"""
+        max_entries = int(os.getenv('GENERATION_CACHE_SIZE', '1000'))
+        path = os.getenv('GENERATION_CACHE_PATH')
+        backend = SQLiteBackend(path, max_entries) if path else MemoryBackend(max_entries)
+        return cls(backend, ttl=float(os.getenv('GENERATION_CACHE_TTL', '3600')))
+
+    def get(self, key):
+        """Get a cached value, or None on a miss or expired entry"""
+        entry = self.backend.get(key)
+        if entry is not None and time.time() - entry[1] > self.ttl:
+            self.backend.delete(key)
+            entry = None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        self.backend.set(key, value, time.time())
+
+    def clear(self):
+        self.backend.clear()
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def stats(self):
+        """Get hit/miss counters and the current size"""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / total if total else 0.0,
+            'size': len(self.backend),
+            'ttl': self.ttl,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_generation_cache():
+    """Get the process-wide generation cache, creating it on first use"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = GenerationCache.from_env()
+    return _cache
@@ -0,0 +1,82 @@
+"""
+Pluggable JSON provider
+
+Serializes with the fastest available backend (JSON_BACKEND: "auto", or
+a name from BACKENDS). orjson is used when it is installed; otherwise, or
+for values orjson cannot encode, Flask's stdlib implementation is used.
+Output matches the stdlib provider apart from insignificant whitespace
+and non-ASCII characters being sent as UTF-8 instead of \\u escapes.
+"""
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+
+def _orjson_backend(provider):
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    if provider.sort_keys:
+        options |= orjson.OPT_SORT_KEYS
+
+    def dumps_bytes(obj):
+        try:
+            return orjson.dumps(obj, default=provider.default, option=options)
+        except orjson.JSONEncodeError:
+            # e.g. integers wider than 64 bits
+            return DefaultJSONProvider.dumps(provider, obj).encode()
+
+    return dumps_bytes, orjson.loads
+
+
+def _stdlib_backend(provider):
+    def dumps_bytes(obj):
+        return DefaultJSONProvider.dumps(provider, obj).encode()
+
+    return dumps_bytes, None
+
+
+# name -> (is available, factory returning (dumps to bytes, loads or None))
+BACKENDS = {
+    'orjson': (lambda: orjson is not None, _orjson_backend),
+    'stdlib': (lambda: True, _stdlib_backend),
+}
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by the configured serializer"""
+
+    def __init__(self, app):
+        super().__init__(app)
+        requested = app.config.get('JSON_BACKEND', 'auto')
+        if requested == 'auto':
+            self.backend = next(name for name, (available, _) in BACKENDS.items() if available())
+        elif requested in BACKENDS and BACKENDS[requested][0]():
+            self.backend = requested
+        else:
+            raise ValueError(f'JSON backend {requested!r} is not available')
+        self._dumps_bytes, self._loads = BACKENDS[self.backend][1](self)
+
+    def dumps(self, obj, **kwargs):
+        """Serialize to a str; formatting options fall back to the stdlib"""
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._dumps_bytes(obj).decode()
+
+    def dumps_bytes(self, obj):
+        """Serialize to UTF-8 bytes without an intermediate str"""
+        return self._dumps_bytes(obj)
+
+    def loads(self, s, **kwargs):
+        """Deserialize str or bytes"""
+        if self._loads is None or kwargs:
+            return super().loads(s, **kwargs)
+        return self._loads(s)
+
+    def response(self, *args, **kwargs):
+        """Build a JSON response, pretty printed only in debug mode like the default provider"""
+        obj = self._prepare_response_obj(args, kwargs)
+        if self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(obj)
+        return self._app.response_class(self._dumps_bytes(obj) + b'\n', mimetype=self.mimetype)
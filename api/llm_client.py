@@ -0,0 +1,196 @@
+"""
+Shared HTTP client for LLM providers
+
+Keeps a pooled keep-alive session, retries transient failures (429 and
+5xx) with jittered exponential backoff that honours Retry-After, enforces
+a per-request deadline budget and trips a circuit breaker while the
+upstream is down.
+"""
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+class LLMClientError(Exception):
+    """Base error raised by LLMClient"""
+
+
+class CircuitOpenError(LLMClientError):
+    """Raised without calling upstream while the circuit breaker is open"""
+
+
+class DeadlineExceededError(LLMClientError):
+    """Raised when the request's deadline budget is used up"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a half-open trial call"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Return True if a call may go upstream now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+def _retry_after_seconds(response):
+    """Parse a Retry-After header given in seconds or as an HTTP date"""
+    value = response.headers.get('Retry-After') if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMClient:
+    """Pooled, retrying JSON POST client shared by all LLM calls"""
+
+    def __init__(self, pool_size=10, max_retries=3, backoff_base=0.5, backoff_max=8.0,
+                 attempt_timeout=30.0, deadline=60.0, failure_threshold=5, reset_timeout=30.0):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        # requests is only imported once an LLM call is made, keeping it out of app startup
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @classmethod
+    def from_env(cls):
+        """Build a client from LLM_* environment variables"""
+        return cls(
+            pool_size=int(os.getenv('LLM_POOL_SIZE', '10')),
+            max_retries=int(os.getenv('LLM_MAX_RETRIES', '3')),
+            backoff_base=float(os.getenv('LLM_BACKOFF_BASE', '0.5')),
+            backoff_max=float(os.getenv('LLM_BACKOFF_MAX', '8')),
+            attempt_timeout=float(os.getenv('LLM_ATTEMPT_TIMEOUT', '30')),
+            deadline=float(os.getenv('LLM_DEADLINE', '60')),
+            failure_threshold=int(os.getenv('LLM_BREAKER_THRESHOLD', '5')),
+            reset_timeout=float(os.getenv('LLM_BREAKER_RESET', '30')),
+        )
+
+    def _backoff(self, attempt, response=None):
+        retry_after = _retry_after_seconds(response)
+        if retry_after is not None:
+            return retry_after
+        # Full jitter keeps many clients from retrying in lockstep
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def post_json(self, url, json=None, params=None, headers=None, deadline=None, stream=False):
+        """POST JSON and return the successful response
+
+        deadline is the total time budget in seconds for all attempts and
+        backoff sleeps. Raises CircuitOpenError, DeadlineExceededError or
+        the last requests exception. A call that fails after its retries
+        counts as one failure for the circuit breaker.
+        """
+        import requests
+
+        budget = self.deadline if deadline is None else deadline
+        expires_at = time.monotonic() + budget
+        attempt = 0
+        error = None
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpenError('LLM upstream unavailable (circuit open)')
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                if error is not None:
+                    self.breaker.record_failure()
+                raise DeadlineExceededError(f'LLM request exceeded its {budget:.1f}s deadline')
+
+            response = None
+            try:
+                response = self.session.post(
+                    url, json=json, params=params, headers=headers,
+                    timeout=min(self.attempt_timeout, remaining), stream=stream
+                )
+                if response.status_code not in RETRY_STATUS_CODES:
+                    response.raise_for_status()
+                    self.breaker.record_success()
+                    return response
+                error = requests.HTTPError(f'{response.status_code} from LLM upstream', response=response)
+            except requests.HTTPError:
+                # Non-retryable client errors do not mean the upstream is down
+                self.breaker.record_success()
+                raise
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+
+            # A failed half-open trial reopens the breaker without retrying
+            if attempt >= self.max_retries or self.breaker.state != CircuitBreaker.CLOSED:
+                self.breaker.record_failure()
+                raise error
+            delay = self._backoff(attempt, response)
+            if response is not None:
+                response.close()
+            if time.monotonic() + delay >= expires_at:
+                self.breaker.record_failure()
+                raise error
+            time.sleep(delay)
+            attempt += 1
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client():
+    """Get the process-wide LLM client, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = LLMClient.from_env()
+    return _client
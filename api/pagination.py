@@ -0,0 +1,29 @@
+"""
+Shared query-string handling for paginated list endpoints
+"""
+from urllib.parse import urlencode
+from flask import request, jsonify
+from models.prompt import Prompt as PromptModel
+
+
+def page_args(default_limit=None):
+    """Read limit, cursor and fields from the query string
+
+    Returns (limit, cursor, fields); raises ValueError for bad fields.
+    """
+    limit = request.args.get('limit', default_limit, type=int)
+    cursor = request.args.get('cursor') or None
+    fields = PromptModel.parse_fields(request.args.get('fields'))
+    return limit, cursor, fields
+
+
+def page_response(items, next_cursor=None):
+    """Build a JSON list response carrying the next-page cursor in headers"""
+    response = jsonify(items)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+        args = request.args.to_dict(flat=False)
+        args['cursor'] = [next_cursor]
+        next_url = f'{request.base_url}?{urlencode(args, doseq=True)}'
+        response.headers['Link'] = f'<{next_url}>; rel="next"'
+    return response
@@ -0,0 +1,103 @@
+"""
+Password hashing off the request thread
+
+Hashing and verification run in a small bounded thread pool. hashlib
+releases the GIL while it hashes, so the pool caps how many cores a login
+storm can take while other requests keep running. When more than
+PASSWORD_HASH_MAX_QUEUE calls are already waiting, new ones are rejected
+immediately with PasswordHasherBusy instead of piling up.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = 'pbkdf2:sha256:600000'
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing queue is full or a call waited too long"""
+
+
+class PasswordHasher:
+    """Bounded worker pool for password hashing and verification"""
+
+    def __init__(self, app=None):
+        self.method = DEFAULT_METHOD
+        self.workers = 2
+        self.max_queue = 32
+        self.timeout = 10.0
+        self._slots = None
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pid = None
+        self._dummy_hash = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Configure the pool from PASSWORD_HASH_* settings"""
+        self.method = app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+        self.workers = max(1, int(app.config.get('PASSWORD_HASH_WORKERS') or min(4, os.cpu_count() or 1)))
+        self.max_queue = max(0, int(app.config.get('PASSWORD_HASH_MAX_QUEUE', 32)))
+        self.timeout = float(app.config.get('PASSWORD_HASH_TIMEOUT', 10.0))
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+        self._dummy_hash = None
+        app.extensions['password_hasher'] = self
+
+    def _get_executor(self):
+        # Created lazily, and again after a fork, so every worker process has its own threads
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='password-hash')
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _run(self, fn, *args):
+        if self._slots is None:
+            self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise PasswordHasherBusy('Too many password checks in progress')
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            return future.result(self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise PasswordHasherBusy('Timed out waiting for a password check') from None
+
+    def hash(self, password):
+        """Hash a password with the configured method and cost"""
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        """Check a password against a stored hash
+
+        Pass password_hash=None for an unknown user: a dummy hash is checked
+        so the response takes as long as for a real account.
+        """
+        if password_hash is None:
+            self._run(check_password_hash, self._get_dummy_hash(), password)
+            return False
+        return self._run(check_password_hash, password_hash, password)
+
+    def _get_dummy_hash(self):
+        # Made on first use rather than in init_app, which would add a full hash to startup
+        if self._dummy_hash is None:
+            self._dummy_hash = self._run(generate_password_hash, os.urandom(16).hex(), self.method)
+        return self._dummy_hash
+
+    def needs_rehash(self, password_hash):
+        """Whether a stored hash was made with a different method or cost"""
+        # Compare with the prefix Werkzeug writes, since a shorthand such as
+        # 'scrypt' or 'pbkdf2' is stored with its defaults filled in
+        return password_hash.split('$', 1)[0] != self._get_dummy_hash().split('$', 1)[0]
+
+
+password_hasher = PasswordHasher()
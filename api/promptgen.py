@@ -1,18 +1,82 @@
-from flask import Blueprint, request, jsonify, session
-from api.gemini_llm import generate_prompt
+from flask import Blueprint, request, jsonify, session, Response, stream_with_context, current_app
+from api.gemini_llm import (
+    GenerationError, generate_prompt, request_deadline, request_bypass_cache, stream_prompt
+)
+from api.generation_cache import get_generation_cache
+from api.singleflight import generation_flight
 from models.user import User
 
 promptgen_bp = Blueprint('promptgen', __name__)
 
+def _resolve_user_info(data):
+    user_info = data.get('user', {})
+    # Optionally, get user from session if not provided
+    if not user_info and 'user_id' in session:
+        # Cached, so authenticated generations do not query the users table
+        profile = User.get_profile(session['user_id'])
+        if profile:
+            user_info = {'email': profile['email'], 'name': profile['name']}
+    return user_info
+
 @promptgen_bp.route('/api/generate-prompt', methods=['POST'])
 def generate_prompt_api():
     data = request.get_json()
     user_context = data.get('context', '')
-    user_info = data.get('user', {})
-    # Optionally, get user from session if not provided
-    if not user_info and 'user_id' in session:
-        user = User.query.get(session['user_id'])
-        if user:
-            user_info = {'email': user.email, 'name': getattr(user, 'name', None)}
-    prompt = generate_prompt(user_context, user_info)
+    try:
+        deadline = request_deadline(data)
+        use_cache = not request_bypass_cache(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    user_info = _resolve_user_info(data)
+    prompt = generate_prompt(user_context, user_info, deadline=deadline, use_cache=use_cache)
     return jsonify({'prompt': prompt})
+
+def _sse(data, event=None):
+    """Format one Server-Sent Event"""
+    lines = [f'event: {event}'] if event else []
+    lines.append(f'data: {current_app.json.dumps(data)}')
+    return '\n'.join(lines) + '\n\n'
+
+@promptgen_bp.route('/api/generate-prompt/stream', methods=['POST'])
+def generate_prompt_stream_api():
+    """Stream a generated prompt as Server-Sent Events
+    
+    Emits `data: {"text": ...}` chunks, then `event: done` with the full
+    prompt, or `event: error` if generation fails.
+    """
+    data = request.get_json() or {}
+    user_context = data.get('context', '')
+    try:
+        deadline = request_deadline(data)
+        use_cache = not request_bypass_cache(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    user_info = _resolve_user_info(data)
+    chunks = stream_prompt(user_context, user_info, deadline=deadline, use_cache=use_cache)
+    
+    def events():
+        text = []
+        try:
+            for chunk in chunks:
+                text.append(chunk)
+                yield _sse({'text': chunk})
+        except GenerationError as e:
+            yield _sse({'error': f"[Error: Could not generate prompt: {str(e)}]"}, event='error')
+            return
+        finally:
+            # Runs on client disconnect too, closing the upstream request
+            chunks.close()
+        yield _sse({'prompt': ''.join(text)}, event='done')
+    
+    response = Response(stream_with_context(events()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@promptgen_bp.route('/api/generate-prompt/cache', methods=['GET'])
+def generation_cache_stats():
+    return jsonify(get_generation_cache().stats())
+
+@promptgen_bp.route('/api/generate-prompt/coalescing', methods=['GET'])
+def generation_coalescing_stats():
+    return jsonify(generation_flight.stats())
@@ -2,11 +2,22 @@
 Prompts API endpoints
 """
 
-from flask import Blueprint, request, jsonify
+from collections import Counter
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 from models import db, Prompt
 from models.prompt import Prompt as PromptModel
 from models.category import Category as CategoryModel
-from api.gemini_llm import generate_prompt
+from models.template import TemplateVariableError
+from models.usage import usage_recorder
+from models.pagination import InvalidCursor
+from models.routing import read_replica
+from models.variables import prompt_ids_using
+from api.compression import chunked
+from api.conditional import catalog_conditional, conditional_response, usage_conditional
+from api.pagination import page_args, page_response
+from api.gemini_llm import (
+    generate_prompt, generate_prompts_concurrently, request_deadline, request_bypass_cache
+)
 
 prompts_bp = Blueprint('prompts', __name__, url_prefix='/api/prompts')
 
@@ -19,28 +30,106 @@ def generate_prompt_api():
         user_info = data.get('user_info')
         if not user_context:
             return jsonify({'error': 'user_context is required'}), 400
-        prompt = generate_prompt(user_context, user_info)
+        try:
+            deadline = request_deadline(data)
+            use_cache = not request_bypass_cache(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        prompt = generate_prompt(user_context, user_info, deadline=deadline, use_cache=use_cache)
         return jsonify({'generated_prompt': prompt})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@prompts_bp.route('/generate/batch', methods=['POST'])
+def generate_prompts_batch_api():
+    """Generate prompts for many contexts in parallel, streamed as NDJSON
+    
+    Each line carries the item's index; lines arrive as calls complete
+    unless "ordered" is true.
+    """
+    try:
+        data = request.get_json() or {}
+        items = data.get('items')
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'items must be a non-empty list of {user_context, user_info}'}), 400
+        max_items = current_app.config.get('BATCH_GENERATE_MAX_ITEMS', 100)
+        if len(items) > max_items:
+            return jsonify({'error': f'Batch exceeds the limit of {max_items} items'}), 400
+        
+        work = []
+        for item in items:
+            if not isinstance(item, dict) or not item.get('user_context'):
+                return jsonify({'error': 'each item requires a user_context'}), 400
+            work.append((item['user_context'], item.get('user_info')))
+        
+        # Validated here: the generator only runs after the 200 headers are sent
+        max_parallel = data.get('max_parallel')
+        if max_parallel is not None and (
+                isinstance(max_parallel, bool) or not isinstance(max_parallel, int) or max_parallel < 1):
+            return jsonify({'error': 'max_parallel must be a positive integer'}), 400
+        ordered = data.get('ordered', False)
+        if not isinstance(ordered, bool):
+            return jsonify({'error': 'ordered must be true or false'}), 400
+        try:
+            deadline = request_deadline(data)
+            use_cache = not request_bypass_cache(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        results = generate_prompts_concurrently(
+            work,
+            max_parallel=max_parallel,
+            deadline=deadline,
+            use_cache=use_cache,
+            ordered=ordered
+        )
+        
+        dumps = current_app.json.dumps
+        
+        def generate():
+            for index, prompt, error in results:
+                row = {'index': index}
+                if error is None:
+                    row['generated_prompt'] = prompt
+                else:
+                    row['error'] = error
+                yield dumps(row) + '\n'
+        
+        # The app context carries over to the batch's worker threads
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @prompts_bp.route('', methods=['GET'])
+@read_replica
+@catalog_conditional
 def get_prompts():
-    """Get all prompts with optional filtering"""
+    """Get all prompts with optional filtering, fields and cursor pagination
+    
+    Repeat ?variable=name to list only prompts that use all of those variables.
+    """
     try:
         category_id = request.args.get('category_id', type=int)
         search = request.args.get('search', '')
+        variables = request.args.getlist('variable')
+        limit, cursor, fields = page_args()
         
-        if category_id and search:
-            prompts = PromptModel.search(search, category_id)
-        elif category_id:
-            prompts = PromptModel.get_by_category(category_id)
-        elif search:
-            prompts = PromptModel.search(search)
+        if search and variables:
+            return jsonify({'error': 'variable cannot be combined with search'}), 400
+        if search:
+            results, next_cursor = PromptModel.search_page(search, category_id, cursor, limit, fields)
+            prompts = [prompt for prompt, _ in results]
         else:
-            prompts = PromptModel.query.all()
+            query = PromptModel.query
+            if category_id:
+                query = query.filter_by(category_id=category_id)
+            if variables:
+                query = query.filter(PromptModel.id.in_(prompt_ids_using(variables)))
+            prompts, next_cursor = PromptModel.page(query, 'id', cursor, limit, fields)
         
-        return jsonify([prompt.to_dict() for prompt in prompts])
+        return page_response([prompt.to_dict(fields) for prompt in prompts], next_cursor)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -77,11 +166,12 @@ def create_prompt():
         return jsonify({'error': str(e)}), 500
 
 @prompts_bp.route('/<int:prompt_id>', methods=['GET'])
+@read_replica
 def get_prompt(prompt_id):
     """Get a specific prompt"""
     try:
         prompt = PromptModel.query.get_or_404(prompt_id)
-        return jsonify(prompt.to_dict())
+        return conditional_response(jsonify(prompt.to_dict()))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -126,6 +216,13 @@ def delete_prompt(prompt_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+def _strict_flag(data):
+    """Read the optional JSON boolean "strict"; raises ValueError for any other type"""
+    strict = data.get('strict', False)
+    if not isinstance(strict, bool):
+        raise ValueError('strict must be true or false')
+    return strict
+
 @prompts_bp.route('/<int:prompt_id>/use', methods=['POST'])
 def use_prompt(prompt_id):
     """Use a prompt with variable substitution"""
@@ -134,54 +231,161 @@ def use_prompt(prompt_id):
         data = request.get_json() or {}
         
         variable_values = data.get('variables', {})
-        final_content = prompt.use_with_variables(variable_values)
-        
-        db.session.commit()
+        try:
+            strict = _strict_flag(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        try:
+            final_content = prompt.use_with_variables(variable_values, strict=strict)
+        except TemplateVariableError as e:
+            return jsonify({
+                'error': str(e),
+                'missing_variables': e.missing,
+                'unknown_variables': e.unknown
+            }), 400
         
         return jsonify({
             'id': prompt.id,
             'title': prompt.title,
             'final_content': final_content,
-            'usage_count': prompt.usage_count
+            'usage_count': prompt.get_usage_count()
         })
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+def _parse_batch_items(data, prompt_id=None):
+    """Normalize a batch render request body into (prompt_id, variables) items"""
+    if prompt_id is not None:
+        variable_sets = data.get('variables')
+        if not isinstance(variable_sets, list):
+            raise ValueError('variables must be a list of variable objects')
+        return [(prompt_id, variables) for variables in variable_sets]
+    
+    items = data.get('items')
+    if not isinstance(items, list):
+        raise ValueError('items must be a list of {prompt_id, variables} objects')
+    parsed = []
+    for item in items:
+        if not isinstance(item, dict) or 'prompt_id' not in item:
+            raise ValueError('each item requires a prompt_id')
+        parsed.append((int(item['prompt_id']), item.get('variables') or {}))
+    return parsed
+
+def _load_templates(prompt_ids):
+    """Load compiled templates for all prompts in the batch with one query"""
+    prompts = PromptModel.query.filter(PromptModel.id.in_(prompt_ids)).all()
+    return {prompt.id: prompt.get_template() for prompt in prompts}
+
+def _render_batch(items, templates, strict=False):
+    """Stream rendered batch items as NDJSON and record usage once at the end"""
+    dumps = current_app.json.dumps
+    
+    def generate():
+        usage = Counter()
+        try:
+            for index, (prompt_id, variables) in enumerate(items):
+                row = {'index': index, 'prompt_id': prompt_id}
+                template = templates.get(prompt_id)
+                if template is None:
+                    row['error'] = 'Prompt not found'
+                elif not isinstance(variables, dict):
+                    row['error'] = 'variables must be an object'
+                else:
+                    try:
+                        row['final_content'] = template.render(variables, strict=strict)
+                        usage[prompt_id] += 1
+                    except TemplateVariableError as e:
+                        row['error'] = str(e)
+                        row['missing_variables'] = e.missing
+                        row['unknown_variables'] = e.unknown
+                yield dumps(row) + '\n'
+        finally:
+            # Record usage for everything rendered, even if the client went away
+            usage_recorder.record_many(usage)
+    
+    # Rows render quickly, so send them in chunks that compress well
+    return Response(stream_with_context(chunked(generate())), mimetype='application/x-ndjson')
+
+def _batch_use(prompt_id=None):
+    data = request.get_json() or {}
+    try:
+        items = _parse_batch_items(data, prompt_id)
+        strict = _strict_flag(data)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    max_items = current_app.config.get('BATCH_RENDER_MAX_ITEMS', 10000)
+    if len(items) > max_items:
+        return jsonify({'error': f'Batch exceeds the limit of {max_items} items'}), 400
+    
+    templates = _load_templates({item_prompt_id for item_prompt_id, _ in items} | {prompt_id} - {None})
+    if prompt_id is not None and prompt_id not in templates:
+        return jsonify({'error': 'Prompt not found'}), 404
+    
+    return _render_batch(items, templates, strict=strict)
+
+@prompts_bp.route('/<int:prompt_id>/use/batch', methods=['POST'])
+def batch_use_prompt(prompt_id):
+    """Render one prompt with many variable sets, streamed as NDJSON"""
+    try:
+        return _batch_use(prompt_id)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@prompts_bp.route('/use/batch', methods=['POST'])
+def batch_use_prompts():
+    """Render many prompt/variable pairs, streamed as NDJSON"""
+    try:
+        return _batch_use()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @prompts_bp.route('/search', methods=['GET'])
+@read_replica
+@catalog_conditional
 def search_prompts():
     """Search prompts with advanced filtering"""
     try:
         search_term = request.args.get('q', '')
         category_id = request.args.get('category_id', type=int)
-        limit = request.args.get('limit', 50, type=int)
-        
-        prompts = PromptModel.search(search_term, category_id)
+        limit, cursor, fields = page_args(default_limit=50)
         
-        # Apply limit
-        if limit > 0:
-            prompts = prompts[:limit]
+        results, next_cursor = PromptModel.search_page(search_term, category_id, cursor, limit, fields)
         
-        return jsonify([prompt.to_dict() for prompt in prompts])
+        return page_response([
+            dict(prompt.to_dict(fields), snippet=snippet)
+            for prompt, snippet in results
+        ], next_cursor)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @prompts_bp.route('/most-used', methods=['GET'])
+@read_replica
+@usage_conditional
 def get_most_used_prompts():
     """Get most used prompts"""
     try:
-        limit = request.args.get('limit', 10, type=int)
-        prompts = PromptModel.get_most_used(limit)
-        return jsonify([prompt.to_dict() for prompt in prompts])
+        limit, cursor, fields = page_args(default_limit=10)
+        prompts, next_cursor = PromptModel.page(None, 'most_used', cursor, limit, fields)
+        return page_response([prompt.to_dict(fields) for prompt in prompts], next_cursor)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @prompts_bp.route('/recent', methods=['GET'])
+@read_replica
+@catalog_conditional
 def get_recent_prompts():
     """Get recently created prompts"""
     try:
-        limit = request.args.get('limit', 10, type=int)
-        prompts = PromptModel.get_recent(limit)
-        return jsonify([prompt.to_dict() for prompt in prompts])
+        limit, cursor, fields = page_args(default_limit=10)
+        prompts, next_cursor = PromptModel.page(None, 'recent', cursor, limit, fields)
+        return page_response([prompt.to_dict(fields) for prompt in prompts], next_cursor)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
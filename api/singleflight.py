@@ -0,0 +1,101 @@
+"""
+Single-flight coalescing of identical in-flight LLM generations
+
+Concurrent calls with the same key share one upstream call. Within a
+process this uses an in-memory table of in-flight calls; with
+LLM_COALESCE_MODE=database the leader is also elected across workers
+through the generation_locks table. Streamed generations are not
+coalesced: a follower could only replay the stream after it finished.
+"""
+import os
+import threading
+from flask import has_app_context
+
+COALESCE_MODE = os.environ.get("LLM_COALESCE_MODE", "thread")  # thread, database or off
+# Seconds added to the LLM deadline for the cross-worker lease, covering retries' last response
+LEASE_MARGIN = float(os.environ.get("LLM_COALESCE_LEASE_MARGIN", "10"))
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one"""
+
+    def __init__(self, mode=COALESCE_MODE):
+        self.mode = mode
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leader_calls = 0
+        self.coalesced_calls = 0
+        self.coalesced_across_workers = 0
+
+    def do(self, key, fn, timeout=None):
+        """Run fn once for all concurrent callers with the same key
+
+        Followers wait up to timeout seconds for the leader and then give
+        up with TimeoutError. The leader's exception is raised in every
+        caller.
+        """
+        if self.mode == 'off':
+            return fn()
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leader_calls += 1
+            else:
+                self.coalesced_calls += 1
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise TimeoutError('Timed out waiting for an identical in-flight generation')
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run_leader(key, fn)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def _run_leader(self, key, fn):
+        if self.mode != 'database' or not has_app_context():
+            return fn()
+        from api.llm_client import get_llm_client
+        from models.generation_lock import GenerationLock
+        # The lease must outlive the leader's upstream call, or a follower takes over and calls again
+        lease = get_llm_client().deadline + LEASE_MARGIN
+        result, coalesced = GenerationLock.run_once(key, fn, wait_timeout=lease, lease=lease)
+        if coalesced:
+            with self._lock:
+                self.coalesced_across_workers += 1
+        return result
+
+    def stats(self):
+        """Get coalescing counters"""
+        with self._lock:
+            return {
+                'mode': self.mode,
+                'in_flight': len(self._calls),
+                'leader_calls': self.leader_calls,
+                'coalesced_calls': self.coalesced_calls,
+                'coalesced_across_workers': self.coalesced_across_workers,
+            }
+
+
+generation_flight = SingleFlight()
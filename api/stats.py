@@ -1,40 +1,35 @@
 """
 Statistics API endpoints
 """
-from flask import Blueprint, jsonify
+from datetime import date, datetime, timedelta
+from flask import Blueprint, current_app, request, jsonify
 from models import db, Category, Prompt
 from models.category import Category as CategoryModel
 from models.prompt import Prompt as PromptModel
+from models.stats import get_overview, get_category_breakdown
+from models.usage_log import daily_usage, trending_prompt_ids
+from models.routing import read_replica
+from models.variables import variable_frequencies
+from api.conditional import catalog_conditional
 from sqlalchemy import func
 
 stats_bp = Blueprint('stats', __name__, url_prefix='/api/stats')
 
 @stats_bp.route('', methods=['GET'])
+@read_replica
 def get_stats():
     """Get overall application statistics"""
     try:
-        # Total counts
-        total_categories = CategoryModel.query.count()
-        total_prompts = PromptModel.query.count()
-        total_usage = db.session.query(func.sum(PromptModel.usage_count)).scalar() or 0
+        # Totals and category breakdown come from the maintained statistics store
+        overview = get_overview()
+        category_stats = get_category_breakdown()
         
         # Recent activity
-        recent_prompts = PromptModel.query.order_by(PromptModel.created_at.desc()).limit(5).all()
-        most_used_prompts = PromptModel.query.order_by(PromptModel.usage_count.desc()).limit(5).all()
-        
-        # Category breakdown
-        category_stats = db.session.query(
-            CategoryModel.name,
-            func.count(PromptModel.id).label('prompt_count'),
-            func.sum(PromptModel.usage_count).label('total_usage')
-        ).outerjoin(PromptModel).group_by(CategoryModel.id, CategoryModel.name).all()
+        recent_prompts = PromptModel.get_recent(5)
+        most_used_prompts = PromptModel.get_most_used(5)
         
         return jsonify({
-            'overview': {
-                'total_categories': total_categories,
-                'total_prompts': total_prompts,
-                'total_usage': int(total_usage)
-            },
+            'overview': overview,
             'recent_prompts': [prompt.to_dict() for prompt in recent_prompts],
             'most_used_prompts': [prompt.to_dict() for prompt in most_used_prompts],
             'category_breakdown': [
@@ -50,55 +45,103 @@ def get_stats():
         return jsonify({'error': str(e)}), 500
 
 @stats_bp.route('/usage', methods=['GET'])
+@read_replica
 def get_usage_stats():
-    """Get usage statistics"""
+    """Get usage statistics
+    
+    Daily usage is read from the usage rollups for the requested range:
+    either start/end dates (YYYY-MM-DD) or the last `days` days (default 30).
+    """
     try:
-        # Daily usage (last 30 days)
-        daily_usage = db.session.query(
-            func.date(PromptModel.updated_at).label('date'),
-            func.sum(PromptModel.usage_count).label('usage')
-        ).filter(
-            PromptModel.updated_at >= func.date_sub(func.now(), 30)
-        ).group_by(func.date(PromptModel.updated_at)).all()
+        today = datetime.utcnow().date()
+        days = request.args.get('days', 30, type=int)
+        end = _parse_date(request.args.get('end')) or today
+        start = _parse_date(request.args.get('start')) or end - timedelta(days=max(days, 1) - 1)
+        if start > end:
+            return jsonify({'error': 'start must not be after end'}), 400
+        
+        daily = daily_usage(start, end)
         
-        # Category usage
-        category_usage = db.session.query(
-            CategoryModel.name,
-            func.sum(PromptModel.usage_count).label('total_usage'),
-            func.avg(PromptModel.usage_count).label('avg_usage')
-        ).join(PromptModel).group_by(CategoryModel.id, CategoryModel.name).all()
+        # Category usage from the maintained statistics store
+        category_usage = get_category_breakdown()
         
         return jsonify({
+            'start': start.isoformat(),
+            'end': end.isoformat(),
             'daily_usage': [
                 {
                     'date': str(stat.date),
                     'usage': int(stat.usage or 0)
                 }
-                for stat in daily_usage
+                for stat in daily
             ],
             'category_usage': [
                 {
                     'category_name': stat.name,
                     'total_usage': int(stat.total_usage or 0),
-                    'average_usage': float(stat.avg_usage or 0)
+                    'average_usage': float(stat.total_usage or 0) / stat.prompt_count if stat.prompt_count else 0.0
                 }
                 for stat in category_usage
+                if stat.prompt_count
             ]
         })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @stats_bp.route('/prompts/trending', methods=['GET'])
+@read_replica
 def get_trending_prompts():
     """Get trending prompts based on recent usage"""
     try:
         limit = request.args.get('limit', 10, type=int)
+        days = request.args.get('days', 7, type=int)
+        # Older hourly rollups are dropped, so a longer window would undercount
+        max_days = current_app.config.get('USAGE_HOURLY_RETENTION_DAYS', 90)
+        if not 1 <= days <= max_days:
+            return jsonify({'error': f'days must be between 1 and {max_days}'}), 400
         
-        # Get prompts with usage in the last 7 days
-        trending_prompts = PromptModel.query.filter(
-            PromptModel.updated_at >= func.date_sub(func.now(), 7)
-        ).order_by(PromptModel.usage_count.desc()).limit(limit).all()
+        # Most used prompts over the window, from the hourly usage rollups
+        trending = trending_prompt_ids(datetime.utcnow() - timedelta(days=days), limit)
+        prompts = {
+            prompt.id: prompt
+            for prompt in PromptModel.with_fields(
+                PromptModel.query.filter(PromptModel.id.in_([row.prompt_id for row in trending]))
+            ).all()
+        }
         
-        return jsonify([prompt.to_dict() for prompt in trending_prompts])
+        return jsonify([
+            dict(prompts[row.prompt_id].to_dict(), recent_usage=int(row.uses))
+            for row in trending
+            if row.prompt_id in prompts
+        ])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@stats_bp.route('/variables', methods=['GET'])
+@read_replica
+@catalog_conditional
+def get_variable_stats():
+    """Get how many prompts use each variable, most used first
+    
+    Optional ?prefix= narrows the names; ?limit= caps the list (default 50, 0 for all).
+    """
+    try:
+        limit = request.args.get('limit', 50, type=int)
+        prefix = request.args.get('prefix') or None
+        return jsonify([
+            {'name': row.name, 'prompt_count': row.prompt_count}
+            for row in variable_frequencies(limit, prefix)
+        ])
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+def _parse_date(value):
+    """Parse an optional YYYY-MM-DD query parameter"""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'Invalid date: {value}')
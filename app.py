@@ -5,7 +5,18 @@ import os
 from flask import Flask, render_template
 from flask_cors import CORS
 from models import db
+from models.database import check_database
+from models.catalog import ensure_catalog_version
 from models.category import Category as CategoryModel
+from models.routing import init_replicas
+from models.migrations import upgrade as upgrade_schema
+from models.search import ensure_search_index
+from models.sqlite_tuning import sqlite_maintenance
+from models.stats import ensure_stats
+from models.usage import usage_recorder
+from api.compression import compression
+from api.json_provider import FastJSONProvider
+from api.passwords import password_hasher
 from config import config
 
 def create_app(config_name=None):
@@ -15,19 +26,34 @@ def create_app(config_name=None):
     # Load configuration
     config_name = config_name or os.getenv('FLASK_ENV', 'default')
     app.config.from_object(config[config_name])
+    config[config_name].init_app(app)
+    app.json = FastJSONProvider(app)
     
     # Initialize extensions
     db.init_app(app)
+    init_replicas(app)
+    sqlite_maintenance.init_app(app)
+    usage_recorder.init_app(app)
     CORS(app)
+    compression.init_app(app)
+    password_hasher.init_app(app)
     
     # Register blueprints
-    from api import categories_bp, prompts_bp, stats_bp, auth_bp, promptgen_bp, users_bp
+    from api import categories_bp, prompts_bp, stats_bp, auth_bp, promptgen_bp, users_bp, bulk_bp
     app.register_blueprint(categories_bp)
     app.register_blueprint(prompts_bp)
     app.register_blueprint(stats_bp)
     app.register_blueprint(auth_bp)
     app.register_blueprint(promptgen_bp)
     app.register_blueprint(users_bp)
+    app.register_blueprint(bulk_bp)
+    
+    # Register CLI commands
+    from cli import stats_cli, data_cli, sqlite_cli, db_cli
+    app.cli.add_command(db_cli)
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(data_cli)
+    app.cli.add_command(sqlite_cli)
     
     # Routes
     @app.route('/')
@@ -36,25 +62,53 @@ def create_app(config_name=None):
         return render_template('index.html')
     
     @app.route('/health')
+    @app.route('/health/live')
     def health_check():
-        """Health check endpoint"""
+        """Liveness check: the process serves requests; never touches the database"""
         return {'status': 'healthy', 'message': 'Prompt Builder API is running'}
     
-    # Database initialization (Flask 2.3+ removed before_first_request)
-    with app.app_context():
-        db.create_all()
-        # Create default category if none exists
-        CategoryModel.get_or_create_default()
+    @app.route('/health/ready')
+    def readiness_check():
+        """Readiness check: every database pool hands out a working connection"""
+        databases = check_database(app.config['HEALTH_CHECK_TIMEOUT'])
+        ready = all(result['ok'] for result in databases.values())
+        return {'status': 'ready' if ready else 'unavailable', 'databases': databases}, 200 if ready else 503
     
     return app
 
-# Create the application instance
-app = create_app()
 
-if __name__ == '__main__':
+def init_database(app):
+    """Create the schema, apply migrations and seed required rows
+
+    Run once per deploy (``flask --app app db init``); safe to re-run.
+    """
     with app.app_context():
+        url = db.engine.url
+        if url.get_backend_name() == 'sqlite' and url.database and url.database != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(url.database)), exist_ok=True)
         db.create_all()
+        upgrade_schema()
+        ensure_search_index()
+        ensure_stats()
+        ensure_catalog_version()
         # Create default category if none exists
         CategoryModel.get_or_create_default()
-    
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+
+
+_app = None
+
+
+def __getattr__(name):
+    """Create the module-level ``app`` on first access, e.g. by ``flask --app app`` or a WSGI server"""
+    global _app
+    if name != 'app':
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    if _app is None:
+        _app = create_app()
+    return _app
+
+
+if __name__ == '__main__':
+    app = create_app()
+    init_database(app)
+    app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Local Gemini stand-in server for load tests
+
+Serves generateContent and streamGenerateContent (alt=sse) with configurable
+latency, 429/5xx fault rates and truncated responses. Point the app at it
+with:
+
+    GEMINI_API_BASE=http://localhost:8089/v1beta python run.py
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PATH_PATTERN = re.compile(r'^/v1beta/models/(?P<model>[^/:]+):(?P<method>generateContent|streamGenerateContent)$')
+
+
+class FakeGeminiConfig:
+    """Fault and latency settings for the fake server"""
+
+    def __init__(self, latency='fixed', latency_ms=200.0, latency_stddev_ms=50.0, rate_429=0.0,
+                 rate_5xx=0.0, retry_after=1.0, truncate_rate=0.0, chunks=5, chunk_delay_ms=50.0,
+                 seed=None):
+        self.latency = latency
+        self.latency_ms = latency_ms
+        self.latency_stddev_ms = latency_stddev_ms
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.retry_after = retry_after
+        self.truncate_rate = truncate_rate
+        self.chunks = chunks
+        self.chunk_delay_ms = chunk_delay_ms
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counters = {'requests': 0, '200': 0, '429': 0, '5xx': 0, 'truncated': 0}
+
+    def sample_latency(self):
+        """Draw one response latency in seconds from the configured distribution"""
+        mean, stddev = self.latency_ms, self.latency_stddev_ms
+        with self.lock:
+            if self.latency == 'uniform':
+                value = self.random.uniform(max(0.0, mean - stddev), mean + stddev)
+            elif self.latency == 'normal':
+                value = self.random.gauss(mean, stddev)
+            elif self.latency == 'lognormal':
+                # Parameterised so the distribution has the requested mean and stddev
+                variance = (stddev / mean) ** 2 if mean else 0.0
+                sigma = math.sqrt(math.log(1 + variance))
+                mu = math.log(mean) - sigma ** 2 / 2 if mean else 0.0
+                value = self.random.lognormvariate(mu, sigma) if mean else 0.0
+            elif self.latency == 'exponential':
+                value = self.random.expovariate(1.0 / mean) if mean else 0.0
+            else:
+                value = mean
+        return max(0.0, value) / 1000.0
+
+    def roll(self, rate):
+        with self.lock:
+            return self.random.random() < rate
+
+    def count(self, name):
+        with self.lock:
+            self.counters['requests' if name is None else name] += 1
+
+
+def _generated_text(body):
+    try:
+        context = body['contents'][-1]['parts'][0]['text']
+    except (KeyError, IndexError, TypeError):
+        context = ''
+    return f'You are a helpful assistant. Help the user with: {context}'.strip()
+
+
+def _candidate(text):
+    return {'candidates': [{'content': {'role': 'model', 'parts': [{'text': text}]}}]}
+
+
+def make_handler(config):
+    """Build a request handler class bound to a FakeGeminiConfig"""
+
+    class FakeGeminiHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body go out in separate writes; don't let Nagle delay the body
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/stats':
+                with config.lock:
+                    self._send_json(200, dict(config.counters))
+            else:
+                self._send_json(404, {'error': {'code': 404, 'message': 'Not found'}})
+
+        def do_POST(self):
+            path = self.path.split('?', 1)[0]
+            match = PATH_PATTERN.match(path)
+            length = int(self.headers.get('Content-Length') or 0)
+            raw = self.rfile.read(length) if length else b''
+            if not match:
+                self._send_json(404, {'error': {'code': 404, 'message': 'Not found'}})
+                return
+            config.count(None)
+
+            time.sleep(config.sample_latency())
+            if config.roll(config.rate_429):
+                config.count('429')
+                self._send_json(429, {'error': {'code': 429, 'message': 'Resource exhausted'}},
+                                {'Retry-After': f'{config.retry_after:g}'})
+                return
+            if config.roll(config.rate_5xx):
+                config.count('5xx')
+                status = config.random.choice([500, 502, 503, 504])
+                self._send_json(status, {'error': {'code': status, 'message': 'Upstream failure'}})
+                return
+
+            try:
+                body = json.loads(raw or b'{}')
+            except ValueError:
+                self._send_json(400, {'error': {'code': 400, 'message': 'Invalid JSON'}})
+                return
+            text = _generated_text(body)
+            truncate = config.roll(config.truncate_rate)
+            if truncate:
+                config.count('truncated')
+            else:
+                config.count('200')
+
+            if match.group('method') == 'streamGenerateContent':
+                self._stream(text, truncate)
+            elif truncate:
+                payload = json.dumps(_candidate(text)).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                # Promise the full body but send half of it, then hang up
+                self.wfile.write(payload[:len(payload) // 2])
+                self.close_connection = True
+            else:
+                self._send_json(200, _candidate(text))
+
+        def _stream(self, text, truncate):
+            words = text.split(' ')
+            size = max(1, -(-len(words) // max(1, config.chunks)))
+            pieces = [' '.join(words[i:i + size]) + ' ' for i in range(0, len(words), size)]
+            if truncate:
+                pieces = pieces[:max(1, len(pieces) // 2)]
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            try:
+                for piece in pieces:
+                    event = f'data: {json.dumps(_candidate(piece))}\r\n\r\n'.encode('utf-8')
+                    self.wfile.write(b'%x\r\n%s\r\n' % (len(event), event))
+                    self.wfile.flush()
+                    time.sleep(config.chunk_delay_ms / 1000.0)
+                if truncate:
+                    # Drop the connection without the terminating chunk
+                    self.close_connection = True
+                    return
+                self.wfile.write(b'0\r\n\r\n')
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+
+    return FakeGeminiHandler
+
+
+def start_server(config, host='127.0.0.1', port=0):
+    """Start the fake server in a background thread and return it"""
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='fake-gemini', daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    """Run the fake Gemini server"""
+    parser = argparse.ArgumentParser(description='Local Gemini stand-in with latency and fault injection')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', choices=['fixed', 'uniform', 'normal', 'lognormal', 'exponential'],
+                        default='fixed', help='latency distribution')
+    parser.add_argument('--latency-ms', type=float, default=200.0, help='mean latency in milliseconds')
+    parser.add_argument('--latency-stddev-ms', type=float, default=50.0, help='latency spread in milliseconds')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='fraction of requests answered with 429')
+    parser.add_argument('--rate-5xx', type=float, default=0.0, help='fraction of requests answered with 5xx')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='Retry-After seconds sent with 429')
+    parser.add_argument('--truncate-rate', type=float, default=0.0, help='fraction of truncated responses')
+    parser.add_argument('--chunks', type=int, default=5, help='number of chunks per streamed response')
+    parser.add_argument('--chunk-delay-ms', type=float, default=50.0, help='delay between streamed chunks')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    config = FakeGeminiConfig(
+        latency=args.latency, latency_ms=args.latency_ms, latency_stddev_ms=args.latency_stddev_ms,
+        rate_429=args.rate_429, rate_5xx=args.rate_5xx, retry_after=args.retry_after,
+        truncate_rate=args.truncate_rate, chunks=args.chunks, chunk_delay_ms=args.chunk_delay_ms,
+        seed=args.seed
+    )
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(config))
+    server.daemon_threads = True
+    print(f'🤖 Fake Gemini listening on http://{args.host}:{args.port}/v1beta')
+    print(f'   GEMINI_API_BASE=http://{args.host}:{args.port}/v1beta')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print('\n👋 Fake Gemini stopped.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Load benchmark for the prompt generation endpoints
+
+Drives /api/generate-prompt, /api/prompts/generate and the SSE stream
+endpoint at a target concurrency and reports throughput and latency
+percentiles. Run it against an app pointed at benchmarks/fake_gemini.py:
+
+    python benchmarks/fake_gemini.py --latency lognormal --latency-ms 800 --rate-429 0.05 &
+    GEMINI_API_BASE=http://127.0.0.1:8089/v1beta python run.py &
+    python benchmarks/promptgen_load.py --concurrency 32 --requests 2000
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from collections import Counter
+
+import requests
+
+ENDPOINTS = {
+    'generate-prompt': ('/api/generate-prompt', 'context', 'prompt'),
+    'prompts-generate': ('/api/prompts/generate', 'user_context', 'generated_prompt'),
+    'stream': ('/api/generate-prompt/stream', 'context', None),
+}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def _payload(endpoint, request_number, unique_ratio, bypass_cache):
+    _, field, _ = ENDPOINTS[endpoint]
+    # unique_ratio controls how many requests share a context (cache and coalescing hits)
+    if unique_ratio >= 1 or (request_number * unique_ratio) % 1 < unique_ratio:
+        context = f'Write an onboarding email for team member {uuid.uuid4().hex[:8]}'
+    else:
+        context = 'Write an onboarding email for a new team member'
+    payload = {field: context}
+    if bypass_cache:
+        payload['bypass_cache'] = True
+    return payload
+
+
+def _is_error(endpoint, response):
+    if response.status_code != 200:
+        return True
+    _, _, result_field = ENDPOINTS[endpoint]
+    if result_field is None:
+        return 'event: error' in response.text
+    return str(response.json().get(result_field, '')).startswith('[Error')
+
+
+def run(base_url, endpoints, concurrency, total_requests, duration, unique_ratio, bypass_cache, timeout):
+    """Run the load test and return a results dictionary"""
+    latencies = {endpoint: [] for endpoint in endpoints}
+    ttfb = {endpoint: [] for endpoint in endpoints}
+    outcomes = {endpoint: Counter() for endpoint in endpoints}
+    lock = threading.Lock()
+    counter = iter(range(total_requests or 10 ** 12))
+    stop_at = time.monotonic() + duration if duration else None
+
+    def worker():
+        session = requests.Session()
+        while True:
+            if stop_at and time.monotonic() >= stop_at:
+                return
+            with lock:
+                number = next(counter, None)
+            if number is None:
+                return
+            endpoint = endpoints[number % len(endpoints)]
+            path = ENDPOINTS[endpoint][0]
+            started = time.perf_counter()
+            first_byte = None
+            try:
+                response = session.post(
+                    base_url + path, json=_payload(endpoint, number, unique_ratio, bypass_cache),
+                    timeout=timeout, stream=endpoint == 'stream'
+                )
+                if endpoint == 'stream':
+                    body = []
+                    for chunk in response.iter_content(chunk_size=None):
+                        if first_byte is None:
+                            first_byte = time.perf_counter() - started
+                        body.append(chunk)
+                    response._content = b''.join(body)
+                outcome = 'error' if _is_error(endpoint, response) else 'ok'
+            except requests.RequestException:
+                outcome = 'exception'
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies[endpoint].append(elapsed)
+                outcomes[endpoint][outcome] += 1
+                if first_byte is not None:
+                    ttfb[endpoint].append(first_byte)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_time = time.perf_counter() - started
+
+    results = {'concurrency': concurrency, 'wall_time_s': round(wall_time, 3), 'endpoints': {}}
+    for endpoint in endpoints:
+        values = sorted(latencies[endpoint])
+        summary = {
+            'requests': len(values),
+            'throughput_rps': round(len(values) / wall_time, 2) if wall_time else 0.0,
+            'p50_ms': round(percentile(values, 0.50) * 1000, 1),
+            'p95_ms': round(percentile(values, 0.95) * 1000, 1),
+            'p99_ms': round(percentile(values, 0.99) * 1000, 1),
+            'max_ms': round(values[-1] * 1000, 1) if values else 0.0,
+            'outcomes': dict(outcomes[endpoint]),
+        }
+        if ttfb[endpoint]:
+            first = sorted(ttfb[endpoint])
+            summary['ttfb_p50_ms'] = round(percentile(first, 0.50) * 1000, 1)
+            summary['ttfb_p95_ms'] = round(percentile(first, 0.95) * 1000, 1)
+        results['endpoints'][endpoint] = summary
+    total = sum(len(values) for values in latencies.values())
+    results['total_requests'] = total
+    results['throughput_rps'] = round(total / wall_time, 2) if wall_time else 0.0
+    return results
+
+
+def main():
+    """Parse arguments, run the benchmark and print a report"""
+    parser = argparse.ArgumentParser(description='Load benchmark for the prompt generation endpoints')
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='base URL of the running app')
+    parser.add_argument('--endpoint', action='append', choices=sorted(ENDPOINTS),
+                        help='endpoint to drive (repeatable, default: generate-prompt and prompts-generate)')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=500, help='total requests (ignored with --duration)')
+    parser.add_argument('--duration', type=float, default=None, help='run for this many seconds instead')
+    parser.add_argument('--unique-ratio', type=float, default=1.0,
+                        help='fraction of requests with a unique context (lower means more cache hits)')
+    parser.add_argument('--bypass-cache', action='store_true', help='send bypass_cache with every request')
+    parser.add_argument('--timeout', type=float, default=120.0)
+    parser.add_argument('--json', dest='json_path', help='also write the results to this JSON file')
+    args = parser.parse_args()
+
+    endpoints = args.endpoint or ['generate-prompt', 'prompts-generate']
+    results = run(
+        args.url.rstrip('/'), endpoints, args.concurrency,
+        None if args.duration else args.requests, args.duration,
+        args.unique_ratio, args.bypass_cache, args.timeout
+    )
+
+    print('=' * 60)
+    print(f"🚀 Prompt generation load test: concurrency {results['concurrency']}, "
+          f"{results['total_requests']} requests in {results['wall_time_s']}s "
+          f"({results['throughput_rps']} req/s)")
+    print('=' * 60)
+    for endpoint, summary in results['endpoints'].items():
+        print(f"{endpoint:18} {summary['requests']:6} req  {summary['throughput_rps']:8} req/s  "
+              f"p50 {summary['p50_ms']:8} ms  p95 {summary['p95_ms']:8} ms  p99 {summary['p99_ms']:8} ms  "
+              f"{summary['outcomes']}")
+    if args.json_path:
+        with open(args.json_path, 'w') as handle:
+            json.dump(results, handle, indent=2)
+        print(f'\n📄 Results written to {args.json_path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+JSON serialization and response compression benchmark
+
+Compares the stdlib JSON provider with uncompressed responses ("before")
+against the fast provider with negotiated compression ("after"): raw
+serialization time of prompt lists, payload sizes per coding, and
+end-to-end time and bytes on the wire for large list endpoints. Transfer
+time is estimated from --bandwidth-mbps to show what a remote user sees.
+
+    python benchmarks/serialization.py --prompts 50000 --json serialization.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_data import create_benchmark_app, generate  # noqa: E402
+
+PATHS = ('/api/prompts?limit={prompts}', '/api/categories', '/api/export')
+
+
+def _median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1000, 2)
+
+
+def _build_app(database_url, json_backend, compress):
+    from config import config, ProductionConfig
+
+    class SerializationBenchmarkConfig(ProductionConfig):
+        SQLALCHEMY_DATABASE_URI = database_url
+        JSON_BACKEND = json_backend
+        COMPRESS_ENABLED = compress
+
+    config['benchmark'] = SerializationBenchmarkConfig
+    from app import create_app
+    return create_app('benchmark')
+
+
+def serialization(app, repeat):
+    """Time dumping every prompt's to_dict() with each available JSON backend"""
+    from api.json_provider import BACKENDS, FastJSONProvider
+    from models.prompt import Prompt
+
+    with app.app_context():
+        items = [prompt.to_dict() for prompt in Prompt.query.all()]
+    results = {}
+    for name, (available, _) in BACKENDS.items():
+        if not available():
+            continue
+        app.config['JSON_BACKEND'] = name
+        provider = FastJSONProvider(app)
+        results[name] = {
+            'items': len(items),
+            'dumps_ms': _median_ms(lambda: provider.dumps_bytes(items), repeat),
+            'bytes': len(provider.dumps_bytes(items)),
+        }
+    return results
+
+
+def compression_sizes(app, repeat):
+    """Compress one large payload with each coding and report size and time"""
+    from api.compression import compression
+    from models.prompt import Prompt
+
+    with app.app_context():
+        payload = app.json.dumps_bytes([prompt.to_dict() for prompt in Prompt.query.all()])
+    results = {'identity': {'bytes': len(payload), 'ms': 0.0}}
+    for encoding in compression.encodings:
+        results[encoding] = {
+            'bytes': len(compression.compress_bytes(payload, encoding)),
+            'ms': _median_ms(lambda: compression.compress_bytes(payload, encoding), repeat),
+        }
+    return results
+
+
+def endpoints(app, prompts, repeat, accept_encoding):
+    """Time full requests through the test client and count bytes on the wire"""
+    client = app.test_client()
+    headers = {'Accept-Encoding': accept_encoding} if accept_encoding else {}
+    results = {}
+    for template in PATHS:
+        path = template.format(prompts=prompts)
+        response = client.get(path, headers=headers)
+        results[path] = {
+            'status': response.status_code,
+            'encoding': response.headers.get('Content-Encoding', 'identity'),
+            'bytes': len(response.get_data()),
+            'ms': _median_ms(lambda: client.get(path, headers=headers).get_data(), repeat),
+        }
+    return results
+
+
+def main():
+    """Build a dataset and compare before/after serialization and transfer"""
+    parser = argparse.ArgumentParser(description='Compare JSON serialization and response compression')
+    parser.add_argument('--database-url', help='existing database to use (default: a temporary SQLite file)')
+    parser.add_argument('--prompts', type=int, default=20000, help='prompts to generate into the temporary database')
+    parser.add_argument('--categories', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--bandwidth-mbps', type=float, default=50.0,
+                        help='client bandwidth used to estimate transfer time')
+    parser.add_argument('--json', dest='json_path', help='also write the results to this JSON file')
+    args = parser.parse_args()
+
+    path = None
+    database_url = args.database_url
+    if not database_url:
+        handle, path = tempfile.mkstemp(suffix='.db', prefix='serialization-')
+        os.close(handle)
+        database_url = f'sqlite:///{path}'
+        generate(create_benchmark_app(database_url), args.prompts, args.categories, reset=True,
+                 echo=lambda *args, **kwargs: None)
+
+    try:
+        before = _build_app(database_url, 'stdlib', False)
+        report = {'before': {'endpoints': endpoints(before, args.prompts, args.repeat, None)}}
+        after = _build_app(database_url, 'auto', True)
+        report['after'] = {'json_backend': after.json.backend,
+                           'endpoints': endpoints(after, args.prompts, args.repeat, 'br, gzip')}
+        report['serialization'] = serialization(after, args.repeat)
+        report['compression'] = compression_sizes(after, args.repeat)
+    finally:
+        if path:
+            os.remove(path)
+
+    print('Serialization of every prompt:')
+    for name, row in report['serialization'].items():
+        print(f"  {name:8} {row['dumps_ms']:9} ms  {row['bytes']:>11,} bytes")
+    print('Compression of the same payload:')
+    for name, row in report['compression'].items():
+        print(f"  {name:8} {row['ms']:9} ms  {row['bytes']:>11,} bytes")
+    print(f"Endpoints (before: stdlib, identity | after: {report['after']['json_backend']}, compressed):")
+    for url, old in report['before']['endpoints'].items():
+        new = report['after']['endpoints'][url]
+        for row in (old, new):
+            row['transfer_ms'] = round(row['bytes'] * 8 / (args.bandwidth_mbps * 1000), 1)
+        print(f"  {url:28} server {old['ms']:8} -> {new['ms']:8} ms  "
+              f"{old['bytes']:>11,} -> {new['bytes']:>10,} bytes ({new['encoding']})  "
+              f"+{args.bandwidth_mbps:g} Mbit/s transfer {old['ms'] + old['transfer_ms']:8.0f} -> "
+              f"{new['ms'] + new['transfer_ms']:6.0f} ms")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as handle:
+            json.dump(report, handle, indent=2)
+        print(f'\n📄 Results written to {args.json_path}')
+
+
+if __name__ == '__main__':
+    main()
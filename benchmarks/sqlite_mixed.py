@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Mixed read/write throughput benchmark for SQLite profiles
+
+Runs several worker processes against one SQLite file, each with its own
+app instance, issuing a mix of list/get/search/stats reads and /use and
+update writes. Usage is flushed synchronously so every /use is a real
+write. The same dataset is measured with the default SQLite settings
+(rollback journal, synchronous=FULL) and with SQLiteProductionConfig.
+
+    python benchmarks/sqlite_mixed.py --prompts 20000 --workers 4 --threads 4 --duration 20
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.promptgen_load import percentile  # noqa: E402
+
+PROFILES = ('default', 'tuned')
+
+
+def _create_app(profile, database_url):
+    from app import create_app
+    from config import config, ProductionConfig, SQLiteProductionConfig
+
+    base = SQLiteProductionConfig if profile == 'tuned' else ProductionConfig
+
+    class MixedBenchmarkConfig(base):
+        SQLALCHEMY_DATABASE_URI = database_url
+        USAGE_SYNC_FLUSH = True
+        # Keep the rollup job out of the measured requests
+        USAGE_ROLLUP_INTERVAL = 10 ** 9
+
+    config['mixed-benchmark'] = MixedBenchmarkConfig
+    return create_app('mixed-benchmark')
+
+
+def _worker(profile, database_url, threads, duration, write_ratio, prompt_ids, seed, results):
+    app = _create_app(profile, database_url)
+    stop_at = time.monotonic() + duration
+    samples = {'read': [], 'write': []}
+    errors = {'read': 0, 'write': 0}
+    lock = threading.Lock()
+
+    def run(thread_number):
+        rng = random.Random(seed * 1000 + thread_number)
+        client = app.test_client()
+        while time.monotonic() < stop_at:
+            prompt_id = rng.choice(prompt_ids)
+            kind = 'write' if rng.random() < write_ratio else 'read'
+            started = time.perf_counter()
+            if kind == 'write':
+                if rng.random() < 0.8:
+                    response = client.post(f'/api/prompts/{prompt_id}/use', json={'variables': {}})
+                else:
+                    response = client.put(f'/api/prompts/{prompt_id}',
+                                          json={'content': f'Write to {{recipient}} about {{topic}} {rng.random()}'})
+            else:
+                choice = rng.random()
+                if choice < 0.4:
+                    response = client.get(f'/api/prompts/{prompt_id}')
+                elif choice < 0.7:
+                    response = client.get('/api/prompts?limit=20')
+                elif choice < 0.9:
+                    response = client.get('/api/prompts/search?q=email&limit=20')
+                else:
+                    response = client.get('/api/stats')
+            response.get_data()
+            elapsed = time.perf_counter() - started
+            with lock:
+                if response.status_code >= 500:
+                    errors[kind] += 1
+                else:
+                    samples[kind].append(elapsed)
+
+    workers = [threading.Thread(target=run, args=(number,)) for number in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    results.put({'samples': samples, 'errors': errors})
+
+
+def _prepare(path, prompts, categories):
+    """Build the dataset once in rollback-journal mode"""
+    from benchmarks.synthetic_data import generate
+
+    app = _create_app('default', f'sqlite:///{path}')
+    generate(app, prompts, categories, reset=True, echo=lambda *args, **kwargs: None)
+    from models import db
+    with app.app_context():
+        prompt_ids = [row[0] for row in db.session.execute(db.text('SELECT id FROM prompts'))]
+        db.session.remove()
+        db.engine.dispose()
+    return prompt_ids
+
+
+def measure(profile, database_url, workers, threads, duration, write_ratio, prompt_ids):
+    """Run one profile and return its summary"""
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    processes = [
+        context.Process(target=_worker, args=(profile, database_url, threads, duration, write_ratio,
+                                              prompt_ids, number, results))
+        for number in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    outcomes = []
+    deadline = time.monotonic() + duration + 120
+    while len(outcomes) < len(processes):
+        try:
+            outcomes.append(results.get(timeout=1))
+        except queue.Empty:
+            if time.monotonic() > deadline or any(process.exitcode for process in processes):
+                for process in processes:
+                    process.terminate()
+                raise RuntimeError(f'{profile}: a worker process failed')
+    for process in processes:
+        process.join()
+
+    summary = {'profile': profile, 'workers': workers, 'threads': threads, 'duration_s': duration}
+    total = 0
+    for kind in ('read', 'write'):
+        values = sorted(value for outcome in outcomes for value in outcome['samples'][kind])
+        failed = sum(outcome['errors'][kind] for outcome in outcomes)
+        total += len(values)
+        summary[kind] = {
+            'ok': len(values),
+            'errors': failed,
+            'per_second': round(len(values) / duration, 1),
+            'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(values, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+        }
+    summary['throughput_rps'] = round(total / duration, 1)
+    return summary
+
+
+def main():
+    """Build a dataset, benchmark each profile on a copy and print a report"""
+    parser = argparse.ArgumentParser(description='Mixed read/write throughput for SQLite profiles')
+    parser.add_argument('--prompts', type=int, default=20000)
+    parser.add_argument('--categories', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=4, help='worker processes')
+    parser.add_argument('--threads', type=int, default=4, help='threads per worker')
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds per profile')
+    parser.add_argument('--write-ratio', type=float, default=0.2, help='fraction of requests that write')
+    parser.add_argument('--profile', action='append', choices=PROFILES, help='profile to run (repeatable)')
+    parser.add_argument('--json', dest='json_path', help='also write the results to this JSON file')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='sqlite-mixed-')
+    try:
+        seed_path = os.path.join(workdir, 'seed.db')
+        prompt_ids = _prepare(seed_path, args.prompts, args.categories)
+        reports = []
+        for profile in args.profile or PROFILES:
+            path = os.path.join(workdir, f'{profile}.db')
+            shutil.copy(seed_path, path)
+            report = measure(profile, f'sqlite:///{path}', args.workers, args.threads, args.duration,
+                             args.write_ratio, prompt_ids)
+            reports.append(report)
+            print(f"{profile:8} {report['throughput_rps']:8} req/s | "
+                  f"reads {report['read']['per_second']:8}/s p95 {report['read']['p95_ms']:8} ms "
+                  f"errors {report['read']['errors']:4} | "
+                  f"writes {report['write']['per_second']:7}/s p95 {report['write']['p95_ms']:8} ms "
+                  f"errors {report['write']['errors']:4}", flush=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json_path:
+        with open(args.json_path, 'w') as handle:
+            json.dump(reports, handle, indent=2)
+        print(f'\n📄 Results written to {args.json_path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Application startup benchmark
+
+Measures, in fresh interpreters, how long it takes to import the app
+module, build an app with create_app() and serve the first /health
+request, and checks that none of this touches the database or imports
+modules that are meant to load lazily. The default database is a SQLite
+file in a directory that does not exist, so any connection attempt fails
+the run.
+
+    python benchmarks/startup.py --runs 10 --max-import-ms 800
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imported on first use only; seeing them at startup is a regression
+DEFERRED_MODULES = ('requests', 'urllib3')
+
+# Cannot be opened, so startup must not need the database
+UNREACHABLE_DATABASE_URL = 'sqlite:////nonexistent/prompt-builder-startup/startup.db'
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app as app_module
+imported = time.perf_counter()
+app = app_module.create_app()
+created = time.perf_counter()
+response = app.test_client().get('/health')
+served = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (served - created) * 1000,
+    'health_status': response.status_code,
+    'deferred_loaded': sorted(name for name in json.loads(sys.argv[1]) if name in sys.modules),
+}))
+"""
+
+
+def probe(database_url):
+    """Run one cold start in a new interpreter and return its timings"""
+    env = dict(os.environ, DATABASE_URL=database_url, PYTHONDONTWRITEBYTECODE='1')
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE, json.dumps(DEFERRED_MODULES)],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=120,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f'startup probe failed:\n{result.stderr}')
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    """Measure cold starts and report the median of each phase"""
+    parser = argparse.ArgumentParser(description='Measure application import and startup time')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--database-url', default=UNREACHABLE_DATABASE_URL,
+                        help='database URL for the probe (default: one that cannot be opened)')
+    parser.add_argument('--max-import-ms', type=float,
+                        help='exit with status 1 when the median import + create_app time exceeds this')
+    parser.add_argument('--json', dest='json_path', help='also write the results to this JSON file')
+    args = parser.parse_args()
+
+    runs = [probe(args.database_url) for _ in range(args.runs)]
+    report = {
+        phase: round(statistics.median(run[phase] for run in runs), 1)
+        for phase in ('import_ms', 'create_app_ms', 'first_request_ms')
+    }
+    report['startup_ms'] = round(report['import_ms'] + report['create_app_ms'], 1)
+    report['runs'] = args.runs
+    deferred_loaded = sorted({name for run in runs for name in run['deferred_loaded']})
+    statuses = sorted({run['health_status'] for run in runs})
+
+    print(f"import app       {report['import_ms']:8} ms")
+    print(f"create_app()     {report['create_app_ms']:8} ms")
+    print(f"first /health    {report['first_request_ms']:8} ms  {statuses}")
+    print(f"startup total    {report['startup_ms']:8} ms  (median of {args.runs})")
+
+    failures = []
+    if deferred_loaded:
+        failures.append(f"imported at startup: {', '.join(deferred_loaded)}")
+    if statuses != [200]:
+        failures.append(f'/health returned {statuses}')
+    if args.max_import_ms is not None and report['startup_ms'] > args.max_import_ms:
+        failures.append(f"startup {report['startup_ms']} ms exceeds {args.max_import_ms} ms")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as handle:
+            json.dump(dict(report, deferred_loaded=deferred_loaded), handle, indent=2)
+        print(f'\n📄 Results written to {args.json_path}')
+
+    for failure in failures:
+        print(f'❌ {failure}')
+    if failures:
+        sys.exit(1)
+    print('✅ Startup does not touch the database or load deferred modules')
+
+
+if __name__ == '__main__':
+    main()
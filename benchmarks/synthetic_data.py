@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Fast synthetic dataset generator for benchmarks
+
+Bulk-inserts categories and prompts with executemany batches, then
+rebuilds the derived structures (full-text index, variables index,
+statistics store) once
+at the end instead of maintaining them row by row.
+
+    python benchmarks/synthetic_data.py --database-url sqlite:////tmp/bench.db --prompts 1000000 --categories 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = (
+    'write email summary report review code story agenda meeting customer product launch plan '
+    'budget team project update request proposal outline blog post tweet analysis research '
+    'feedback onboarding guide checklist policy release notes interview questions pitch'
+).split()
+VARIABLES = (
+    'tone recipient subject length details language project_name audience goal deadline '
+    'product company topic format style context'
+).split()
+
+
+def _sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def _prompt_content(rng):
+    variables = rng.sample(VARIABLES, rng.randint(1, 5))
+    parts = []
+    for variable in variables:
+        parts.append(_sentence(rng, rng.randint(4, 20)))
+        parts.append(f'{{{variable}}}')
+    parts.append(_sentence(rng, rng.randint(4, 40)))
+    return ' '.join(parts), variables
+
+
+def _disable_search_triggers(connection):
+    """Drop the SQLite FTS table and triggers so inserts skip per-row indexing"""
+    from models.search import FTS_TABLE
+    if connection.dialect.name != 'sqlite':
+        return
+    for suffix in ('ai', 'ad', 'au'):
+        connection.exec_driver_sql(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}')
+    connection.exec_driver_sql(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def generate(app, prompts=10000, categories=100, seed=42, batch_size=10000, reset=False, echo=print):
+    """Fill the app's database with synthetic categories and prompts"""
+    import json
+    from app import init_database
+    from models import db
+    from models.category import Category
+    from models.prompt import Prompt
+    from models.search import ensure_search_index
+    from models.stats import reconcile_stats
+    from models.variables import rebuild_prompt_variables
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    with app.app_context():
+        if reset:
+            db.drop_all()
+        init_database(app)
+
+        started = time.perf_counter()
+        with db.engine.begin() as connection:
+            _disable_search_triggers(connection)
+            first_category = (connection.execute(db.select(db.func.max(Category.id))).scalar() or 0) + 1
+            connection.execute(Category.__table__.insert(), [
+                {
+                    'name': f'Synthetic {first_category + index}',
+                    'description': _sentence(rng, 8),
+                    'created_at': now - timedelta(days=rng.randint(0, 730)),
+                }
+                for index in range(categories)
+            ])
+            category_ids = [row[0] for row in connection.execute(
+                db.select(Category.id).where(Category.id >= first_category)
+            )]
+            echo(f'✅ Inserted {categories} categories')
+
+            remaining = prompts
+            inserted = 0
+            while remaining > 0:
+                count = min(batch_size, remaining)
+                rows = []
+                for _ in range(count):
+                    content, variables = _prompt_content(rng)
+                    created_at = now - timedelta(seconds=rng.randint(0, 730 * 86400))
+                    rows.append({
+                        'title': f'{_sentence(rng, 3).title()} {inserted + len(rows)}',
+                        'content': content,
+                        'variables': json.dumps(variables),
+                        # Skewed so a few categories hold most prompts, like real catalogs
+                        'category_id': category_ids[min(len(category_ids) - 1,
+                                                        int(rng.paretovariate(1.2)) - 1)],
+                        'created_at': created_at,
+                        'updated_at': created_at,
+                        'usage_count': int(rng.paretovariate(1.5)) - 1,
+                    })
+                connection.execute(Prompt.__table__.insert(), rows)
+                inserted += count
+                remaining -= count
+                echo(f'   {inserted}/{prompts} prompts', end='\r')
+        echo(f'\n✅ Inserted {prompts} prompts in {time.perf_counter() - started:.1f}s')
+
+        started = time.perf_counter()
+        ensure_search_index()
+        reconcile_stats()
+        with db.engine.begin() as connection:
+            rebuild_prompt_variables(connection)
+        echo(f'✅ Rebuilt search index, variables and statistics in {time.perf_counter() - started:.1f}s')
+
+
+def create_benchmark_app(database_url):
+    """Create an app bound to the given database URL, with the schema initialized"""
+    from app import create_app, init_database
+    from config import config, ProductionConfig
+
+    class BenchmarkConfig(ProductionConfig):
+        SQLALCHEMY_DATABASE_URI = database_url
+
+    config['benchmark'] = BenchmarkConfig
+    app = create_app('benchmark')
+    init_database(app)
+    return app
+
+
+def main():
+    """Generate a synthetic dataset"""
+    parser = argparse.ArgumentParser(description='Generate a large synthetic prompt catalog')
+    parser.add_argument('--database-url', default='sqlite:////tmp/prompt_builder_bench.db')
+    parser.add_argument('--prompts', type=int, default=100000, help='number of prompts (up to 1M+)')
+    parser.add_argument('--categories', type=int, default=1000)
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reset', action='store_true', help='drop all tables first')
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.database_url)
+    generate(app, args.prompts, args.categories, args.seed, args.batch_size, args.reset)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+Command line interface for Prompt Builder Application
+
+Commands are registered on the Flask CLI, e.g. ``flask stats reconcile``.
+"""
+import click
+from flask.cli import AppGroup
+from models.stats import reconcile_stats
+
+stats_cli = AppGroup('stats', help='Manage the statistics store.')
+
+
+@stats_cli.command('reconcile')
+def reconcile_stats_command():
+    """Rebuild dashboard statistics from the prompts and categories tables"""
+    totals = reconcile_stats()
+    for name, value in totals.items():
+        click.echo(f'{name}: {value}')
+    click.echo('✅ Statistics reconciled')
+
+
+@stats_cli.command('compact')
+def compact_usage_command():
+    """Fold pending usage events into the hourly and daily rollups"""
+    from models.usage import usage_recorder
+    usage_recorder.flush()
+    compacted = usage_recorder.compact()
+    click.echo(f'✅ Compacted {compacted} usage events')
+
+
+data_cli = AppGroup('data', help='Bulk import and export of categories and prompts.')
+
+
+@data_cli.command('export')
+@click.argument('output', type=click.File('w'), default='-')
+@click.option('--category', help='Export only this category and its prompts.')
+@click.option('--batch-size', type=int, default=1000, show_default=True, help='Rows fetched per round trip.')
+def export_command(output, category, batch_size):
+    """Write all categories and prompts as NDJSON to OUTPUT (default stdout)"""
+    from models.bulk import export_ndjson
+    for line in export_ndjson(batch_size, category):
+        output.write(line)
+
+
+@data_cli.command('import')
+@click.argument('source', type=click.File('r'), default='-')
+@click.option('--key', type=click.Choice(['title', 'external_id']), default='title', show_default=True,
+              help='Field used to match existing prompts.')
+@click.option('--on-conflict', type=click.Choice(['update', 'skip']), default='update', show_default=True)
+@click.option('--create-categories/--no-create-categories', default=True, show_default=True,
+              help='Create categories referenced by prompts that do not exist yet.')
+@click.option('--batch-size', type=int, default=1000, show_default=True, help='Prompts written per transaction.')
+def import_command(source, key, on_conflict, create_categories, batch_size):
+    """Import categories and prompts from an NDJSON SOURCE file (default stdin)"""
+    from models.bulk import import_ndjson
+    summary = import_ndjson(source, key=key, on_conflict=on_conflict,
+                            create_categories=create_categories, batch_size=batch_size)
+    for error in summary['errors']:
+        click.echo(f"line {error['line']}: {error['error']}", err=True)
+    click.echo(f"✅ Imported: {summary['created']} created, {summary['updated']} updated, "
+               f"{summary['skipped']} skipped, {summary['categories_created']} categories created, "
+               f"{summary['error_count']} errors")
+
+
+sqlite_cli = AppGroup('sqlite', help='Inspect and maintain SQLite databases.')
+
+
+@sqlite_cli.command('pragmas')
+def sqlite_pragmas_command():
+    """Show the tuning PRAGMAs in effect on a pooled connection"""
+    from flask import current_app
+    from models import db
+    from models.sqlite_tuning import read_pragmas
+    if db.engine.dialect.name != 'sqlite':
+        raise click.ClickException('The database is not SQLite')
+    names = list(current_app.config.get('SQLITE_PRAGMAS') or {}) or [
+        'journal_mode', 'synchronous', 'busy_timeout', 'mmap_size', 'cache_size', 'temp_store'
+    ]
+    for name, value in read_pragmas(db.engine, names).items():
+        click.echo(f'{name}: {value}')
+
+
+@sqlite_cli.command('maintain')
+@click.option('--mode', type=click.Choice(['PASSIVE', 'FULL', 'RESTART', 'TRUNCATE']), default='TRUNCATE',
+              show_default=True, help='WAL checkpoint mode.')
+@click.option('--analyze/--no-analyze', default=True, show_default=True, help='Refresh planner statistics.')
+def sqlite_maintain_command(mode, analyze):
+    """Checkpoint the WAL and run ANALYZE"""
+    from models import db
+    from models.sqlite_tuning import analyze as run_analyze, checkpoint
+    if db.engine.dialect.name != 'sqlite':
+        raise click.ClickException('The database is not SQLite')
+    busy, wal_pages, checkpointed = checkpoint(db.engine, mode)
+    click.echo(f'✅ Checkpointed {checkpointed}/{wal_pages} WAL pages' + (' (busy)' if busy else ''))
+    if analyze:
+        run_analyze(db.engine)
+        click.echo('✅ Planner statistics refreshed')
+
+
+db_cli = AppGroup('db', help='Manage the database schema.')
+
+
+@db_cli.command('init')
+def db_init_command():
+    """Create tables, apply migrations and seed the default category (run once per deploy)"""
+    from flask import current_app
+    from app import init_database
+    init_database(current_app._get_current_object())
+    click.echo('✅ Database initialized')
+
+
+@db_cli.command('upgrade')
+@click.option('--to', 'target', type=int, help='Stop after this migration version.')
+def db_upgrade_command(target):
+    """Apply pending schema migrations"""
+    from models.migrations import upgrade
+    applied = upgrade(target, echo=click.echo)
+    click.echo(f'✅ Applied {len(applied)} migrations' if applied else '✅ Schema is up to date')
+
+
+@db_cli.command('status')
+def db_status_command():
+    """List schema migrations and when they were applied"""
+    from models.migrations import status
+    for version, name, applied_at in status():
+        state = applied_at.strftime('%Y-%m-%d %H:%M:%S') if applied_at else 'pending'
+        click.echo(f'{version:4}  {state:19}  {name}')
+
+
+@db_cli.command('check-plans')
+@click.option('--verbose', is_flag=True, help='Print every statement and its plan.')
+def db_check_plans_command(verbose):
+    """EXPLAIN the queries behind the hot endpoints and fail on full table scans"""
+    from flask import current_app
+    from models.query_plans import check_query_plans
+    results = check_query_plans(current_app._get_current_object())
+    failures = 0
+    for path, statement, plan, violations in results:
+        if violations or verbose:
+            click.echo(f"{'❌' if violations else '✅'} {path}\n   {' '.join(statement.split())}")
+            for line in plan:
+                click.echo(f'     {line}')
+        failures += bool(violations)
+    if failures:
+        raise click.ClickException(f'{failures} of {len(results)} queries scan a whole table')
+    click.echo(f'✅ {len(results)} queries use indexes')
@@ -1,6 +1,6 @@
 """
 Configuration package for Prompt Builder Application
 """
-from .database import config, DevelopmentConfig, ProductionConfig, TestingConfig
+from .database import config, DevelopmentConfig, ProductionConfig, SQLiteProductionConfig, TestingConfig
 
-__all__ = ['config', 'DevelopmentConfig', 'ProductionConfig', 'TestingConfig']
+__all__ = ['config', 'DevelopmentConfig', 'ProductionConfig', 'SQLiteProductionConfig', 'TestingConfig']
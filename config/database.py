@@ -3,6 +3,7 @@ Database configuration for PostgreSQL
 """
 import os
 from urllib.parse import quote_plus
+from sqlalchemy.engine import make_url
 
 class DatabaseConfig:
     """Database configuration class"""
@@ -14,6 +15,90 @@ class DatabaseConfig:
     DB_USER = os.getenv('DB_USER', 'postgres')
     DB_PASSWORD = os.getenv('DB_PASSWORD', 'password')
     
+    # Maximum number of variable sets accepted by the batch render endpoints
+    BATCH_RENDER_MAX_ITEMS = int(os.getenv('BATCH_RENDER_MAX_ITEMS', '10000'))
+    
+    # Maximum number of contexts accepted by the batch generation endpoint
+    BATCH_GENERATE_MAX_ITEMS = int(os.getenv('BATCH_GENERATE_MAX_ITEMS', '100'))
+    
+    # Prompt usage counts are buffered and flushed every N seconds (0 = immediately)
+    USAGE_FLUSH_INTERVAL = float(os.getenv('USAGE_FLUSH_INTERVAL', '5'))
+    USAGE_SYNC_FLUSH = os.getenv('USAGE_SYNC_FLUSH', 'false').lower() == 'true'
+    
+    # Usage events are folded into hourly/daily rollups every N seconds
+    USAGE_ROLLUP_INTERVAL = float(os.getenv('USAGE_ROLLUP_INTERVAL', '60'))
+    USAGE_ROLLUP_SETTLE_SECONDS = float(os.getenv('USAGE_ROLLUP_SETTLE_SECONDS', '5'))
+    USAGE_EVENT_RETENTION_DAYS = int(os.getenv('USAGE_EVENT_RETENTION_DAYS', '30'))
+    USAGE_HOURLY_RETENTION_DAYS = int(os.getenv('USAGE_HOURLY_RETENTION_DAYS', '90'))
+    
+    # Connection pool settings (not used for in-memory SQLite)
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    # Seconds the readiness probe waits for a pooled connection
+    HEALTH_CHECK_TIMEOUT = float(os.getenv('HEALTH_CHECK_TIMEOUT', '2'))
+    # Server-side statement timeout in milliseconds (PostgreSQL only, 0 = none)
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '0'))
+    
+    # Optional read replicas (comma separated URLs) used by read-only endpoints.
+    # After a write a client reads from the primary for DB_REPLICA_STICKY_SECONDS.
+    DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    DB_REPLICA_STICKY_SECONDS = float(os.getenv('DB_REPLICA_STICKY_SECONDS', '5'))
+    
+    # PRAGMAs applied to every SQLite connection, and periodic WAL checkpoint /
+    # ANALYZE intervals in seconds (0 = off); see SQLiteProductionConfig
+    SQLITE_PRAGMAS = {}
+    SQLITE_CHECKPOINT_INTERVAL = 0
+    SQLITE_ANALYZE_INTERVAL = 0
+    
+    # Password hashing: werkzeug method string (cost), worker threads (default: CPUs, at most 4),
+    # calls allowed to wait for a worker before logins get 503, and the wait limit in seconds
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '0'))
+    PASSWORD_HASH_MAX_QUEUE = int(os.getenv('PASSWORD_HASH_MAX_QUEUE', '32'))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', '10'))
+    
+    # JSON serializer: auto (orjson when installed), orjson or stdlib
+    JSON_BACKEND = os.getenv('JSON_BACKEND', 'auto')
+    
+    # Negotiated gzip/brotli compression of JSON, NDJSON and SSE responses
+    COMPRESS_ENABLED = os.getenv('COMPRESS_ENABLED', 'true').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+    # Low levels: dynamic responses are compressed on every request
+    COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', '1'))
+    COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', '4'))
+    
+    @classmethod
+    def init_app(cls, app):
+        """Derive engine options and replica binds from the loaded database URIs"""
+        app.config.setdefault(
+            'SQLALCHEMY_ENGINE_OPTIONS', cls.get_engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+        )
+        app.config.setdefault('SQLALCHEMY_BINDS', {
+            f'replica_{index}': dict(cls.get_engine_options(url), url=url)
+            for index, url in enumerate(cls.DATABASE_REPLICA_URLS)
+        })
+    
+    @classmethod
+    def get_engine_options(cls, uri):
+        """Get SQLAlchemy engine options for a database URI"""
+        url = make_url(uri)
+        options = {'pool_pre_ping': cls.DB_POOL_PRE_PING}
+        if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+            # In-memory SQLite uses a single static connection
+            return options
+        options.update(
+            pool_size=cls.DB_POOL_SIZE,
+            max_overflow=cls.DB_MAX_OVERFLOW,
+            pool_timeout=cls.DB_POOL_TIMEOUT,
+            pool_recycle=cls.DB_POOL_RECYCLE
+        )
+        if cls.DB_STATEMENT_TIMEOUT_MS > 0 and url.get_backend_name() == 'postgresql':
+            options['connect_args'] = {'options': f'-c statement_timeout={cls.DB_STATEMENT_TIMEOUT_MS}'}
+        return options
+    
     # Construct PostgreSQL connection string
     @classmethod
     def get_database_uri(cls):
@@ -45,17 +130,38 @@ class ProductionConfig(DatabaseConfig):
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_KEY = os.getenv('SECRET_KEY', 'production-secret-key-change-this')
 
+class SQLiteProductionConfig(ProductionConfig):
+    """Production configuration for single-node installs on a tuned SQLite file"""
+    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', f'sqlite:///{os.path.abspath("instance/prompt_builder.db")}')
+    SQLITE_PRAGMAS = {
+        # busy_timeout first so the switch to WAL waits for other connections
+        'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+        'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),
+        # Negative cache_size is in KiB
+        'cache_size': -int(os.getenv('SQLITE_CACHE_SIZE_KB', '65536')),
+        'temp_store': os.getenv('SQLITE_TEMP_STORE', 'MEMORY'),
+        'journal_size_limit': int(os.getenv('SQLITE_JOURNAL_SIZE_LIMIT', str(64 * 1024 * 1024))),
+    }
+    SQLITE_CHECKPOINT_INTERVAL = float(os.getenv('SQLITE_CHECKPOINT_INTERVAL', '300'))
+    SQLITE_ANALYZE_INTERVAL = float(os.getenv('SQLITE_ANALYZE_INTERVAL', '3600'))
+
 class TestingConfig(DatabaseConfig):
     """Testing configuration"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_KEY = 'test-secret-key'
+    USAGE_SYNC_FLUSH = True
+    USAGE_ROLLUP_INTERVAL = 0
+    USAGE_ROLLUP_SETTLE_SECONDS = 0
 
 # Configuration mapping
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
+    'production-sqlite': SQLiteProductionConfig,
     'testing': TestingConfig,
     'default': DevelopmentConfig
 }
@@ -5,5 +5,6 @@ from .category import Category
 from .prompt import Prompt
 from .database import db
 from .user import User
+from . import stats, usage_log, generation_lock, migrations, catalog, variables
 
 __all__ = ['db', 'Category', 'Prompt']
@@ -0,0 +1,317 @@
+"""
+Bulk NDJSON export and import of categories and prompts
+
+Each line is one JSON object:
+
+    {"type": "category", "name": "Business", "description": "..."}
+    {"type": "prompt", "title": "...", "content": "...", "category": "Business",
+     "external_id": "...", "usage_count": 3, "created_at": "2024-01-01T00:00:00"}
+
+Export streams rows with yield_per (a server-side cursor on PostgreSQL) so
+memory stays flat. Import resolves categories against one preloaded name
+map, looks up existing prompts once per batch and writes each batch with
+executemany inserts and updates; the variables index of the written
+prompts is rebuilt in the same transaction.
+"""
+import json
+from collections import defaultdict
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.exc import IntegrityError
+from .database import db
+from .category import Category
+from .prompt import Prompt
+from .catalog import bump_catalog_version
+from .stats import record_bulk_changes
+from .variables import sync_prompt_variables
+
+EXPORT_BATCH_SIZE = 1000
+IMPORT_BATCH_SIZE = 1000
+IMPORT_KEYS = ('title', 'external_id')
+CONFLICT_ACTIONS = ('update', 'skip')
+MAX_REPORTED_ERRORS = 100
+DEFAULT_CATEGORY = 'General'
+
+_categories = Category.__table__
+_prompts = Prompt.__table__
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def export_records(batch_size=EXPORT_BATCH_SIZE, category=None):
+    """Yield export records: all categories first, then prompts by id
+
+    Pass a category name to export only that category and its prompts.
+    """
+    query = select(_categories.c.name, _categories.c.description).order_by(_categories.c.id)
+    if category:
+        query = query.where(_categories.c.name == category)
+    for row in db.session.execute(query.execution_options(yield_per=batch_size)):
+        yield {'type': 'category', 'name': row.name, 'description': row.description}
+
+    query = select(
+        _prompts.c.external_id, _prompts.c.title, _prompts.c.content, _prompts.c.usage_count,
+        _prompts.c.created_at, _prompts.c.updated_at, _categories.c.name.label('category')
+    ).join(_categories, _categories.c.id == _prompts.c.category_id).order_by(_prompts.c.id)
+    if category:
+        query = query.where(_categories.c.name == category)
+    for row in db.session.execute(query.execution_options(yield_per=batch_size)):
+        yield {
+            'type': 'prompt',
+            'external_id': row.external_id,
+            'title': row.title,
+            'content': row.content,
+            'category': row.category,
+            'usage_count': row.usage_count or 0,
+            'created_at': _isoformat(row.created_at),
+            'updated_at': _isoformat(row.updated_at),
+        }
+
+
+def export_ndjson(batch_size=EXPORT_BATCH_SIZE, category=None):
+    """Yield the export as NDJSON lines"""
+    dumps = current_app.json.dumps
+    for record in export_records(batch_size, category):
+        yield dumps(record) + '\n'
+
+
+class BulkImporter:
+    """Batched upsert of category and prompt records
+
+    Prompts are matched on key ('title' or 'external_id'); on_conflict
+    decides whether a match is updated or skipped. Each batch is committed
+    on its own, so a failed batch is reported without undoing earlier ones
+    and re-running an import is idempotent.
+    """
+
+    def __init__(self, key='title', on_conflict='update', create_categories=True,
+                 batch_size=IMPORT_BATCH_SIZE):
+        if key not in IMPORT_KEYS:
+            raise ValueError(f"key must be one of: {', '.join(IMPORT_KEYS)}")
+        if on_conflict not in CONFLICT_ACTIONS:
+            raise ValueError(f"on_conflict must be one of: {', '.join(CONFLICT_ACTIONS)}")
+        self.key = key
+        self.on_conflict = on_conflict
+        self.create_categories = create_categories
+        self.batch_size = max(1, batch_size)
+        self.categories = dict(db.session.execute(select(_categories.c.name, _categories.c.id)).all())
+        self.new_categories = {}
+        self.batch = {}
+        self.summary = {
+            'categories_created': 0, 'created': 0, 'updated': 0, 'skipped': 0,
+            'error_count': 0, 'errors': []
+        }
+
+    def error(self, line, message):
+        """Record a rejected line"""
+        self.summary['error_count'] += 1
+        if len(self.summary['errors']) < MAX_REPORTED_ERRORS:
+            self.summary['errors'].append({'line': line, 'error': message})
+
+    def add(self, line, record):
+        """Queue one parsed record, flushing when the batch is full"""
+        if not isinstance(record, dict):
+            return self.error(line, 'record must be a JSON object')
+        kind = record.get('type', 'prompt')
+        if kind == 'category':
+            return self._add_category(line, record)
+        if kind != 'prompt':
+            return self.error(line, f'unknown record type: {kind}')
+        try:
+            key_value, values = self._prompt_values(record)
+        except (TypeError, ValueError) as e:
+            return self.error(line, str(e))
+        # A later line with the same key replaces an earlier one in the batch
+        self.batch.pop(key_value, None)
+        self.batch[key_value] = (line, values)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def _add_category(self, line, record):
+        name = record.get('name')
+        if not isinstance(name, str) or not name.strip():
+            return self.error(line, 'category name is required')
+        name = name.strip()
+        if name not in self.categories and name not in self.new_categories:
+            self.new_categories[name] = record.get('description') or ''
+
+    def _resolve_category(self, name):
+        if name in self.categories or name in self.new_categories:
+            return name
+        if not self.create_categories:
+            raise ValueError(f'unknown category: {name}')
+        self.new_categories[name] = ''
+        return name
+
+    def _prompt_values(self, record):
+        title = record.get('title')
+        content = record.get('content')
+        if not isinstance(title, str) or not title.strip() or not isinstance(content, str) or not content:
+            raise ValueError('title and content are required')
+        if len(title) > _prompts.c.title.type.length:
+            raise ValueError(f'title is longer than {_prompts.c.title.type.length} characters')
+        external_id = record.get('external_id')
+        if external_id is not None:
+            external_id = str(external_id)
+        if self.key == 'external_id' and not external_id:
+            raise ValueError('external_id is required when importing by external_id')
+
+        created_at = record.get('created_at')
+        if created_at:
+            created_at = datetime.fromisoformat(created_at)
+        usage_count = max(0, int(record.get('usage_count') or 0))
+        category = record.get('category') or record.get('category_name') or DEFAULT_CATEGORY
+        values = {
+            'title': title,
+            'content': content,
+            # Variables are derived from the content, never trusted from the file
+            'variables': json.dumps(Prompt.find_variables(content)),
+            'category': self._resolve_category(str(category)),
+            'external_id': external_id,
+            'usage_count': usage_count,
+            'created_at': created_at or None,
+        }
+        return title if self.key == 'title' else external_id, values
+
+    def _flush_categories(self, connection):
+        if not self.new_categories:
+            return []
+        now = datetime.utcnow()
+        connection.execute(_categories.insert(), [
+            {'name': name, 'description': description, 'created_at': now}
+            for name, description in self.new_categories.items()
+        ])
+        created = dict(connection.execute(
+            select(_categories.c.name, _categories.c.id).where(_categories.c.name.in_(list(self.new_categories)))
+        ).all())
+        self.categories.update(created)
+        return list(created.values())
+
+    def _flush_prompts(self, connection):
+        key_column = _prompts.c[self.key]
+        existing = {}
+        rows = connection.execute(
+            select(key_column.label('key'), _prompts.c.id, _prompts.c.category_id, _prompts.c.usage_count)
+            .where(key_column.in_(list(self.batch))).order_by(_prompts.c.id)
+        )
+        for row in rows:
+            # Titles are not unique: the oldest prompt with a title is the match
+            existing.setdefault(row.key, row)
+
+        now = datetime.utcnow()
+        inserts, updates = [], []
+        deltas = defaultdict(lambda: [0, 0])
+        counts = {'created': 0, 'updated': 0, 'skipped': 0}
+        for key_value, (_, values) in self.batch.items():
+            category_id = self.categories[values['category']]
+            row = existing.get(key_value)
+            if row is None:
+                inserts.append({
+                    'title': values['title'], 'content': values['content'], 'variables': values['variables'],
+                    'category_id': category_id, 'external_id': values['external_id'],
+                    'usage_count': values['usage_count'], 'created_at': values['created_at'] or now,
+                    'updated_at': now,
+                })
+                deltas[category_id][0] += 1
+                deltas[category_id][1] += values['usage_count']
+                counts['created'] += 1
+            elif self.on_conflict == 'skip':
+                counts['skipped'] += 1
+            else:
+                updates.append({
+                    'b_id': row.id, 'b_title': values['title'], 'b_content': values['content'],
+                    'b_variables': values['variables'], 'b_category_id': category_id,
+                    'b_external_id': values['external_id'], 'b_updated_at': now,
+                })
+                if row.category_id != category_id:
+                    usage = row.usage_count or 0
+                    deltas[row.category_id][0] -= 1
+                    deltas[row.category_id][1] -= usage
+                    deltas[category_id][0] += 1
+                    deltas[category_id][1] += usage
+                counts['updated'] += 1
+
+        changed_ids = [update['b_id'] for update in updates]
+        if inserts:
+            last_id = connection.execute(select(func.max(_prompts.c.id))).scalar() or 0
+            connection.execute(_prompts.insert(), inserts)
+            changed_ids += connection.execute(
+                select(_prompts.c.id).where(
+                    _prompts.c.id > last_id,
+                    key_column.in_([insert[self.key] for insert in inserts])
+                )
+            ).scalars().all()
+        if updates:
+            connection.execute(
+                _prompts.update().where(_prompts.c.id == bindparam('b_id')).values(
+                    title=bindparam('b_title'),
+                    content=bindparam('b_content'),
+                    variables=bindparam('b_variables'),
+                    category_id=bindparam('b_category_id'),
+                    external_id=func.coalesce(bindparam('b_external_id'), _prompts.c.external_id),
+                    updated_at=bindparam('b_updated_at'),
+                ),
+                updates
+            )
+        sync_prompt_variables(connection, changed_ids)
+        return counts, {category_id: tuple(delta) for category_id, delta in deltas.items()}
+
+    def flush(self):
+        """Write pending categories and prompts in one transaction"""
+        if not self.batch and not self.new_categories:
+            return
+        lines = [line for line, _ in self.batch.values()]
+        try:
+            connection = db.session.connection()
+            new_category_ids = self._flush_categories(connection)
+            counts, deltas = self._flush_prompts(connection) if self.batch else ({}, {})
+            record_bulk_changes(connection, new_category_ids, deltas)
+            if new_category_ids or counts.get('created') or counts.get('updated'):
+                bump_catalog_version(connection)
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            for name in self.new_categories:
+                self.categories.pop(name, None)
+            span = f'{min(lines)}-{max(lines)}' if lines else None
+            self.error(span, f'batch rejected: {e.orig}')
+        else:
+            self.summary['categories_created'] += len(new_category_ids)
+            for name, value in counts.items():
+                self.summary[name] += value
+        finally:
+            self.new_categories = {}
+            self.batch = {}
+
+    def finish(self):
+        """Flush the last batch and return the summary"""
+        self.flush()
+        return self.summary
+
+
+def import_records(records, **options):
+    """Import an iterable of record dicts; see BulkImporter for options"""
+    importer = BulkImporter(**options)
+    for line, record in enumerate(records, 1):
+        importer.add(line, record)
+    return importer.finish()
+
+
+def import_ndjson(lines, **options):
+    """Import NDJSON lines (str or bytes); blank lines are ignored"""
+    importer = BulkImporter(**options)
+    for line_number, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            importer.error(line_number, f'invalid JSON: {e}')
+            continue
+        importer.add(line_number, record)
+    return importer.finish()
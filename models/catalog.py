@@ -0,0 +1,74 @@
+"""
+Catalog version for conditional GETs
+
+A single-row table holds a counter that is bumped in the same transaction
+as every prompt or category write, including bulk imports, so every
+worker sees the same version once the write commits. Usage flushes leave
+it alone: they would change it every few seconds under normal traffic.
+List endpoints derive their ETag and Last-Modified from it and can answer
+a conditional request without running the list query.
+"""
+from datetime import datetime
+from sqlalchemy import event
+from .database import db
+from .routing import RoutingSession
+
+CATALOG_ROW_ID = 1
+
+
+class CatalogVersion(db.Model):
+    """Version and last write time of the prompt catalog"""
+    __tablename__ = 'catalog_version'
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+_catalog = CatalogVersion.__table__
+
+
+def bump_catalog_version(connection):
+    """Advance the catalog version inside the caller's transaction"""
+    # HTTP dates have one second resolution
+    now = datetime.utcnow().replace(microsecond=0)
+    result = connection.execute(
+        _catalog.update().where(_catalog.c.id == CATALOG_ROW_ID).values(
+            version=_catalog.c.version + 1, updated_at=now
+        )
+    )
+    if result.rowcount == 0:
+        connection.execute(_catalog.insert().values(id=CATALOG_ROW_ID, version=1, updated_at=now))
+
+
+def get_catalog_version():
+    """Get (version, updated_at) of the catalog"""
+    row = db.session.execute(
+        db.select(_catalog.c.version, _catalog.c.updated_at).where(_catalog.c.id == CATALOG_ROW_ID)
+    ).first()
+    if row is None:
+        return 0, None
+    return row.version, row.updated_at
+
+
+def ensure_catalog_version():
+    """Create the catalog version row on first start"""
+    if db.session.get(CatalogVersion, CATALOG_ROW_ID) is None:
+        db.session.add(CatalogVersion(id=CATALOG_ROW_ID, version=1,
+                                      updated_at=datetime.utcnow().replace(microsecond=0)))
+        db.session.commit()
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _catalog_changed(session, flush_context):
+    from .category import Category
+    from .prompt import Prompt
+
+    catalog_types = (Prompt, Category)
+    written = [instance for instance in (*session.new, *session.deleted) if isinstance(instance, catalog_types)]
+    modified = [
+        instance for instance in session.dirty
+        if isinstance(instance, catalog_types) and session.is_modified(instance, include_collections=False)
+    ]
+    if written or modified:
+        bump_catalog_version(session.connection())
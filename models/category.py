@@ -2,6 +2,7 @@
 Category model for organizing prompts
 """
 from datetime import datetime
+from sqlalchemy import func
 from .database import db
 
 class Category(db.Model):
@@ -19,16 +20,41 @@ class Category(db.Model):
     def __repr__(self):
         return f'<Category {self.name}>'
     
-    def to_dict(self):
-        """Convert category to dictionary"""
+    def to_dict(self, prompt_count=None):
+        """Convert category to dictionary
+        
+        Pass prompt_count when it is already known (see with_prompt_counts)
+        to avoid a count query per category.
+        """
+        if prompt_count is None:
+            prompt_count = self.count_prompts()
         return {
             'id': self.id,
             'name': self.name,
             'description': self.description,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'prompt_count': len(self.prompts)
+            'prompt_count': prompt_count
         }
     
+    def count_prompts(self):
+        """Count prompts in this category without loading them"""
+        from .prompt import Prompt
+        return db.session.query(func.count(Prompt.id)).filter(Prompt.category_id == self.id).scalar()
+    
+    def has_prompts(self):
+        """Check whether any prompt belongs to this category"""
+        from .prompt import Prompt
+        return db.session.query(Prompt.query.filter_by(category_id=self.id).exists()).scalar()
+    
+    @classmethod
+    def with_prompt_counts(cls, query=None):
+        """Get (category, prompt_count) pairs with a single grouped query"""
+        from .prompt import Prompt
+        query = query if query is not None else cls.query
+        return query.outerjoin(Prompt, Prompt.category_id == cls.id).add_columns(
+            func.count(Prompt.id)
+        ).group_by(cls.id).order_by(cls.id).all()
+    
     @classmethod
     def get_by_name(cls, name):
         """Get category by name"""
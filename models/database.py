@@ -1,7 +1,62 @@
 """
 Database initialization and configuration
 """
+import threading
+import time
 from flask_sqlalchemy import SQLAlchemy
+from .routing import RoutingSession
 
-# Initialize SQLAlchemy
-db = SQLAlchemy()
+# Initialize SQLAlchemy; the session routes read-only views to replicas
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+
+# Probe threads still waiting on a pool, by engine
+_probes = {}
+_probes_lock = threading.Lock()
+
+
+def _probe(engine, outcome):
+    """Run SELECT 1 on a pooled connection, recording the error if any"""
+    try:
+        with engine.connect() as connection:
+            connection.exec_driver_sql('SELECT 1')
+    except Exception as e:
+        outcome['error'] = str(e)
+
+
+def _check_engine(engine, timeout):
+    """Probe one engine, giving up after timeout seconds instead of the pool timeout"""
+    outcome = {}
+    with _probes_lock:
+        waiting = _probes.get(engine)
+        if waiting is not None and waiting.is_alive():
+            return {'ok': False, 'error': 'An earlier check is still waiting for a connection'}
+        thread = threading.Thread(target=_probe, args=(engine, outcome), daemon=True)
+        _probes[engine] = thread
+        thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        return {'ok': False, 'error': f'No connection within {timeout:g}s'}
+    if 'error' in outcome:
+        return {'ok': False, 'error': outcome['error']}
+    return {'ok': True}
+
+
+def check_database(timeout=2.0):
+    """Check out a connection from every engine's pool and run SELECT 1
+
+    Returns a dict per bind ('primary', 'replica_0', ...) with ok, the
+    round trip in ms, pool usage and the error if the check failed. A
+    checkout still waiting after timeout seconds, e.g. on an exhausted
+    pool, fails the check rather than blocking for DB_POOL_TIMEOUT.
+    """
+    results = {}
+    for key, engine in db.engines.items():
+        started = time.perf_counter()
+        result = _check_engine(engine, timeout)
+        result['ms'] = round((time.perf_counter() - started) * 1000, 2)
+        pool = engine.pool
+        if hasattr(pool, 'checkedout'):
+            result['pool'] = {'size': pool.size(), 'checked_out': pool.checkedout(), 'overflow': pool.overflow()}
+        results[key or 'primary'] = result
+    return results
@@ -0,0 +1,87 @@
+"""
+Database lock table for coalescing identical LLM generations across workers
+
+The first worker to insert a key becomes the leader and runs the upstream
+call; other workers poll the row and reuse the leader's result or error.
+"""
+import time
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from .database import db
+
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class GenerationLockError(Exception):
+    """Raised to followers when the leader's generation failed"""
+
+
+class GenerationLock(db.Model):
+    """One in-flight or recently finished generation"""
+    __tablename__ = 'generation_locks'
+
+    key = db.Column(db.String(64), primary_key=True)
+    status = db.Column(db.String(10), nullable=False, default=RUNNING)
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    @classmethod
+    def run_once(cls, key, fn, wait_timeout=60.0, lease=60.0, keep_result=5.0, poll_interval=0.1):
+        """Run fn for key in exactly one worker and share its outcome
+
+        Returns (result, coalesced). Followers wait up to wait_timeout for
+        the leader and then run fn themselves. A leader that dies is
+        replaced once its lease expires.
+        """
+        table = cls.__table__
+        engine = db.engine
+        give_up_at = time.monotonic() + wait_timeout
+        while True:
+            now = datetime.utcnow()
+            try:
+                with engine.begin() as connection:
+                    connection.execute(table.delete().where(table.c.expires_at < now))
+                    connection.execute(table.insert().values(
+                        key=key, status=RUNNING, expires_at=now + timedelta(seconds=lease)
+                    ))
+            except IntegrityError:
+                pass
+            else:
+                return cls._lead(key, fn, keep_result), False
+
+            # Another worker holds the key: wait for its outcome
+            while time.monotonic() < give_up_at:
+                with engine.connect() as connection:
+                    row = connection.execute(
+                        db.select(table.c.status, table.c.result, table.c.error, table.c.expires_at)
+                        .where(table.c.key == key)
+                    ).first()
+                if row is None or (row.status == RUNNING and row.expires_at < datetime.utcnow()):
+                    break
+                if row.status == DONE:
+                    return row.result, True
+                if row.status == FAILED:
+                    raise GenerationLockError(row.error)
+                time.sleep(poll_interval)
+            else:
+                return fn(), False
+
+    @classmethod
+    def _lead(cls, key, fn, keep_result):
+        table = cls.__table__
+        values = {'status': FAILED, 'error': 'generation interrupted'}
+        try:
+            result = fn()
+        except Exception as e:
+            values = {'status': FAILED, 'error': str(e)}
+            raise
+        else:
+            values = {'status': DONE, 'result': result}
+            return result
+        finally:
+            values['expires_at'] = datetime.utcnow() + timedelta(seconds=keep_result)
+            with db.engine.begin() as connection:
+                connection.execute(table.update().where(table.c.key == key).values(**values))
@@ -0,0 +1,185 @@
+"""
+Versioned schema migrations
+
+db.create_all() builds a fresh schema from the models; migrations bring
+existing databases up to the same schema. Each migration runs once, in
+version order, and is recorded in the schema_migrations table. Migrations
+are idempotent, so they are also safe to run on a freshly created schema.
+
+Non-transactional migrations run online: on PostgreSQL their indexes are
+built with CREATE INDEX CONCURRENTLY, so reads and writes continue while
+the index builds. SQLite has no concurrent index builds; each index is
+created in its own short transaction.
+"""
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy import inspect
+from sqlalchemy.exc import IntegrityError
+from .database import db
+
+# Arbitrary application-wide key for pg_advisory_lock
+MIGRATION_LOCK_ID = 7_031_942
+
+Migration = namedtuple('Migration', 'version name upgrade transactional')
+MIGRATIONS = []
+
+
+class SchemaMigration(db.Model):
+    """One applied schema migration"""
+    __tablename__ = 'schema_migrations'
+
+    version = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+def migration(version, name, transactional=True):
+    """Register a migration function taking (connection, online)"""
+    def register(fn):
+        if any(existing.version == version for existing in MIGRATIONS):
+            raise ValueError(f'Duplicate migration version {version}')
+        MIGRATIONS.append(Migration(version, name, fn, transactional))
+        MIGRATIONS.sort(key=lambda item: item.version)
+        return fn
+    return register
+
+
+def add_column(connection, table, column, ddl_type):
+    """Add a nullable column unless it already exists"""
+    columns = {column_info['name'] for column_info in inspect(connection).get_columns(table)}
+    if column not in columns:
+        connection.exec_driver_sql(f'ALTER TABLE {table} ADD COLUMN {column} {ddl_type}')
+
+
+def create_index(connection, name, table, columns, unique=False, online=False):
+    """Create an index unless it already exists, concurrently when online on PostgreSQL"""
+    unique_sql = 'UNIQUE ' if unique else ''
+    concurrently = ''
+    if online and connection.dialect.name == 'postgresql':
+        # An interrupted concurrent build leaves an INVALID index behind; rebuild it
+        invalid = connection.exec_driver_sql(
+            'SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid '
+            'WHERE c.relname = %(name)s AND NOT i.indisvalid', {'name': name}
+        ).first()
+        if invalid:
+            connection.exec_driver_sql(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+        concurrently = 'CONCURRENTLY '
+    connection.exec_driver_sql(
+        f"CREATE {unique_sql}INDEX {concurrently}IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+    )
+
+
+@migration(1, 'Add prompts.external_id for import upserts')
+def _add_prompt_external_id(connection, online):
+    add_column(connection, 'prompts', 'external_id', 'VARCHAR(100)')
+    create_index(connection, 'ix_prompts_external_id', 'prompts', ['external_id'], unique=True)
+
+
+@migration(2, 'Index prompt listings, sort orders and title lookups', transactional=False)
+def _index_prompt_access_paths(connection, online):
+    # The same indexes as Prompt.__table_args__, which creates them on new databases. Spelled out
+    # rather than read from the model so this migration keeps meaning what it did when applied.
+    create_index(connection, 'ix_prompts_category_id_id', 'prompts', ['category_id', 'id'], online=online)
+    create_index(connection, 'ix_prompts_usage_count_id', 'prompts', ['usage_count', 'id'], online=online)
+    create_index(connection, 'ix_prompts_created_at_id', 'prompts', ['created_at', 'id'], online=online)
+    create_index(connection, 'ix_prompts_updated_at', 'prompts', ['updated_at'], online=online)
+    create_index(connection, 'ix_prompts_title', 'prompts', ['title'], online=online)
+
+
+@migration(3, 'Index prompt variables by name, in first-occurrence order')
+def _index_prompt_variables(connection, online):
+    from .variables import PromptVariable, VariableCount, rebuild_prompt_variables
+
+    PromptVariable.__table__.create(connection, checkfirst=True)
+    VariableCount.__table__.create(connection, checkfirst=True)
+    rebuild_prompt_variables(connection)
+
+
+@migration(4, 'Make prompts.usage_count NOT NULL DEFAULT 0')
+def _usage_count_not_null(connection, online):
+    connection.exec_driver_sql('UPDATE prompts SET usage_count = 0 WHERE usage_count IS NULL')
+    if connection.dialect.name == 'postgresql':
+        connection.exec_driver_sql(
+            'ALTER TABLE prompts ALTER COLUMN usage_count SET DEFAULT 0, ALTER COLUMN usage_count SET NOT NULL'
+        )
+    # SQLite cannot alter a column's constraints in place; every writer supplies a count
+
+
+@migration(5, 'Spread each stats counter over shard rows')
+def _shard_stats_counters(connection, online):
+    from .stats import COUNTER_SHARDS, StatsCounter
+
+    table = StatsCounter.__table__
+    columns = {column_info['name'] for column_info in inspect(connection).get_columns('stats_counters')}
+    if 'shard' in columns:
+        return
+    # The primary key changes, so rebuild the small table instead of altering it
+    totals = connection.exec_driver_sql('SELECT name, value FROM stats_counters').all()
+    connection.exec_driver_sql('DROP TABLE stats_counters')
+    table.create(connection)
+    if totals:
+        connection.execute(table.insert(), [
+            {'name': name, 'shard': shard, 'value': value if shard == 0 else 0}
+            for name, value in totals
+            for shard in range(COUNTER_SHARDS)
+        ])
+
+
+def applied_versions():
+    """Get {version: applied_at} for the migrations recorded in the database"""
+    table = SchemaMigration.__table__
+    table.create(db.engine, checkfirst=True)
+    with db.engine.connect() as connection:
+        return dict(connection.execute(db.select(table.c.version, table.c.applied_at)).all())
+
+
+def status():
+    """Get (version, name, applied_at or None) for every known migration"""
+    applied = applied_versions()
+    return [(item.version, item.name, applied.get(item.version)) for item in MIGRATIONS]
+
+
+def _record(connection, item):
+    connection.execute(SchemaMigration.__table__.insert().values(
+        version=item.version, name=item.name, applied_at=datetime.utcnow()
+    ))
+
+
+def _apply(engine, item):
+    if item.transactional or engine.dialect.name != 'postgresql':
+        with engine.begin() as connection:
+            item.upgrade(connection, online=not item.transactional)
+            _record(connection, item)
+        return
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        item.upgrade(connection, online=True)
+    with engine.begin() as connection:
+        _record(connection, item)
+
+
+def upgrade(target=None, echo=None):
+    """Apply pending migrations up to target (default: all); returns the versions applied"""
+    engine = db.engine
+    applied = []
+    with engine.connect() as lock_connection:
+        if engine.dialect.name == 'postgresql':
+            # One migrator at a time across workers and deploy jobs
+            lock_connection.exec_driver_sql(f'SELECT pg_advisory_lock({MIGRATION_LOCK_ID})')
+        try:
+            done = applied_versions()
+            for item in MIGRATIONS:
+                if item.version in done or (target is not None and item.version > target):
+                    continue
+                if echo:
+                    echo(f'Applying {item.version}: {item.name}')
+                try:
+                    _apply(engine, item)
+                except IntegrityError:
+                    # Another process recorded it first; the migration itself is idempotent
+                    continue
+                applied.append(item.version)
+        finally:
+            if engine.dialect.name == 'postgresql':
+                lock_connection.exec_driver_sql(f'SELECT pg_advisory_unlock({MIGRATION_LOCK_ID})')
+    return applied
@@ -0,0 +1,81 @@
+"""
+Keyset (cursor) pagination helpers
+"""
+import base64
+import json
+from datetime import datetime
+from .database import db
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def encode_cursor(kind, values):
+    """Encode sort key values into an opaque, URL-safe cursor token"""
+    payload = {
+        'k': kind,
+        'v': [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, kind, sort):
+    """Decode a cursor token produced by encode_cursor for the same sort
+
+    sort is the list of (column, descending) pairs the cursor was built
+    from; values are converted back to the column types.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        values = payload['v']
+        if payload['k'] != kind or len(values) != len(sort):
+            raise InvalidCursor('Cursor does not match this listing')
+        return [_coerce(column, value) for (column, _), value in zip(sort, values)]
+    except InvalidCursor:
+        raise
+    except Exception:
+        raise InvalidCursor('Invalid cursor')
+
+
+def _coerce(column, value):
+    if value is None:
+        return None
+    python_type = getattr(getattr(column, 'type', None), 'python_type', None)
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type in (int, float):
+        return python_type(value)
+    return value
+
+
+def keyset_filter(sort, after):
+    """Build the WHERE clause selecting rows that sort strictly after `after`"""
+    clauses = []
+    for index, (column, descending) in enumerate(sort):
+        equal_prefix = [sort[i][0] == after[i] for i in range(index)]
+        beyond = column < after[index] if descending else column > after[index]
+        clauses.append(db.and_(*equal_prefix, beyond))
+    return db.or_(*clauses)
+
+
+def keyset_page(query, sort, after=None, limit=None):
+    """Apply keyset ordering and limits to a query
+
+    Returns (rows, last_values) where last_values holds the sort key of the
+    last row when another page exists, otherwise None.
+    """
+    if after is not None:
+        query = query.filter(keyset_filter(sort, after))
+    query = query.order_by(*[column.desc() if descending else column.asc() for column, descending in sort])
+    if not limit or limit <= 0:
+        return query.all(), None
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, [getattr(last, column.key) for column, _ in sort]
@@ -4,37 +4,95 @@ Prompt model for storing AI prompts
 import json
 import re
 from datetime import datetime
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, load_only
 from .database import db
+from .pagination import decode_cursor, encode_cursor, keyset_page
+from .search import can_rank, ranked_search, register_search_events
+from .template import compile_template
+from .usage import usage_recorder
 
 class Prompt(db.Model):
     """Prompt model for storing AI prompts with variables"""
     __tablename__ = 'prompts'
+    __table_args__ = (
+        # Per-category listings, most used, recent and title lookups. create_all builds these for new
+        # databases; migration 2 adds the same ones to existing databases. Change them only together
+        # with a new migration, since applied migrations are never edited.
+        db.Index('ix_prompts_category_id_id', 'category_id', 'id'),
+        db.Index('ix_prompts_usage_count_id', 'usage_count', 'id'),
+        db.Index('ix_prompts_created_at_id', 'created_at', 'id'),
+        db.Index('ix_prompts_updated_at', 'updated_at'),
+        db.Index('ix_prompts_title', 'title'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    variables = db.Column(db.Text)  # JSON string of variables
+    # JSON list of variables in first-occurrence order; indexed by name in prompt_variables
+    variables = db.Column(db.Text)
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    usage_count = db.Column(db.Integer, default=0)
+    # Not nullable, so the most_used keyset never skips rows with NULL counts
+    usage_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Stable identifier from another environment, used to upsert on import
+    external_id = db.Column(db.String(100), unique=True, index=True)
     
     def __repr__(self):
         return f'<Prompt {self.title}>'
     
-    def to_dict(self):
-        """Convert prompt to dictionary"""
-        return {
-            'id': self.id,
-            'title': self.title,
-            'content': self.content,
-            'variables': self.get_variables(),
-            'category_id': self.category_id,
-            'category_name': self.category.name if self.category else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'usage_count': self.usage_count
+    # Fields that can be requested with ?fields= on list endpoints
+    FIELDS = (
+        'id', 'title', 'content', 'variables', 'category_id', 'category_name',
+        'created_at', 'updated_at', 'usage_count'
+    )
+    
+    def to_dict(self, fields=None):
+        """Convert prompt to dictionary, optionally limited to some fields"""
+        data = {
+            'id': lambda: self.id,
+            'title': lambda: self.title,
+            'content': lambda: self.content,
+            'variables': self.get_variables,
+            'category_id': lambda: self.category_id,
+            'category_name': lambda: self.category.name if self.category else None,
+            'created_at': lambda: self.created_at.isoformat() if self.created_at else None,
+            'updated_at': lambda: self.updated_at.isoformat() if self.updated_at else None,
+            'usage_count': lambda: self.usage_count
         }
+        return {name: data[name]() for name in (fields or self.FIELDS)}
+    
+    @classmethod
+    def parse_fields(cls, fields_param):
+        """Parse a comma separated ?fields= value into a field list
+        
+        Returns None when all fields are wanted; raises ValueError for
+        unknown field names.
+        """
+        if not fields_param:
+            return None
+        fields = [name.strip() for name in fields_param.split(',') if name.strip()]
+        unknown = [name for name in fields if name not in cls.FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        if 'id' not in fields:
+            fields.insert(0, 'id')
+        return list(dict.fromkeys(fields))
+    
+    @classmethod
+    def with_fields(cls, query, fields=None):
+        """Restrict a prompt query to the columns needed for the given fields"""
+        if fields is None:
+            return query.options(joinedload(cls.category))
+        columns = {'id'}
+        for name in fields:
+            columns.add('category_id' if name == 'category_name' else name)
+        query = query.options(load_only(*[getattr(cls, name) for name in columns]))
+        if 'category_name' in fields:
+            from .category import Category
+            query = query.options(joinedload(cls.category).load_only(Category.name))
+        return query
     
     def get_variables(self):
         """Get variables as a list"""
@@ -51,8 +109,15 @@ class Prompt(db.Model):
     
     def extract_variables(self):
         """Extract variables from content using regex"""
-        variables = re.findall(r'\{([^}]+)\}', self.content)
-        return list(set(variables))  # Remove duplicates
+        return self.find_variables(self.content)
+    
+    @staticmethod
+    def find_variables(content):
+        """Extract variables from template content without a model instance
+        
+        Names are returned once each, in order of first occurrence.
+        """
+        return list(dict.fromkeys(re.findall(r'\{([^}]+)\}', content or '')))
     
     def update_variables(self):
         """Update variables based on current content"""
@@ -60,23 +125,120 @@ class Prompt(db.Model):
         self.set_variables(variables)
         return variables
     
-    def use_with_variables(self, variable_values=None):
-        """Use prompt with variable substitution"""
-        if not variable_values:
-            variable_values = {}
+    def get_template(self):
+        """Get the compiled template for this prompt's content"""
+        cache_key = None
+        if self.id is not None and not inspect(self).attrs.content.history.has_changes():
+            cache_key = (self.id, self.updated_at)
+        return compile_template(self.content, cache_key)
+    
+    def use_with_variables(self, variable_values=None, strict=False):
+        """Use prompt with variable substitution
         
-        content = self.content
-        for var_name, var_value in variable_values.items():
-            content = content.replace(f'{{{var_name}}}', str(var_value))
+        In strict mode a TemplateVariableError is raised when variables are
+        missing or not used by the template.
+        """
+        content = self.get_template().render(variable_values, strict=strict)
         
-        # Increment usage count
-        self.usage_count += 1
+        # Usage is buffered and flushed with an atomic bulk update
+        usage_recorder.record(self.id)
+        if usage_recorder.synchronous and self in db.session:
+            # Flushed on another connection; reload the count on next access
+            db.session.expire(self, ['usage_count'])
         
         return content
     
+    def get_usage_count(self):
+        """Get the stored usage count plus any uses not yet flushed"""
+        return (self.usage_count or 0) + usage_recorder.pending(self.id)
+    
     @classmethod
-    def search(cls, search_term, category_id=None):
-        """Search prompts by title or content"""
+    def increment_usage(cls, counts):
+        """Atomically add usage counts for many prompts in a single write
+        
+        counts maps prompt id to the number of uses to add. The write runs in
+        its own transaction, so it never commits or rolls back whatever the
+        caller's session has pending; on SQLite that session must not hold
+        an open write transaction.
+        """
+        if not counts:
+            return
+        table = cls.__table__
+        # Usage is not an edit, so leave updated_at alone
+        statement = table.update().where(
+            table.c.id == db.bindparam('prompt_id')
+        ).values(
+            usage_count=db.func.coalesce(table.c.usage_count, 0) + db.bindparam('uses'),
+            updated_at=table.c.updated_at
+        )
+        from .stats import record_usage
+        from .usage_log import record_usage_events
+        with db.engine.begin() as connection:
+            connection.execute(statement, [
+                {'prompt_id': prompt_id, 'uses': uses}
+                for prompt_id, uses in counts.items()
+            ])
+            categories = dict(connection.execute(
+                db.select(table.c.id, table.c.category_id).where(table.c.id.in_(list(counts)))
+            ).all())
+            # Not a catalog change: listings tag usage_count weakly, most-used tags the usage total
+            record_usage(connection, counts, categories)
+            record_usage_events(connection, counts, categories)
+    
+    # Keyset sort orders for paginated listings: (column, descending) pairs
+    SORT_ORDERS = {
+        'id': lambda cls: [(cls.id, False)],
+        'recent': lambda cls: [(cls.created_at, True), (cls.id, True)],
+        'most_used': lambda cls: [(cls.usage_count, True), (cls.id, True)],
+    }
+    
+    @classmethod
+    def page(cls, query=None, order='id', cursor=None, limit=None, fields=None, kind=None):
+        """Get one keyset-paginated page of prompts
+        
+        Returns (prompts, next_cursor); next_cursor is None on the last page.
+        Cursors are tagged with kind (default: the order name); raises
+        InvalidCursor for cursors from another listing.
+        """
+        kind = kind or order
+        sort = cls.SORT_ORDERS[order](cls)
+        after = decode_cursor(cursor, kind, sort) if cursor else None
+        query = cls.with_fields(query if query is not None else cls.query, fields)
+        prompts, last = keyset_page(query, sort, after, limit)
+        return prompts, encode_cursor(kind, last) if last else None
+    
+    @classmethod
+    def search(cls, search_term, category_id=None, limit=None):
+        """Search prompts by title or content, most relevant first"""
+        return [prompt for prompt, _ in cls.search_with_snippets(search_term, category_id, limit)]
+    
+    @classmethod
+    def search_with_snippets(cls, search_term, category_id=None, limit=None):
+        """Search prompts and return (prompt, highlighted snippet) pairs"""
+        return cls.search_page(search_term, category_id, limit=limit)[0]
+    
+    @classmethod
+    def search_page(cls, search_term, category_id=None, cursor=None, limit=None, fields=None):
+        """Search prompts, returning ([(prompt, snippet)], next_cursor)
+        
+        Uses the full-text index when one is available; otherwise falls back
+        to LIKE matching ordered by id, without ranking or snippets.
+        """
+        if can_rank(search_term):
+            ranked_sort = [(db.literal_column('rank', db.Float), False), (cls.id, False)]
+            after = decode_cursor(cursor, 'search', ranked_sort) if cursor else None
+            ranked = ranked_search(search_term, category_id, (limit + 1) if limit and limit > 0 else None, after)
+            next_cursor = None
+            if limit and limit > 0 and len(ranked) > limit:
+                ranked = ranked[:limit]
+                _, _, last_rank = ranked[-1]
+                next_cursor = encode_cursor('search', [last_rank, ranked[-1][0]])
+            ids = [pid for pid, _, _ in ranked]
+            query = cls.with_fields(cls.query.filter(cls.id.in_(ids)), fields)
+            prompts = {prompt.id: prompt for prompt in query.all()}
+            results = [(prompts[pid], snippet) for pid, snippet, _ in ranked if pid in prompts]
+            return results, next_cursor
+        
         query = cls.query
         
         if category_id:
@@ -90,19 +252,24 @@ class Prompt(db.Model):
                 )
             )
         
-        return query.all()
+        # Tagged apart from ranked cursors, which cannot continue a LIKE search
+        prompts, next_cursor = cls.page(query, 'id', cursor, limit, fields, kind='search-like')
+        return [(prompt, None) for prompt in prompts], next_cursor
     
     @classmethod
     def get_by_category(cls, category_id):
         """Get all prompts in a category"""
-        return cls.query.filter_by(category_id=category_id).all()
+        return cls.with_fields(cls.query.filter_by(category_id=category_id)).all()
     
     @classmethod
     def get_most_used(cls, limit=10):
         """Get most used prompts"""
-        return cls.query.order_by(cls.usage_count.desc()).limit(limit).all()
+        return cls.page(order='most_used', limit=limit)[0]
     
     @classmethod
     def get_recent(cls, limit=10):
         """Get recently created prompts"""
-        return cls.query.order_by(cls.created_at.desc()).limit(limit).all()
+        return cls.page(order='recent', limit=limit)[0]
+
+
+register_search_events(Prompt.__table__)
@@ -0,0 +1,116 @@
+"""
+EXPLAIN-based check that hot endpoints use indexes
+
+Each listed endpoint is requested through the test client while its
+SELECT statements are captured; every statement is then explained. On
+SQLite a SCAN of a watched table fails the check, except when it is the
+outer loop of the top-level query, that query has a LIMIT and no WHERE,
+and no sort step follows: the walk then stops early. Scans inside
+subqueries are never exempt. On PostgreSQL sequential scans are disabled
+for the check, so a Seq Scan means no usable index exists.
+"""
+import re
+from sqlalchemy import event
+from .database import db
+
+# Tables that grow with the catalog and must never be scanned in full
+WATCHED_TABLES = ('prompts', 'prompt_variables', 'usage_events', 'usage_hourly', 'usage_daily')
+
+# Endpoints on the hot path; {category_id} and {prompt_id} are filled from the data
+HOT_ENDPOINTS = (
+    '/api/categories',
+    '/api/categories/{category_id}/prompts?limit=20',
+    '/api/prompts?limit=20',
+    '/api/prompts?category_id={category_id}&limit=20',
+    '/api/prompts?variable=recipient&limit=20',
+    '/api/prompts/{prompt_id}',
+    '/api/prompts/most-used',
+    '/api/prompts/recent',
+    '/api/prompts/search?q=email&limit=20',
+    '/api/stats',
+    '/api/stats/prompts/trending',
+    '/api/stats/variables',
+)
+
+_SQLITE_SCAN = re.compile(r'^SCAN (\w+)\b')
+_SQLITE_LOOP = re.compile(r'^(SCAN|SEARCH) ')
+_PARENTHESIZED = re.compile(r'\([^()]*\)')
+
+
+def _capture(engine, client, path):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        client.get(path).get_data()
+    finally:
+        event.remove(engine, 'before_cursor_execute', capture)
+    return statements
+
+
+def _top_level_sql(statement):
+    """Drop every parenthesized part (subqueries, function calls) from a statement"""
+    previous = None
+    while previous != statement:
+        previous, statement = statement, _PARENTHESIZED.sub(' ', statement)
+    return ' '.join(statement.upper().split())
+
+
+def _sqlite_violations(connection, statement, parameters):
+    # Rows are (id, parent, notused, detail); the top-level query's steps have parent 0
+    rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+    plan = [row[-1] for row in rows]
+    top_level = [row for row in rows if row[1] == 0]
+    outer_loop = next((row for row in top_level if _SQLITE_LOOP.match(row[-1])), None)
+    top_sql = _top_level_sql(statement)
+    # A walk of the outer loop stops at the LIMIT, unless rows are filtered or sorted afterwards
+    stops_early = (' LIMIT ' in top_sql and ' WHERE ' not in top_sql
+                   and not any(row[-1].startswith('USE TEMP B-TREE FOR ORDER BY') for row in top_level))
+    violations = []
+    for row in rows:
+        match = _SQLITE_SCAN.match(row[-1])
+        if match and match.group(1) in WATCHED_TABLES and not (stops_early and row is outer_loop):
+            violations.append(row[-1])
+    return plan, violations
+
+
+def _postgres_violations(connection, statement, parameters):
+    connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+    rows = connection.exec_driver_sql(f'EXPLAIN {statement}', parameters).all()
+    plan = [row[0] for row in rows]
+    violations = [
+        line.strip() for line in plan
+        if 'Seq Scan on' in line and any(f'Seq Scan on {table}' in line for table in WATCHED_TABLES)
+    ]
+    return plan, violations
+
+
+def check_query_plans(app, endpoints=HOT_ENDPOINTS):
+    """Explain the queries behind each endpoint
+
+    Returns a list of (path, statement, plan lines, violations) tuples.
+    """
+    from .category import Category
+    from .prompt import Prompt
+
+    with app.app_context():
+        engine = db.engine
+        sample = db.session.query(Prompt.id, Prompt.category_id).order_by(Prompt.id).first()
+        category_id = sample.category_id if sample else (db.session.query(Category.id).scalar() or 1)
+        prompt_id = sample.id if sample else 1
+        db.session.remove()
+
+    client = app.test_client()
+    explain = _postgres_violations if engine.dialect.name == 'postgresql' else _sqlite_violations
+    results = []
+    for template in endpoints:
+        path = template.format(category_id=category_id, prompt_id=prompt_id)
+        for statement, parameters in _capture(engine, client, path):
+            with engine.begin() as connection:
+                plan, violations = explain(connection, statement, parameters)
+            results.append((path, statement, plan, violations))
+    return results
@@ -0,0 +1,89 @@
+"""
+Read-replica routing for the database session
+
+Views marked with @read_replica send their SELECTs to a replica bind
+(SQLALCHEMY_BINDS keys starting with 'replica'); everything else, and any
+read after a write, goes to the primary. A successful write request sets a
+short-lived cookie so the same client keeps reading from the primary until
+replicas have caught up (read-your-writes).
+"""
+import random
+import time
+from functools import wraps
+from flask import current_app, g, has_app_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql import Select, CompoundSelect, TextClause
+
+REPLICA_PREFIX = 'replica'
+STICKY_COOKIE = 'db_primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def _is_read(clause):
+    if isinstance(clause, (Select, CompoundSelect)):
+        return clause._for_update_arg is None
+    if isinstance(clause, TextClause):
+        return clause.text.lstrip()[:6].upper() == 'SELECT'
+    return False
+
+
+def current_replica():
+    """Get the replica bind key chosen for this request, or None for the primary"""
+    if not has_app_context() or g.get('db_wrote'):
+        return None
+    return g.get('db_replica')
+
+
+class RoutingSession(Session):
+    """Session that sends reads to the request's replica, if one was chosen"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and _is_read(clause):
+            key = current_replica()
+            if key is not None:
+                return self._db.engines[key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_write(session, flush_context):
+    # Later reads in this request must see what was just written
+    if has_app_context():
+        g.db_wrote = True
+
+
+def _sticky():
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def read_replica(view):
+    """Route the reads of a read-only view to a replica when one is configured"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        replicas = current_app.extensions.get('db_replicas')
+        if replicas and not _sticky():
+            g.db_replica = random.choice(replicas)
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def _set_sticky_cookie(response):
+    if (request.method not in SAFE_METHODS or g.get('db_wrote')) and response.status_code < 400:
+        seconds = current_app.config.get('DB_REPLICA_STICKY_SECONDS', 5)
+        response.set_cookie(STICKY_COOKIE, f'{time.time() + seconds:.3f}', max_age=max(1, int(seconds + 1)),
+                            httponly=True, samesite='Lax')
+    return response
+
+
+def init_replicas(app):
+    """Register the replica binds of an app and the read-your-writes cookie"""
+    replicas = sorted(key for key in app.config.get('SQLALCHEMY_BINDS') or {}
+                      if key.startswith(REPLICA_PREFIX))
+    app.extensions['db_replicas'] = replicas
+    if replicas:
+        app.after_request(_set_sticky_cookie)
+    return replicas
@@ -0,0 +1,184 @@
+"""
+Full-text search index for prompts
+
+SQLite uses an external-content FTS5 table kept in sync by triggers.
+PostgreSQL uses a generated tsvector column with a GIN index. Other
+databases fall back to LIKE matching.
+
+Snippets are HTML: the database marks matches with private-use sentinel
+characters, the text is escaped, and only then are the sentinels turned
+into <mark> tags, so prompt content can never inject markup.
+"""
+import html
+import re
+from flask import current_app
+from sqlalchemy import event, text
+from .database import db
+
+FTS_TABLE = 'prompts_fts'
+SNIPPET_START = '<mark>'
+SNIPPET_END = '</mark>'
+# Unicode private-use characters that do not occur in prompt text
+SENTINEL_START = '\ue000'
+SENTINEL_END = '\ue001'
+SNIPPET_WORDS = 16
+
+# Title matches weigh more than content matches
+TITLE_WEIGHT = 10.0
+CONTENT_WEIGHT = 1.0
+
+_SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"title, content, content='prompts', content_rowid='id', tokenize='porter unicode61')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON prompts BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON prompts BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content) "
+    f"VALUES ('delete', old.id, old.title, old.content); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, content ON prompts BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content) "
+    f"VALUES ('delete', old.id, old.title, old.content); "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+]
+
+_POSTGRES_DDL = [
+    "ALTER TABLE prompts ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    "GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'B')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_prompts_search_vector ON prompts USING GIN (search_vector)",
+]
+
+
+def _drop_sqlite_index(target, connection, **kw):
+    """Drop the FTS table together with prompts so it never holds stale rows"""
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def register_search_events(prompt_table):
+    """Keep the search index lifecycle tied to the prompts table"""
+    event.listen(prompt_table, 'before_drop', _drop_sqlite_index)
+
+
+def ensure_search_index():
+    """Create the full-text index for the current database if it is missing
+
+    Returns the backend name ('sqlite' or 'postgresql'), or None when only
+    LIKE matching is available.
+    """
+    dialect = db.engine.dialect.name
+    backend = None
+    try:
+        with db.engine.begin() as connection:
+            if dialect == 'sqlite':
+                exists = connection.exec_driver_sql(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+                ).first()
+                for statement in _SQLITE_DDL:
+                    connection.exec_driver_sql(statement)
+                if not exists:
+                    # Index rows that were written before the FTS table existed
+                    connection.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+                backend = 'sqlite'
+            elif dialect == 'postgresql':
+                for statement in _POSTGRES_DDL:
+                    connection.exec_driver_sql(statement)
+                backend = 'postgresql'
+    except Exception:
+        current_app.logger.exception('Full-text search index unavailable, falling back to LIKE')
+        backend = None
+    current_app.extensions['search_index'] = backend
+    return backend
+
+
+def search_backend():
+    """Get the active full-text backend for the current app"""
+    return current_app.extensions.get('search_index')
+
+
+def _terms(search_term):
+    return re.findall(r'\w+', search_term or '')
+
+
+def _sqlite_match_query(terms):
+    # Quote every term so user input never becomes FTS5 syntax; the last
+    # term is a prefix match to support search-as-you-type
+    quoted = ['"' + term.replace('"', '""') + '"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _postgres_tsquery(terms):
+    return ' & '.join(f"{term}:*" for term in terms)
+
+
+def can_rank(search_term):
+    """Whether ranked_search can serve this term"""
+    return search_backend() is not None and bool(_terms(search_term))
+
+
+def ranked_search(search_term, category_id=None, limit=50, after=None):
+    """Search prompts by relevance using the full-text index
+
+    Returns a list of (prompt_id, snippet, rank) tuples ordered by
+    relevance, or None when no full-text backend is available for this
+    term. Lower ranks sort first; pass the (rank, prompt_id) of the last
+    row as `after` to fetch the next page.
+    """
+    backend = search_backend()
+    terms = _terms(search_term)
+    if backend is None or not terms:
+        return None
+
+    params = {'limit': limit if limit and limit > 0 else -1}
+    filters = ''
+    if category_id:
+        filters += ' AND p.category_id = :category_id'
+        params['category_id'] = category_id
+
+    if backend == 'sqlite':
+        params['query'] = _sqlite_match_query(terms)
+        rank = f'bm25({FTS_TABLE}, {TITLE_WEIGHT}, {CONTENT_WEIGHT})'
+        if after is not None:
+            filters += f' AND ({rank} > :after_rank OR ({rank} = :after_rank AND p.id > :after_id))'
+        sql = (
+            f"SELECT p.id AS id, {rank} AS rank, "
+            f"snippet({FTS_TABLE}, -1, '{SENTINEL_START}', '{SENTINEL_END}', '…', {SNIPPET_WORDS}) AS snippet "
+            f"FROM {FTS_TABLE} JOIN prompts p ON p.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH :query{filters} "
+            f"ORDER BY rank, p.id "
+            f"LIMIT :limit"
+        )
+    else:
+        params['query'] = _postgres_tsquery(terms)
+        if params['limit'] < 0:
+            params['limit'] = None
+        # Negate ts_rank_cd so that, as with bm25, lower ranks are better
+        rank = '(-ts_rank_cd(p.search_vector, q.query))'
+        if after is not None:
+            filters += (f' AND ({rank} > CAST(:after_rank AS real) '
+                        f'OR ({rank} = CAST(:after_rank AS real) AND p.id > :after_id))')
+        sql = (
+            f"SELECT p.id AS id, {rank} AS rank, "
+            f"ts_headline('english', p.content, q.query, "
+            f"'StartSel={SENTINEL_START}, StopSel={SENTINEL_END}, MaxWords={SNIPPET_WORDS}, MinWords=4') AS snippet "
+            f"FROM prompts p, to_tsquery('english', :query) AS q(query) "
+            f"WHERE p.search_vector @@ q.query{filters} "
+            f"ORDER BY rank, p.id "
+            f"LIMIT :limit"
+        )
+
+    if after is not None:
+        params['after_rank'], params['after_id'] = after
+
+    rows = db.session.execute(text(sql), params).all()
+    return [(row.id, highlight_snippet(row.snippet), row.rank) for row in rows]
+
+
+def highlight_snippet(snippet):
+    """Escape a sentinel-marked snippet and turn its markers into <mark> tags"""
+    if snippet is None:
+        return None
+    escaped = html.escape(snippet)
+    return escaped.replace(SENTINEL_START, SNIPPET_START).replace(SENTINEL_END, SNIPPET_END)
@@ -0,0 +1,165 @@
+"""
+SQLite connection tuning and background maintenance
+
+PRAGMAs from SQLITE_PRAGMAS are applied to every new connection. A
+background thread runs passive WAL checkpoints and a bounded ANALYZE at
+the configured intervals so the WAL file stays small and the query planner
+keeps up-to-date statistics.
+"""
+import atexit
+import re
+import threading
+import time
+from sqlalchemy import event
+
+PRAGMA_NAME = re.compile(r'^[a-z_]+$')
+PRAGMA_VALUE = re.compile(r'^-?\w+$')
+CHECKPOINT_MODES = ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE')
+# Rows sampled per index by ANALYZE, which keeps it fast on large tables
+ANALYSIS_LIMIT = 1000
+
+
+def _sqlite_engines(db):
+    return [engine for engine in db.engines.values() if engine.dialect.name == 'sqlite']
+
+
+def apply_pragmas(dbapi_connection, pragmas):
+    """Set PRAGMAs on a raw sqlite3 connection"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            if not PRAGMA_NAME.match(name) or not PRAGMA_VALUE.match(str(value)):
+                raise ValueError(f'Invalid SQLite pragma {name}={value}')
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+def install_pragmas(engine, pragmas):
+    """Apply PRAGMAs to every connection the engine opens from now on"""
+    def on_connect(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, pragmas)
+    event.listen(engine, 'connect', on_connect)
+
+
+def read_pragmas(engine, names):
+    """Get the current value of some PRAGMAs from a pooled connection"""
+    with engine.connect() as connection:
+        return {name: connection.exec_driver_sql(f'PRAGMA {name}').scalar() for name in names}
+
+
+def checkpoint(engine, mode='PASSIVE'):
+    """Checkpoint the WAL; returns (busy, wal pages, checkpointed pages)"""
+    mode = mode.upper()
+    if mode not in CHECKPOINT_MODES:
+        raise ValueError(f"mode must be one of: {', '.join(CHECKPOINT_MODES)}")
+    with engine.connect() as connection:
+        row = connection.exec_driver_sql(f'PRAGMA wal_checkpoint({mode})').first()
+        connection.commit()
+    return tuple(row)
+
+
+def analyze(engine, limit=ANALYSIS_LIMIT):
+    """Refresh the query planner statistics"""
+    with engine.connect() as connection:
+        if limit:
+            connection.exec_driver_sql(f'PRAGMA analysis_limit={int(limit)}')
+        connection.exec_driver_sql('ANALYZE')
+        connection.commit()
+
+
+class SQLiteMaintenance:
+    """Applies connection PRAGMAs and runs periodic checkpoint/ANALYZE jobs"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.db = None
+        self.checkpoint_interval = 0.0
+        self.analyze_interval = 0.0
+        self._last_checkpoint = 0.0
+        self._last_analyze = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._atexit_registered = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, db=None):
+        """Install PRAGMAs on the app's SQLite engines and schedule maintenance"""
+        from .database import db as default_db
+
+        self.app = app
+        self.db = db or default_db
+        self.checkpoint_interval = float(app.config.get('SQLITE_CHECKPOINT_INTERVAL', 0))
+        self.analyze_interval = float(app.config.get('SQLITE_ANALYZE_INTERVAL', 0))
+        app.extensions['sqlite_maintenance'] = self
+        pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+        with app.app_context():
+            engines = _sqlite_engines(self.db)
+            for engine in engines:
+                if pragmas:
+                    install_pragmas(engine, pragmas)
+        if engines and (self.checkpoint_interval > 0 or self.analyze_interval > 0):
+            now = time.monotonic()
+            self._last_checkpoint = self._last_analyze = now
+            # Started on the first request so forked workers each get their own thread
+            app.before_request(self._ensure_thread)
+            if not self._atexit_registered:
+                atexit.register(self.shutdown)
+                self._atexit_registered = True
+
+    def run_due(self, force=False):
+        """Run the jobs whose interval has elapsed; returns the names that ran"""
+        now = time.monotonic()
+        ran = []
+        with self.app.app_context():
+            engines = _sqlite_engines(self.db)
+            if force or (self.checkpoint_interval > 0 and now - self._last_checkpoint >= self.checkpoint_interval):
+                self._last_checkpoint = now
+                for engine in engines:
+                    checkpoint(engine, 'PASSIVE')
+                ran.append('checkpoint')
+            if force or (self.analyze_interval > 0 and now - self._last_analyze >= self.analyze_interval):
+                self._last_analyze = now
+                for engine in engines:
+                    analyze(engine)
+                ran.append('analyze')
+        return ran
+
+    def shutdown(self):
+        """Stop the maintenance thread and truncate the WAL"""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+        if self.app is None:
+            return
+        try:
+            with self.app.app_context():
+                for engine in _sqlite_engines(self.db):
+                    checkpoint(engine, 'TRUNCATE')
+        except Exception:
+            pass
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='sqlite-maintenance', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        intervals = [value for value in (self.checkpoint_interval, self.analyze_interval) if value > 0]
+        wait = max(1.0, min(intervals) / 4)
+        while not self._stop.wait(wait):
+            try:
+                self.run_due()
+            except Exception:
+                self.app.logger.exception('SQLite maintenance failed')
+
+
+sqlite_maintenance = SQLiteMaintenance()
@@ -0,0 +1,220 @@
+"""
+Incrementally maintained statistics for the dashboard
+
+Totals and per-category counts are kept up to date by mapper events as
+prompts and categories are written, so /api/stats never has to aggregate
+over the prompts table. reconcile_stats() rebuilds everything from scratch.
+
+Each application-wide counter is spread over STATS_COUNTER_SHARDS rows.
+Writers bump a random shard, so concurrent prompt inserts and usage
+flushes do not all queue on one row lock; readers sum the shards.
+"""
+import os
+import random
+from sqlalchemy import event, func, inspect, select
+from .database import db
+from .category import Category
+from .prompt import Prompt
+
+TOTAL_CATEGORIES = 'total_categories'
+TOTAL_PROMPTS = 'total_prompts'
+TOTAL_USAGE = 'total_usage'
+COUNTERS = (TOTAL_CATEGORIES, TOTAL_PROMPTS, TOTAL_USAGE)
+COUNTER_SHARDS = max(1, int(os.getenv('STATS_COUNTER_SHARDS', '16')))
+
+
+class StatsCounter(db.Model):
+    """One shard of a named application-wide counter"""
+    __tablename__ = 'stats_counters'
+
+    name = db.Column(db.String(50), primary_key=True)
+    shard = db.Column(db.Integer, primary_key=True, autoincrement=False, default=0)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class CategoryStats(db.Model):
+    """Prompt count and usage total for one category"""
+    __tablename__ = 'category_stats'
+
+    category_id = db.Column(db.Integer, primary_key=True)
+    prompt_count = db.Column(db.Integer, nullable=False, default=0)
+    total_usage = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+_counters = StatsCounter.__table__
+_category_stats = CategoryStats.__table__
+
+
+def _bump_counter(connection, name, delta):
+    if not delta:
+        return
+    shard = random.randrange(COUNTER_SHARDS)
+    result = connection.execute(
+        _counters.update().where(_counters.c.name == name, _counters.c.shard == shard)
+        .values(value=_counters.c.value + delta)
+    )
+    if result.rowcount == 0 and shard != 0:
+        # Shards are created by reconcile_stats; shard 0 always exists
+        connection.execute(
+            _counters.update().where(_counters.c.name == name, _counters.c.shard == 0)
+            .values(value=_counters.c.value + delta)
+        )
+
+
+def _bump_category(connection, category_id, prompts=0, usage=0):
+    if category_id is None or not (prompts or usage):
+        return
+    result = connection.execute(
+        _category_stats.update().where(_category_stats.c.category_id == category_id).values(
+            prompt_count=_category_stats.c.prompt_count + prompts,
+            total_usage=_category_stats.c.total_usage + usage
+        )
+    )
+    if result.rowcount == 0:
+        connection.execute(_category_stats.insert().values(
+            category_id=category_id, prompt_count=prompts, total_usage=usage
+        ))
+
+
+@event.listens_for(Category, 'after_insert')
+def _category_inserted(mapper, connection, target):
+    connection.execute(_category_stats.insert().values(category_id=target.id, prompt_count=0, total_usage=0))
+    _bump_counter(connection, TOTAL_CATEGORIES, 1)
+
+
+@event.listens_for(Category, 'after_delete')
+def _category_deleted(mapper, connection, target):
+    connection.execute(_category_stats.delete().where(_category_stats.c.category_id == target.id))
+    _bump_counter(connection, TOTAL_CATEGORIES, -1)
+
+
+@event.listens_for(Prompt, 'after_insert')
+def _prompt_inserted(mapper, connection, target):
+    usage = target.usage_count or 0
+    _bump_category(connection, target.category_id, prompts=1, usage=usage)
+    _bump_counter(connection, TOTAL_PROMPTS, 1)
+    _bump_counter(connection, TOTAL_USAGE, usage)
+
+
+def _stored_usage(connection, prompt_id):
+    # The loaded usage_count misses increments flushed since the prompt was read
+    table = Prompt.__table__
+    return connection.execute(select(table.c.usage_count).where(table.c.id == prompt_id)).scalar() or 0
+
+
+@event.listens_for(Prompt, 'before_delete')
+def _prompt_deleted(mapper, connection, target):
+    usage = _stored_usage(connection, target.id)
+    _bump_category(connection, target.category_id, prompts=-1, usage=-usage)
+    _bump_counter(connection, TOTAL_PROMPTS, -1)
+    _bump_counter(connection, TOTAL_USAGE, -usage)
+
+
+@event.listens_for(Prompt, 'after_update')
+def _prompt_updated(mapper, connection, target):
+    history = inspect(target).attrs.category_id.history
+    if not history.deleted or not history.added:
+        return
+    old_category_id, new_category_id = history.deleted[0], history.added[0]
+    if old_category_id == new_category_id:
+        return
+    usage = _stored_usage(connection, target.id)
+    _bump_category(connection, old_category_id, prompts=-1, usage=-usage)
+    _bump_category(connection, new_category_id, prompts=1, usage=usage)
+
+
+def record_usage(connection, counts, categories):
+    """Add usage increments (prompt id -> uses) to the statistics
+
+    categories maps each existing prompt id to its category id.
+    """
+    per_category = {}
+    total = 0
+    for prompt_id, category_id in categories.items():
+        per_category[category_id] = per_category.get(category_id, 0) + counts[prompt_id]
+        total += counts[prompt_id]
+    for category_id, usage in per_category.items():
+        _bump_category(connection, category_id, usage=usage)
+    _bump_counter(connection, TOTAL_USAGE, total)
+
+
+def record_bulk_changes(connection, new_category_ids=(), category_deltas=None):
+    """Apply statistics for rows written with core bulk statements
+
+    Bulk inserts and updates bypass the mapper events, so callers pass the
+    ids of categories they created and a map of category id to
+    (prompt count delta, usage delta).
+    """
+    new_category_ids = list(new_category_ids)
+    if new_category_ids:
+        connection.execute(_category_stats.insert(), [
+            {'category_id': category_id, 'prompt_count': 0, 'total_usage': 0}
+            for category_id in new_category_ids
+        ])
+        _bump_counter(connection, TOTAL_CATEGORIES, len(new_category_ids))
+    prompts_total = usage_total = 0
+    for category_id, (prompts, usage) in (category_deltas or {}).items():
+        _bump_category(connection, category_id, prompts=prompts, usage=usage)
+        prompts_total += prompts
+        usage_total += usage
+    _bump_counter(connection, TOTAL_PROMPTS, prompts_total)
+    _bump_counter(connection, TOTAL_USAGE, usage_total)
+
+
+def reconcile_stats():
+    """Rebuild all statistics from the prompts and categories tables"""
+    connection = db.session.connection()
+    connection.execute(_counters.delete())
+    connection.execute(_category_stats.delete())
+
+    category_rows = db.session.query(
+        Category.id,
+        func.count(Prompt.id),
+        func.coalesce(func.sum(Prompt.usage_count), 0)
+    ).outerjoin(Prompt, Prompt.category_id == Category.id).group_by(Category.id).all()
+    if category_rows:
+        connection.execute(_category_stats.insert(), [
+            {'category_id': category_id, 'prompt_count': prompt_count, 'total_usage': int(usage)}
+            for category_id, prompt_count, usage in category_rows
+        ])
+
+    totals = {
+        TOTAL_CATEGORIES: len(category_rows),
+        TOTAL_PROMPTS: sum(row[1] for row in category_rows),
+        TOTAL_USAGE: sum(int(row[2]) for row in category_rows),
+    }
+    connection.execute(_counters.insert(), [
+        {'name': name, 'shard': shard, 'value': value if shard == 0 else 0}
+        for name, value in totals.items()
+        for shard in range(COUNTER_SHARDS)
+    ])
+    db.session.commit()
+    return totals
+
+
+def ensure_stats():
+    """Build the statistics tables on first start"""
+    if db.session.query(StatsCounter.name).filter(StatsCounter.shard == 0).count() < len(COUNTERS):
+        return reconcile_stats()
+    return None
+
+
+def get_counter(name):
+    """Get one application total, summed over its shards"""
+    return int(db.session.query(func.coalesce(func.sum(StatsCounter.value), 0))
+               .filter(StatsCounter.name == name).scalar())
+
+
+def get_overview():
+    """Get the application totals"""
+    values = dict(db.session.query(StatsCounter.name, func.sum(StatsCounter.value)).group_by(StatsCounter.name).all())
+    return {name: int(values.get(name, 0)) for name in COUNTERS}
+
+
+def get_category_breakdown():
+    """Get (category name, prompt count, total usage) rows"""
+    return db.session.query(
+        Category.name,
+        CategoryStats.prompt_count,
+        CategoryStats.total_usage
+    ).join(CategoryStats, CategoryStats.category_id == Category.id).order_by(Category.id).all()
@@ -0,0 +1,114 @@
+"""
+Compiled prompt templates for fast variable substitution
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+
+# Same placeholder syntax as Prompt.extract_variables
+PLACEHOLDER_PATTERN = re.compile(r'\{([^}]+)\}')
+
+TEMPLATE_CACHE_SIZE = int(os.getenv('TEMPLATE_CACHE_SIZE', '1024'))
+
+
+class TemplateVariableError(ValueError):
+    """Raised in strict mode when supplied variables do not match the template"""
+
+    def __init__(self, missing=None, unknown=None):
+        self.missing = list(missing or [])
+        self.unknown = list(unknown or [])
+        parts = []
+        if self.missing:
+            parts.append(f"missing variables: {', '.join(self.missing)}")
+        if self.unknown:
+            parts.append(f"unknown variables: {', '.join(self.unknown)}")
+        super().__init__('; '.join(parts) or 'invalid variables')
+
+
+class CompiledTemplate:
+    """Prompt content parsed once into literal and placeholder segments"""
+
+    __slots__ = ('literals', 'names', 'variables', '_variable_set')
+
+    def __init__(self, content):
+        # literals has one more entry than names: lit0, name0, lit1, name1, ..., litN
+        self.literals = []
+        self.names = []
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(content or ''):
+            self.literals.append(content[position:match.start()])
+            self.names.append(match.group(1))
+            position = match.end()
+        self.literals.append((content or '')[position:])
+        # Unique variable names in first-occurrence order
+        self.variables = list(dict.fromkeys(self.names))
+        self._variable_set = frozenset(self.variables)
+
+    def check(self, variable_values):
+        """Return (missing, unknown) variable names for the supplied values"""
+        missing = [name for name in self.variables if name not in variable_values]
+        unknown = [name for name in variable_values if name not in self._variable_set]
+        return missing, unknown
+
+    def render(self, variable_values=None, strict=False):
+        """Render the template in a single pass over its segments"""
+        variable_values = variable_values or {}
+        if strict:
+            missing, unknown = self.check(variable_values)
+            if missing or unknown:
+                raise TemplateVariableError(missing, unknown)
+
+        literals = self.literals
+        parts = [literals[0]]
+        for index, name in enumerate(self.names):
+            if name in variable_values:
+                parts.append(str(variable_values[name]))
+            else:
+                # Leave unresolved placeholders untouched, as before
+                parts.append(f'{{{name}}}')
+            parts.append(literals[index + 1])
+        return ''.join(parts)
+
+
+class TemplateCache:
+    """Bounded, thread-safe LRU cache of compiled templates"""
+
+    def __init__(self, maxsize=TEMPLATE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, content):
+        """Get the compiled template for key, compiling content on a miss"""
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self._entries.move_to_end(key)
+                return compiled
+
+        compiled = CompiledTemplate(content)
+        with self._lock:
+            self._entries[key] = compiled
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def clear(self):
+        """Drop all cached templates"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+template_cache = TemplateCache()
+
+
+def compile_template(content, cache_key=None):
+    """Compile template content, using the shared cache when a key is given"""
+    if cache_key is None or template_cache.maxsize <= 0:
+        return CompiledTemplate(content)
+    return template_cache.get(cache_key, content)
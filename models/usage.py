@@ -0,0 +1,159 @@
+"""
+Write-behind usage accounting for prompts
+"""
+import atexit
+import threading
+import time
+from collections import Counter
+from flask import has_app_context
+
+
+class UsageRecorder:
+    """Buffers prompt usage increments in process and flushes them in bulk
+
+    Increments are applied with atomic ``usage_count = usage_count + n``
+    updates, so concurrent workers never lose counts. In synchronous mode
+    (used for tests) every record is flushed immediately. Usage events are
+    compacted into the rollups by the background flusher only, never
+    inside a request; in synchronous mode run ``flask stats compact``.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.flush_interval = 5.0
+        self.synchronous = False
+        self.rollup_interval = 60.0
+        self.event_retention_days = 30
+        self.hourly_retention_days = 90
+        self.rollup_settle_seconds = 5.0
+        self._last_rollup = 0.0
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._atexit_registered = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Configure the recorder from the application config"""
+        if self.app is not None and self.app is not app:
+            # Counts buffered for the previous app belong to its database
+            try:
+                self.flush()
+            except Exception:
+                pass
+        self.app = app
+        self.flush_interval = float(app.config.get('USAGE_FLUSH_INTERVAL', 5.0))
+        self.synchronous = bool(app.config.get('USAGE_SYNC_FLUSH', False)) or self.flush_interval <= 0
+        self.rollup_interval = float(app.config.get('USAGE_ROLLUP_INTERVAL', 60.0))
+        self.event_retention_days = app.config.get('USAGE_EVENT_RETENTION_DAYS', 30)
+        self.hourly_retention_days = app.config.get('USAGE_HOURLY_RETENTION_DAYS', 90)
+        self.rollup_settle_seconds = float(app.config.get('USAGE_ROLLUP_SETTLE_SECONDS', 5.0))
+        app.extensions['usage_recorder'] = self
+        if not self._atexit_registered:
+            atexit.register(self.shutdown)
+            self._atexit_registered = True
+
+    def record(self, prompt_id, uses=1):
+        """Record uses of a single prompt"""
+        self.record_many({prompt_id: uses})
+
+    def record_many(self, counts):
+        """Record uses for several prompts at once"""
+        if not counts:
+            return
+        with self._lock:
+            self._pending.update(counts)
+        if self.synchronous:
+            self.flush()
+        else:
+            self._ensure_thread()
+
+    def pending(self, prompt_id=None):
+        """Get buffered, not yet flushed uses for one prompt or in total"""
+        with self._lock:
+            if prompt_id is None:
+                return sum(self._pending.values())
+            return self._pending.get(prompt_id, 0)
+
+    def flush(self):
+        """Write all buffered increments to the database in one transaction"""
+        from .prompt import Prompt
+
+        with self._flush_lock:
+            with self._lock:
+                counts, self._pending = self._pending, Counter()
+            if not counts:
+                return 0
+            try:
+                if has_app_context() or self.app is None:
+                    Prompt.increment_usage(counts)
+                else:
+                    with self.app.app_context():
+                        Prompt.increment_usage(counts)
+            except Exception:
+                # Put the counts back so the next flush retries them
+                with self._lock:
+                    self._pending.update(counts)
+                if self.app is not None:
+                    self.app.logger.exception('Failed to flush prompt usage counts')
+                raise
+            return sum(counts.values())
+
+    def compact(self):
+        """Fold flushed usage events into the hourly and daily rollups"""
+        from .usage_log import compact_usage
+
+        self._last_rollup = time.monotonic()
+        kwargs = {
+            'event_retention_days': self.event_retention_days,
+            'hourly_retention_days': self.hourly_retention_days,
+            'settle_seconds': self.rollup_settle_seconds,
+        }
+        if has_app_context() or self.app is None:
+            return compact_usage(**kwargs)
+        with self.app.app_context():
+            return compact_usage(**kwargs)
+
+    def _maybe_compact(self):
+        if time.monotonic() - self._last_rollup < self.rollup_interval:
+            return
+        try:
+            self.compact()
+        except Exception:
+            if self.app is not None:
+                self.app.logger.exception('Failed to compact prompt usage events')
+
+    def shutdown(self):
+        """Stop the background flusher and write any remaining counts"""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=self.flush_interval + 1)
+        try:
+            self.flush()
+        except Exception:
+            pass
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='usage-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                pass
+            self._maybe_compact()
+
+
+usage_recorder = UsageRecorder()
@@ -0,0 +1,199 @@
+"""
+Append-only prompt usage log with hourly and daily rollups
+
+Every usage flush appends one event per prompt. compact_usage() folds new
+events into the hourly and daily rollup tables, tracking a watermark so
+each event is counted exactly once, and then applies the retention policy.
+Date-range queries read only the rollups.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from .database import db
+
+ROLLUP_WATERMARK = 'usage_rollup_watermark'
+
+
+class UsageEvent(db.Model):
+    """Uses of one prompt recorded by a single flush"""
+    __tablename__ = 'usage_events'
+
+    id = db.Column(db.Integer, primary_key=True)
+    prompt_id = db.Column(db.Integer, nullable=False)
+    category_id = db.Column(db.Integer)
+    used_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    uses = db.Column(db.Integer, nullable=False, default=1)
+
+
+class HourlyUsage(db.Model):
+    """Uses of one prompt within one hour"""
+    __tablename__ = 'usage_hourly'
+
+    bucket = db.Column(db.DateTime, primary_key=True)
+    prompt_id = db.Column(db.Integer, primary_key=True)
+    category_id = db.Column(db.Integer)
+    uses = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class DailyUsage(db.Model):
+    """Uses of one prompt within one day"""
+    __tablename__ = 'usage_daily'
+
+    bucket = db.Column(db.Date, primary_key=True)
+    prompt_id = db.Column(db.Integer, primary_key=True)
+    category_id = db.Column(db.Integer)
+    uses = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class UsageRollupState(db.Model):
+    """Named progress markers for the rollup job"""
+    __tablename__ = 'usage_rollup_state'
+
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+def record_usage_events(connection, counts, categories, used_at=None):
+    """Append one usage event per prompt (prompt id -> uses)"""
+    used_at = used_at or datetime.utcnow()
+    rows = [
+        {'prompt_id': prompt_id, 'category_id': categories.get(prompt_id), 'used_at': used_at, 'uses': uses}
+        for prompt_id, uses in counts.items()
+        if prompt_id in categories
+    ]
+    if rows:
+        connection.execute(UsageEvent.__table__.insert(), rows)
+
+
+def _add_to_rollup(model, totals):
+    table = model.__table__
+    for (bucket, prompt_id), (category_id, uses) in totals.items():
+        result = db.session.execute(
+            table.update().where(
+                table.c.bucket == bucket, table.c.prompt_id == prompt_id
+            ).values(uses=table.c.uses + uses, category_id=category_id)
+        )
+        if result.rowcount == 0:
+            db.session.execute(table.insert().values(
+                bucket=bucket, prompt_id=prompt_id, category_id=category_id, uses=uses
+            ))
+
+
+def _ensure_watermark():
+    """Create the watermark row, tolerating a concurrent insert of the same row"""
+    table = UsageRollupState.__table__
+    dialect = db.engine.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        db.session.execute(insert(table).values(name=ROLLUP_WATERMARK, value=0).on_conflict_do_nothing())
+        db.session.commit()
+        return
+    if db.session.get(UsageRollupState, ROLLUP_WATERMARK) is None:
+        try:
+            db.session.execute(table.insert().values(name=ROLLUP_WATERMARK, value=0))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+
+
+def _lock_watermark():
+    """Take the watermark's write lock for the current transaction and return its value
+
+    A no-op UPDATE is the first statement, so PostgreSQL holds the row lock
+    and SQLite the database write lock until commit; a second compactor
+    waits instead of reading the same watermark.
+    """
+    table = UsageRollupState.__table__
+    db.session.execute(
+        table.update().where(table.c.name == ROLLUP_WATERMARK).values(value=table.c.value)
+    )
+    return db.session.execute(
+        db.select(table.c.value).where(table.c.name == ROLLUP_WATERMARK)
+    ).scalar_one()
+
+
+def compact_usage(event_retention_days=30, hourly_retention_days=90, batch_size=10000, settle_seconds=0):
+    """Fold new usage events into the rollups and apply retention
+
+    Events are folded in id order and the watermark stops at the first event
+    used less than settle_seconds ago, so events committed out of order or
+    stamped by a host with a skewed clock are never skipped. Every batch
+    runs in its own transaction under the watermark lock, so concurrent
+    workers never fold the same events twice. Returns the number of events
+    compacted.
+    """
+    settled_before = datetime.utcnow() - timedelta(seconds=settle_seconds)
+    _ensure_watermark()
+    table = UsageRollupState.__table__
+
+    compacted = 0
+    while True:
+        watermark = _lock_watermark()
+        events = db.session.query(
+            UsageEvent.id, UsageEvent.prompt_id, UsageEvent.category_id, UsageEvent.used_at, UsageEvent.uses
+        ).filter(UsageEvent.id > watermark).order_by(UsageEvent.id).limit(batch_size).all()
+        settled = []
+        for event in events:
+            if event.used_at > settled_before:
+                break
+            settled.append(event)
+        if not settled:
+            db.session.rollback()
+            break
+
+        hourly, daily = {}, {}
+        for event in settled:
+            hour = event.used_at.replace(minute=0, second=0, microsecond=0)
+            for totals, bucket in ((hourly, hour), (daily, hour.date())):
+                _, uses = totals.get((bucket, event.prompt_id), (None, 0))
+                totals[(bucket, event.prompt_id)] = (event.category_id, uses + event.uses)
+        _add_to_rollup(HourlyUsage, hourly)
+        _add_to_rollup(DailyUsage, daily)
+
+        db.session.execute(
+            table.update().where(table.c.name == ROLLUP_WATERMARK).values(value=settled[-1].id)
+        )
+        db.session.commit()
+        compacted += len(settled)
+        if len(settled) < batch_size:
+            break
+
+    watermark = db.session.execute(
+        db.select(table.c.value).where(table.c.name == ROLLUP_WATERMARK)
+    ).scalar_one()
+    now = datetime.utcnow()
+    if event_retention_days is not None:
+        db.session.query(UsageEvent).filter(
+            UsageEvent.id <= watermark,
+            UsageEvent.used_at < now - timedelta(days=event_retention_days)
+        ).delete(synchronize_session=False)
+    if hourly_retention_days is not None:
+        db.session.query(HourlyUsage).filter(
+            HourlyUsage.bucket < now - timedelta(days=hourly_retention_days)
+        ).delete(synchronize_session=False)
+    db.session.commit()
+    return compacted
+
+
+def daily_usage(start, end):
+    """Get (date, uses) rows for days in [start, end]"""
+    return db.session.query(
+        DailyUsage.bucket.label('date'),
+        db.func.sum(DailyUsage.uses).label('usage')
+    ).filter(
+        DailyUsage.bucket >= start, DailyUsage.bucket <= end
+    ).group_by(DailyUsage.bucket).order_by(DailyUsage.bucket).all()
+
+
+def trending_prompt_ids(since, limit=10):
+    """Get (prompt_id, uses) for the most used prompts since a point in time"""
+    return db.session.query(
+        HourlyUsage.prompt_id,
+        db.func.sum(HourlyUsage.uses).label('uses')
+    ).filter(
+        HourlyUsage.bucket >= since.replace(minute=0, second=0, microsecond=0)
+    ).group_by(HourlyUsage.prompt_id).order_by(
+        db.func.sum(HourlyUsage.uses).desc(), HourlyUsage.prompt_id
+    ).limit(limit).all()
@@ -1,4 +1,16 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
 from models.database import db
+from models.routing import RoutingSession
+
+USER_PROFILE_CACHE_SIZE = int(os.getenv('USER_PROFILE_CACHE_SIZE', '1024'))
+# Other workers see profile changes after at most this many seconds
+USER_PROFILE_CACHE_TTL = float(os.getenv('USER_PROFILE_CACHE_TTL', '60'))
+
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -8,3 +20,90 @@ class User(db.Model):
 
     def __repr__(self):
         return f'<User {self.email}>'
+
+    def to_profile(self):
+        """Public profile fields, safe to cache and return to clients"""
+        return {'id': self.id, 'email': self.email, 'name': self.name}
+
+    @classmethod
+    def get_profile(cls, user_id):
+        """Get a user's profile dict, from the cache when possible; None if missing"""
+        profile = user_profile_cache.get(user_id)
+        if profile is None:
+            user = db.session.get(cls, user_id)
+            if user is None:
+                return None
+            profile = user_profile_cache.put(user_id, user.to_profile())
+        # Callers get their own copy; the cached dict is shared between threads
+        return dict(profile)
+
+
+class UserProfileCache:
+    """Bounded, thread-safe LRU cache of user profiles with a TTL"""
+
+    def __init__(self, maxsize=USER_PROFILE_CACHE_SIZE, ttl=USER_PROFILE_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """Get a cached profile, or None when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, profile = entry
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return profile
+
+    def put(self, user_id, profile):
+        """Cache a profile and return it"""
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return profile
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, profile)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return profile
+
+    def invalidate(self, user_id):
+        """Drop one user's cached profile"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        """Drop all cached profiles"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+user_profile_cache = UserProfileCache()
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, target):
+    # Invalidate now and again after commit, so a read between the two cannot keep the old row
+    user_profile_cache.invalidate(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('changed_user_ids', set()).add(target.id)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _invalidate_committed_users(session):
+    for user_id in session.info.pop('changed_user_ids', ()):
+        user_profile_cache.invalidate(user_id)
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _forget_rolled_back_users(session):
+    session.info.pop('changed_user_ids', None)
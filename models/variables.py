@@ -0,0 +1,214 @@
+"""
+Normalized prompt variables
+
+Every prompt's variables are stored one row per name in prompt_variables,
+in first-occurrence order, and indexed by name, so "which prompts use
+{recipient}" is answered from the index instead of parsing the JSON
+variables column of every prompt. variable_counts keeps the number of
+prompts using each name, like the statistics store, so frequencies never
+aggregate over the catalog. The JSON column stays as the per-row copy
+returned in listings.
+
+Rows and counts are rewritten in the same transaction whenever a prompt's
+variables change: by an after_flush hook for ORM writes, and by
+replace_prompt_variables / sync_prompt_variables for bulk writes. Deleted
+prompts are handled before their row goes, since the foreign key cascade
+would otherwise remove the names before the counts could be decremented.
+"""
+import json
+from collections import Counter
+from sqlalchemy import event, select
+from .database import db
+from .prompt import Prompt
+from .routing import RoutingSession
+
+REBUILD_BATCH_SIZE = 1000
+
+
+class PromptVariable(db.Model):
+    """One variable name used by a prompt"""
+    __tablename__ = 'prompt_variables'
+    __table_args__ = (
+        # Prompts using a name, and per-name counts, without touching prompts
+        db.Index('ix_prompt_variables_name_prompt_id', 'name', 'prompt_id', unique=True),
+    )
+
+    prompt_id = db.Column(db.Integer, db.ForeignKey('prompts.id', ondelete='CASCADE'), primary_key=True)
+    # Order of first occurrence in the content
+    position = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.Text, nullable=False)
+
+
+class VariableCount(db.Model):
+    """Number of prompts using one variable name"""
+    __tablename__ = 'variable_counts'
+
+    name = db.Column(db.Text, primary_key=True)
+    prompt_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+# Frequencies are read most used first, ties by name
+db.Index('ix_variable_counts_prompt_count_name', VariableCount.prompt_count.desc(), VariableCount.name)
+
+
+_variables = PromptVariable.__table__
+_counts = VariableCount.__table__
+
+
+def replace_prompt_variables(connection, variables_by_prompt):
+    """Replace the stored variables of several prompts in the caller's transaction
+
+    variables_by_prompt maps prompt id to its ordered list of names; an
+    empty list removes the prompt's rows.
+    """
+    if not variables_by_prompt:
+        return
+    deltas = Counter()
+    ids = list(variables_by_prompt)
+    for start in range(0, len(ids), REBUILD_BATCH_SIZE):
+        batch = ids[start:start + REBUILD_BATCH_SIZE]
+        deltas.subtract(connection.execute(
+            select(_variables.c.name).where(_variables.c.prompt_id.in_(batch))
+        ).scalars())
+        connection.execute(_variables.delete().where(_variables.c.prompt_id.in_(batch)))
+    deltas.update(_insert(connection, variables_by_prompt))
+    _bump_counts(connection, deltas)
+
+
+def _insert(connection, variables_by_prompt):
+    """Insert variable rows; returns the inserted names"""
+    rows = [
+        {'prompt_id': prompt_id, 'position': position, 'name': name}
+        for prompt_id, names in variables_by_prompt.items()
+        for position, name in enumerate(dict.fromkeys(name for name in names if isinstance(name, str)))
+    ]
+    if rows:
+        connection.execute(_variables.insert(), rows)
+    return [row['name'] for row in rows]
+
+
+def _bump_counts(connection, deltas):
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    existing = set()
+    names = list(deltas)
+    for start in range(0, len(names), REBUILD_BATCH_SIZE):
+        existing.update(connection.execute(
+            select(_counts.c.name).where(_counts.c.name.in_(names[start:start + REBUILD_BATCH_SIZE]))
+        ).scalars())
+    if existing:
+        connection.execute(
+            _counts.update().where(_counts.c.name == db.bindparam('b_name'))
+            .values(prompt_count=_counts.c.prompt_count + db.bindparam('b_delta')),
+            [{'b_name': name, 'b_delta': deltas[name]} for name in existing]
+        )
+        # Names no prompt uses any more are dropped from the frequencies
+        connection.execute(_counts.delete().where(_counts.c.prompt_count <= 0))
+    added = [{'name': name, 'prompt_count': delta} for name, delta in deltas.items()
+             if name not in existing and delta > 0]
+    if added:
+        connection.execute(_counts.insert(), added)
+
+
+def _parse(value):
+    try:
+        names = json.loads(value) if value else []
+    except ValueError:
+        return []
+    return names if isinstance(names, list) else []
+
+
+def sync_prompt_variables(connection, prompt_ids):
+    """Rewrite the stored variables of prompts from their variables column"""
+    prompts = Prompt.__table__
+    ids = list(prompt_ids)
+    variables_by_prompt = {}
+    for start in range(0, len(ids), REBUILD_BATCH_SIZE):
+        rows = connection.execute(
+            select(prompts.c.id, prompts.c.variables).where(prompts.c.id.in_(ids[start:start + REBUILD_BATCH_SIZE]))
+        )
+        variables_by_prompt.update((row.id, _parse(row.variables)) for row in rows)
+    replace_prompt_variables(connection, variables_by_prompt)
+
+
+def rebuild_prompt_variables(connection, batch_size=REBUILD_BATCH_SIZE):
+    """Re-derive every prompt's variables from its content and rebuild the index
+
+    Also rewrites the variables column where it differs, e.g. where it was
+    stored without first-occurrence order. Returns the number of prompts.
+    """
+    prompts = Prompt.__table__
+    connection.execute(_variables.delete())
+    connection.execute(_counts.delete())
+    last_id = 0
+    total = 0
+    while True:
+        rows = connection.execute(
+            select(prompts.c.id, prompts.c.content, prompts.c.variables)
+            .where(prompts.c.id > last_id).order_by(prompts.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            connection.execute(_counts.insert().from_select(
+                ['name', 'prompt_count'],
+                select(_variables.c.name, db.func.count()).group_by(_variables.c.name)
+            ))
+            return total
+        variables_by_prompt = {}
+        changed = []
+        for row in rows:
+            names = Prompt.find_variables(row.content)
+            variables_by_prompt[row.id] = names
+            if _parse(row.variables) != names:
+                changed.append({'b_id': row.id, 'b_variables': json.dumps(names)})
+        if changed:
+            # Not an edit: leave updated_at alone
+            connection.execute(
+                prompts.update().where(prompts.c.id == db.bindparam('b_id'))
+                .values(variables=db.bindparam('b_variables'), updated_at=prompts.c.updated_at),
+                changed
+            )
+        _insert(connection, variables_by_prompt)
+        last_id = rows[-1].id
+        total += len(rows)
+
+
+def prompt_ids_using(names):
+    """Select the ids of prompts that use every one of the given variable names"""
+    query = select(_variables.c.prompt_id).where(_variables.c.name == names[0])
+    for name in names[1:]:
+        query = query.where(_variables.c.prompt_id.in_(
+            select(_variables.c.prompt_id).where(_variables.c.name == name)
+        ))
+    return query
+
+
+def variable_frequencies(limit=None, prefix=None):
+    """Get (name, prompt_count) pairs, most used first"""
+    query = select(_counts.c.name, _counts.c.prompt_count)
+    if prefix:
+        query = query.where(_counts.c.name.startswith(prefix, autoescape=True))
+    query = query.order_by(_counts.c.prompt_count.desc(), _counts.c.name)
+    if limit and limit > 0:
+        query = query.limit(limit)
+    return db.session.execute(query).all()
+
+
+@event.listens_for(Prompt, 'before_delete')
+def _prompt_deleted(mapper, connection, target):
+    replace_prompt_variables(connection, {target.id: []})
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _prompt_variables_changed(session, flush_context):
+    changed = {}
+    for instance in session.new:
+        if isinstance(instance, Prompt):
+            changed[instance.id] = instance.get_variables()
+    for instance in session.dirty:
+        if isinstance(instance, Prompt) and session.is_modified(instance, include_collections=False):
+            history = db.inspect(instance).attrs.variables.history
+            if history.has_changes():
+                changed[instance.id] = instance.get_variables()
+    if changed:
+        replace_prompt_variables(session.connection(), changed)
@@ -6,7 +6,7 @@ This script provides an easy way to run the Prompt Builder application.
 
 import os
 import sys
-from app import create_app
+from app import create_app, init_database
 PORT = int(os.getenv('PORT', '5000'))
 HOST = os.getenv('HOST', '0.0.0.0')
 
@@ -45,6 +45,8 @@ def main():
     print("=" * 60)
     
     try:
+        # Development convenience; deployments run `flask --app app db init` once instead
+        init_database(app)
         app.run(debug=True, host=HOST, port=PORT)
     except KeyboardInterrupt:
         print("\n\n👋 Server stopped. Goodbye!")
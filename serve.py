@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Prompt Builder production server
+
+A preforking, multi-threaded WSGI server built on Werkzeug. The master
+process creates the app once and forks workers that share it and the
+listening socket. Each worker handles requests on a bounded pool of
+threads and is replaced after --max-requests requests. On SIGTERM or
+SIGINT workers stop accepting, finish in-flight requests and flush
+buffered usage counts before exiting; SIGHUP replaces all workers the
+same way. `python run.py` remains the development server.
+
+    python serve.py --workers 4 --threads 8 --init-db
+"""
+import argparse
+import os
+import random
+import selectors
+import signal
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+PORT = int(os.getenv('PORT', '5000'))
+HOST = os.getenv('HOST', '0.0.0.0')
+WORKERS = int(os.getenv('SERVE_WORKERS', '0'))
+THREADS = int(os.getenv('SERVE_THREADS', '8'))
+MAX_REQUESTS = int(os.getenv('SERVE_MAX_REQUESTS', '10000'))
+MAX_REQUESTS_JITTER = int(os.getenv('SERVE_MAX_REQUESTS_JITTER', '1000'))
+GRACEFUL_TIMEOUT = float(os.getenv('SERVE_GRACEFUL_TIMEOUT', '30'))
+KEEPALIVE = float(os.getenv('SERVE_KEEPALIVE', '5'))
+BACKLOG = int(os.getenv('SERVE_BACKLOG', '1024'))
+# Delay before replacing a crashed worker, doubled per crash up to the max;
+# a worker that ran RESTART_STABLE seconds resets the count
+RESTART_BACKOFF = float(os.getenv('SERVE_RESTART_BACKOFF', '0.5'))
+RESTART_BACKOFF_MAX = float(os.getenv('SERVE_RESTART_BACKOFF_MAX', '30'))
+RESTART_STABLE = float(os.getenv('SERVE_RESTART_STABLE', '60'))
+
+# Worker exit code for a failure before serving, e.g. a bad configuration
+BOOT_ERROR = 3
+
+
+class RequestHandler(WSGIRequestHandler):
+    """Request handler that counts requests and closes keep-alive connections while draining"""
+
+    protocol_version = 'HTTP/1.1'
+    # Idle keep-alive connections are closed after this many seconds
+    timeout = KEEPALIVE
+    access_log = False
+
+    def handle_one_request(self):
+        super().handle_one_request()
+        if self.raw_requestline:
+            self.server.request_done()
+        if self.server.draining.is_set():
+            self.close_connection = True
+
+    def log_request(self, code='-', size='-'):
+        if self.access_log:
+            super().log_request(code, size)
+
+
+class PreforkServer(BaseWSGIServer):
+    """Listening socket shared by the workers, plus the per-worker request loop"""
+
+    multithread = True
+    multiprocess = True
+    request_queue_size = BACKLOG
+
+    def __init__(self, host, port, app, threads=THREADS, max_requests=MAX_REQUESTS, jitter=MAX_REQUESTS_JITTER):
+        super().__init__(host, port, app, handler=RequestHandler)
+        # Workers race to accept; the losers get BlockingIOError instead of blocking
+        self.socket.setblocking(False)
+        self.threads = threads
+        self.max_requests = max_requests
+        self.jitter = jitter
+        self.draining = threading.Event()
+        self._served = 0
+        self._served_lock = threading.Lock()
+        self._limit = 0
+
+    def request_done(self):
+        """Count a finished request and start draining once the worker's limit is reached"""
+        with self._served_lock:
+            self._served += 1
+            if self._limit and self._served >= self._limit:
+                self.draining.set()
+
+    def serve_worker(self):
+        """Accept connections until draining, then wait for in-flight requests"""
+        # Spread recycling out so workers started together are not replaced together
+        self._limit = self.max_requests + random.randint(0, self.jitter) if self.max_requests > 0 else 0
+        slots = threading.BoundedSemaphore(self.threads)
+        executor = ThreadPoolExecutor(self.threads, thread_name_prefix='request')
+        selector = selectors.DefaultSelector()
+        selector.register(self.socket, selectors.EVENT_READ)
+        try:
+            while not self.draining.is_set():
+                # Only accept with a free thread, leaving the connection to less busy workers
+                if not slots.acquire(timeout=0.5):
+                    continue
+                try:
+                    if not selector.select(0.5):
+                        slots.release()
+                        continue
+                    connection, address = self.socket.accept()
+                except (BlockingIOError, InterruptedError):
+                    slots.release()
+                    continue
+                connection.setblocking(True)
+                executor.submit(self._process, connection, address, slots)
+        finally:
+            selector.close()
+            self.socket.close()
+            executor.shutdown(wait=True)
+        return self._served
+
+    def _process(self, connection, address, slots):
+        try:
+            self.finish_request(connection, address)
+        except Exception:
+            self.handle_error(connection, address)
+        finally:
+            self.shutdown_request(connection)
+            slots.release()
+
+
+def _dispose_engines(app, close=True):
+    from models import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            # close=False drops pooled connections inherited from the parent without closing them
+            engine.dispose(close=close)
+
+
+def _flush(app):
+    """Write buffered state before a worker exits; atexit does not run after os._exit"""
+    from models.sqlite_tuning import sqlite_maintenance
+    from models.usage import usage_recorder
+
+    usage_recorder.shutdown()
+    sqlite_maintenance.shutdown()
+    _dispose_engines(app)
+
+
+def run_worker(server, app):
+    """Body of a forked worker process; never returns"""
+    status = BOOT_ERROR
+    try:
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(signum, lambda *_: server.draining.set())
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        _dispose_engines(app, close=False)
+        status = 1
+        served = server.serve_worker()
+        _flush(app)
+        print(f'👋 Worker {os.getpid()} exited after {served} requests', flush=True)
+        status = 0
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(status)
+
+
+class Master:
+    """Forks, watches and replaces workers"""
+
+    def __init__(self, server, app, workers, graceful_timeout=GRACEFUL_TIMEOUT):
+        self.server = server
+        self.app = app
+        self.workers = workers
+        self.graceful_timeout = graceful_timeout
+        self.children = {}
+        self.stopping = False
+        self.crashes = 0
+        self.next_spawn = 0.0
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            run_worker(self.server, self.app)
+        self.children[pid] = time.monotonic()
+
+    def reap(self):
+        """Collect exited workers; returns False if one failed to boot"""
+        healthy = True
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            started = self.children.pop(pid, None)
+            code = os.waitstatus_to_exitcode(status)
+            if code == BOOT_ERROR:
+                healthy = False
+            elif code != 0 and not self.stopping:
+                self.crashed(pid, code, started)
+        return healthy
+
+    def crashed(self, pid, code, started):
+        """Delay the replacement of a crashed worker, backing off while it keeps crashing"""
+        now = time.monotonic()
+        if started is not None and now - started >= RESTART_STABLE:
+            self.crashes = 0
+        self.crashes += 1
+        delay = min(RESTART_BACKOFF_MAX, RESTART_BACKOFF * 2 ** min(self.crashes - 1, 20))
+        self.next_spawn = max(self.next_spawn, now + delay)
+        print(f'⚠️ Worker {pid} exited with status {code}; replacing it in {delay:g}s', flush=True)
+
+    def signal_workers(self, signum):
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                self.children.pop(pid, None)
+
+    def run(self):
+        """Keep the configured number of workers running until told to stop"""
+        def stop(signum, frame):
+            self.stopping = True
+
+        def reload(signum, frame):
+            print('🔄 Replacing workers', flush=True)
+            self.signal_workers(signal.SIGTERM)
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGHUP, reload)
+        try:
+            while not self.stopping:
+                if not self.reap():
+                    print('❌ A worker failed to start; shutting down', flush=True)
+                    self.stopping = True
+                    break
+                while (len(self.children) < self.workers and not self.stopping
+                       and time.monotonic() >= self.next_spawn):
+                    self.spawn()
+                time.sleep(0.2)
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        """Drain workers, killing any still busy after the graceful timeout"""
+        print(f'🛑 Draining {len(self.children)} workers...', flush=True)
+        self.signal_workers(signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.children and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        if self.children:
+            print(f'⚠️ Killing {len(self.children)} workers after {self.graceful_timeout:g}s', flush=True)
+            self.signal_workers(signal.SIGKILL)
+            while self.children:
+                self.reap()
+                time.sleep(0.05)
+        self.server.server_close()
+
+
+def main():
+    """Parse options, preload the app and run the master process"""
+    parser = argparse.ArgumentParser(description='Run Prompt Builder with preforked, multi-threaded workers')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--workers', type=int, default=WORKERS, help='worker processes (default: CPUs + 1)')
+    parser.add_argument('--threads', type=int, default=THREADS, help='request threads per worker')
+    parser.add_argument('--max-requests', type=int, default=MAX_REQUESTS,
+                        help='replace a worker after this many requests (0 = never)')
+    parser.add_argument('--max-requests-jitter', type=int, default=MAX_REQUESTS_JITTER,
+                        help='random extra requests per worker, so workers are not replaced together')
+    parser.add_argument('--graceful-timeout', type=float, default=GRACEFUL_TIMEOUT,
+                        help='seconds workers get to finish in-flight requests on shutdown')
+    parser.add_argument('--keepalive', type=float, default=KEEPALIVE, help='idle keep-alive timeout in seconds')
+    parser.add_argument('--access-log', action='store_true', help='log every request')
+    parser.add_argument('--init-db', action='store_true', help='create and migrate the schema before forking')
+    args = parser.parse_args()
+
+    if not hasattr(os, 'fork'):
+        sys.exit('❌ serve.py needs os.fork (Linux or macOS); use run.py elsewhere')
+    workers = args.workers or (os.cpu_count() or 1) + 1
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    from app import create_app, init_database
+
+    # Preload: workers inherit the imported modules and the app, copy-on-write
+    app = create_app()
+    if args.init_db:
+        init_database(app)
+    # The master never serves requests, so it keeps no database connections to hand down
+    _dispose_engines(app)
+
+    RequestHandler.timeout = args.keepalive
+    RequestHandler.access_log = args.access_log
+    server = PreforkServer(args.host, args.port, app, threads=max(1, args.threads),
+                           max_requests=args.max_requests, jitter=max(0, args.max_requests_jitter))
+    print(f'🚀 Prompt Builder on http://{args.host}:{server.port} '
+          f'({workers} workers x {max(1, args.threads)} threads, master pid {os.getpid()})', flush=True)
+    Master(server, app, workers, args.graceful_timeout).run()
+    print('👋 Server stopped', flush=True)
+
+
+if __name__ == '__main__':
+    main()
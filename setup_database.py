@@ -6,25 +6,22 @@ This script helps you set up the PostgreSQL database
 
 import os
 import sys
-from app import create_app, db
+from app import create_app, init_database, db
 from models.category import Category as CategoryModel
 from models.prompt import Prompt as PromptModel
+from models.bulk import import_records
 
-def setup_database():
+def setup_database(app=None):
     """Set up the database with tables and sample data"""
-    app = create_app()
+    app = app or create_app()
     
     with app.app_context():
         print("🗄️  Setting up database...")
         
-        # Create all tables
-        db.create_all()
+        # Create tables, apply migrations and the default category
+        init_database(app)
         print("✅ Database tables created successfully!")
         
-        # Create default category
-        default_category = CategoryModel.get_or_create_default()
-        print(f"✅ Default category created: {default_category.name}")
-        
         # Create sample categories
         sample_categories = [
             {
@@ -45,16 +42,6 @@ def setup_database():
             }
         ]
         
-        for cat_data in sample_categories:
-            existing = CategoryModel.query.filter_by(name=cat_data['name']).first()
-            if not existing:
-                category = CategoryModel(
-                    name=cat_data['name'],
-                    description=cat_data['description']
-                )
-                db.session.add(category)
-                print(f"✅ Created category: {cat_data['name']}")
-        
         # Create sample prompts
         sample_prompts = [
             {
@@ -84,25 +71,16 @@ def setup_database():
             }
         ]
         
-        for prompt_data in sample_prompts:
-            existing = PromptModel.query.filter_by(title=prompt_data['title']).first()
-            if not existing:
-                category = CategoryModel.query.filter_by(name=prompt_data['category_name']).first()
-                if category:
-                    prompt = PromptModel(
-                        title=prompt_data['title'],
-                        content=prompt_data['content'],
-                        category_id=category.id
-                    )
-                    # Extract and set variables
-                    variables = prompt.extract_variables()
-                    prompt.set_variables(variables)
-                    
-                    db.session.add(prompt)
-                    print(f"✅ Created prompt: {prompt_data['title']}")
-        
-        # Commit all changes
-        db.session.commit()
+        # One bulk upsert instead of a lookup per row; existing titles are kept
+        summary = import_records(
+            [dict(cat_data, type='category') for cat_data in sample_categories] +
+            [{'type': 'prompt', 'title': prompt_data['title'], 'content': prompt_data['content'],
+              'category': prompt_data['category_name']} for prompt_data in sample_prompts],
+            key='title',
+            on_conflict='skip'
+        )
+        print(f"✅ Created {summary['categories_created']} categories and {summary['created']} prompts "
+              f"({summary['skipped']} prompts already existed)")
         print("✅ Sample data created successfully!")
         
         # Display summary
@@ -122,7 +100,7 @@ def reset_database():
         print("⚠️  Resetting database...")
         db.drop_all()
         print("✅ All tables dropped!")
-        setup_database()
+    setup_database(app)
 
 def main():
     """Main function"""
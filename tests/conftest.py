@@ -0,0 +1,29 @@
+"""Shared fixtures: apps backed by a throwaway SQLite database"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def sqlite_app(tmp_path):
+    """Build a production-configured app on a new SQLite file with the schema created"""
+    from config import config, ProductionConfig
+
+    class SQLiteTestConfig(ProductionConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+
+    config['test-sqlite'] = SQLiteTestConfig
+    from app import create_app, init_database
+    app = create_app('test-sqlite')
+    init_database(app)
+    yield app
+
+    from models import db
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
@@ -0,0 +1,52 @@
+"""Conditional GETs on catalog listings"""
+import pytest
+
+from models.prompt import Prompt
+
+
+def _create_prompt(client):
+    category_id = client.post('/api/categories', json={'name': 'Tags'}).get_json()['id']
+    return client.post('/api/prompts', json={
+        'title': 'Tagged', 'content': 'Hello', 'category_id': category_id,
+    }).get_json()['id']
+
+
+def test_usage_flush_keeps_catalog_tags(sqlite_app):
+    client = sqlite_app.test_client()
+    prompt_id = _create_prompt(client)
+    etag = client.get('/api/prompts').headers['ETag']
+
+    with sqlite_app.app_context():
+        Prompt.increment_usage({prompt_id: 1})
+
+    assert etag.startswith('W/')
+    assert client.get('/api/prompts', headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_usage_flush_changes_most_used_tag(sqlite_app):
+    client = sqlite_app.test_client()
+    prompt_id = _create_prompt(client)
+    etag = client.get('/api/prompts/most-used').headers['ETag']
+
+    with sqlite_app.app_context():
+        Prompt.increment_usage({prompt_id: 1})
+
+    response = client.get('/api/prompts/most-used', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()[0]['usage_count'] == 1
+
+
+@pytest.mark.parametrize('path', ['/api/prompts/{prompt_id}', '/api/prompts/most-used'])
+def test_not_modified_repeats_the_compressed_tag(sqlite_app, path):
+    client = sqlite_app.test_client()
+    path = path.format(prompt_id=_create_prompt(client))
+    # Compress even the small bodies of this test
+    sqlite_app.extensions['compression'].min_size = 0
+
+    response = client.get(path, headers={'Accept-Encoding': 'gzip'})
+    etag = response.headers['ETag']
+    assert response.headers['Content-Encoding'] == 'gzip' and etag.endswith('-gzip"')
+
+    response = client.get(path, headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
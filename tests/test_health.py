@@ -0,0 +1,22 @@
+"""Readiness must answer promptly even when a pool is exhausted"""
+import time
+
+from models import db
+
+
+def test_readiness_fails_fast_on_an_exhausted_pool(sqlite_app):
+    sqlite_app.config['HEALTH_CHECK_TIMEOUT'] = 0.2
+    client = sqlite_app.test_client()
+    assert client.get('/health/ready').status_code == 200
+
+    with sqlite_app.app_context():
+        pool = db.engine.pool
+        held = [db.engine.connect() for _ in range(pool.size() + pool._max_overflow)]
+        started = time.perf_counter()
+        response = client.get('/health/ready')
+        elapsed = time.perf_counter() - started
+        for connection in held:
+            connection.close()
+
+    assert response.status_code == 503
+    assert elapsed < 2
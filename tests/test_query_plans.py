@@ -0,0 +1,36 @@
+"""The hot endpoints must be served from indexes on SQLite"""
+from benchmarks.synthetic_data import generate
+from models.query_plans import check_query_plans
+
+
+def test_hot_endpoints_do_not_scan_tables(sqlite_app):
+    generate(sqlite_app, prompts=2000, categories=20, echo=lambda *args, **kwargs: None)
+
+    results = check_query_plans(sqlite_app)
+
+    assert results, 'no queries were captured'
+    violations = [(path, statement, found) for path, statement, _, found in results if found]
+    assert not violations, violations
+
+
+def _violations(app, statement):
+    from models import db
+    from models.query_plans import _sqlite_violations
+
+    with app.app_context(), db.engine.connect() as connection:
+        return _sqlite_violations(connection, statement, ())[1]
+
+
+def test_limit_exemption_ignores_where_in_subqueries(sqlite_app):
+    statement = ('SELECT id, (SELECT name FROM categories WHERE categories.id = prompts.category_id) '
+                 'FROM prompts ORDER BY id LIMIT 5')
+
+    assert _violations(sqlite_app, statement) == []
+
+
+def test_limit_exemption_does_not_cover_subquery_scans(sqlite_app):
+    statement = 'SELECT id, (SELECT count(*) FROM prompt_variables) FROM prompts ORDER BY id LIMIT 5'
+
+    violations = _violations(sqlite_app, statement)
+
+    assert len(violations) == 1 and 'prompt_variables' in violations[0]
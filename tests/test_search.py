@@ -0,0 +1,28 @@
+"""Search results page through every match"""
+
+
+def _collect(client, query_string):
+    ids = []
+    response = client.get('/api/prompts/search', query_string=query_string)
+    while True:
+        assert response.status_code == 200, response.get_json()
+        ids.extend(row['id'] for row in response.get_json())
+        link = response.headers.get('Link')
+        if not link:
+            return ids
+        response = client.get(link.split('>', 1)[0].lstrip('<'))
+
+
+def test_unranked_search_pages_through_all_matches(sqlite_app):
+    client = sqlite_app.test_client()
+    category_id = client.post('/api/categories', json={'name': 'Search'}).get_json()['id']
+    created = [
+        client.post('/api/prompts', json={
+            'title': f'Prompt {number}', 'content': 'two  spaces', 'category_id': category_id,
+        }).get_json()['id']
+        for number in range(5)
+    ]
+
+    # No word characters, so this falls back to LIKE matching
+    assert _collect(client, {'q': '  ', 'limit': 2}) == created
+    assert sorted(_collect(client, {'q': 'spaces', 'limit': 2})) == created
@@ -0,0 +1,21 @@
+"""Startup must stay fast, offline and free of lazily loaded modules"""
+import os
+
+from benchmarks.startup import UNREACHABLE_DATABASE_URL, probe
+
+# Generous for a cold interpreter on a CI runner; benchmarks/startup.py measures it properly
+STARTUP_BUDGET_MS = float(os.getenv('STARTUP_BUDGET_MS', '3000'))
+
+
+def test_startup_does_not_load_deferred_modules():
+    result = probe(UNREACHABLE_DATABASE_URL)
+
+    assert result['deferred_loaded'] == []
+    assert result['health_status'] == 200
+
+
+def test_startup_within_budget():
+    result = probe(UNREACHABLE_DATABASE_URL)
+
+    startup_ms = result['import_ms'] + result['create_app_ms']
+    assert startup_ms < STARTUP_BUDGET_MS, f'startup took {startup_ms:.0f} ms'
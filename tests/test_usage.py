@@ -0,0 +1,21 @@
+"""Usage flushes are written apart from the request's own session"""
+from models import db
+from models.category import Category
+from models.prompt import Prompt
+
+
+def test_increment_usage_leaves_the_session_alone(sqlite_app):
+    with sqlite_app.app_context():
+        category = Category(name='Usage')
+        prompt = Prompt(title='Counted', content='Hello', category=category)
+        db.session.add(prompt)
+        db.session.commit()
+        prompt_id = prompt.id
+
+        prompt.title = 'Not saved'
+        Prompt.increment_usage({prompt_id: 3})
+        db.session.rollback()
+
+        stored = db.session.get(Prompt, prompt_id)
+        assert stored.title == 'Counted'
+        assert stored.usage_count == 3
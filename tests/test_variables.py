@@ -0,0 +1,38 @@
+"""Variable counts follow prompts as they are written and deleted"""
+import pytest
+from sqlalchemy import event
+
+from models import db
+from models.variables import variable_frequencies
+
+
+def _enforce_foreign_keys(app):
+    with app.app_context():
+        engine = db.engine
+        event.listen(engine, 'connect', lambda connection, record: connection.execute('PRAGMA foreign_keys=ON'))
+        engine.dispose()
+
+
+def _frequencies(app):
+    with app.app_context():
+        return dict(variable_frequencies())
+
+
+@pytest.mark.parametrize('foreign_keys', [False, True])
+def test_deleting_prompt_decrements_counts(sqlite_app, foreign_keys):
+    if foreign_keys:
+        _enforce_foreign_keys(sqlite_app)
+    client = sqlite_app.test_client()
+    category_id = client.post('/api/categories', json={'name': 'Variables'}).get_json()['id']
+    created = [
+        client.post('/api/prompts', json={
+            'title': title, 'content': content, 'category_id': category_id,
+        }).get_json()['id']
+        for title, content in (('First', 'Hi {shared} and {only_first}'), ('Second', 'Bye {shared}'))
+    ]
+    assert _frequencies(sqlite_app) == {'shared': 2, 'only_first': 1}
+
+    assert client.delete(f'/api/prompts/{created[0]}').status_code == 200
+
+    assert _frequencies(sqlite_app) == {'shared': 1}
+    assert client.get('/api/prompts', query_string={'variable': 'only_first'}).get_json() == []